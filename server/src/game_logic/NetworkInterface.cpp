@@ -5,6 +5,10 @@
 #include <vector>
 #include <algorithm>
 
+#ifndef _WIN32
+#include <sys/un.h>
+#endif
+
 NetworkInterface::NetworkInterface(int port) : port(port) {
     streamServer = std::make_unique<StreamServer>(
         port, [this](SOCKET clientSocket, const std::string &request) { return process_request(clientSocket, request); });
@@ -39,12 +43,8 @@ void NetworkInterface::handle_disconnect(SOCKET clientSocket) {
         auto rit = std::remove(ready_players.begin(), ready_players.end(), player_id);
         if (rit != ready_players.end()) {
             ready_players.erase(rit, ready_players.end());
-            // Optionally: call python to sync DB
-             std::string command = "python3 logic_wrapper.py \"{\\\"action\\\": \\\"leave_lobby\\\", \\\"player_id\\\": " + std::to_string(player_id) + "}\"";
-             #ifdef _WIN32
-             command = "python logic_wrapper.py \"{\\\"action\\\": \\\"leave_lobby\\\", \\\"player_id\\\": " + std::to_string(player_id) + "}\"";
-             #endif
-             system(command.c_str());
+            // Sync DB through the logic layer
+            call_logic("{\"action\": \"leave_lobby\", \"player_id\": " + std::to_string(player_id) + "}");
         }
     } else {
         // Unidentified client disconnected
@@ -54,51 +54,7 @@ void NetworkInterface::handle_disconnect(SOCKET clientSocket) {
 std::string NetworkInterface::process_request(SOCKET clientSocket, const std::string& request) {
     std::cout << "Received: " << request << std::endl;
 
-    std::string escaped_request;
-    for (char c : request) {
-        if (c == '"') {
-            escaped_request += "\\\"";
-        } else {
-            escaped_request += c;
-        }
-    }
-
-    std::string command = "python3 logic_wrapper.py \"" + escaped_request + "\"";
-#ifdef _WIN32
-    command = "python logic_wrapper.py \"" + escaped_request + "\"";
-#endif
-    
-    std::string result = "";
-    FILE* pipe = nullptr;
-
-#ifdef _WIN32
-    pipe = _popen(command.c_str(), "r");
-#else
-    pipe = popen(command.c_str(), "r");
-#endif
-
-    if (!pipe) {
-        return "{\"status\": \"error\", \"message\": \"Failed to open pipe\"}";
-    }
-
-    char buffer[128];
-    while (fgets(buffer, 128, pipe) != NULL) {
-        result += buffer;
-    }
-
-#ifdef _WIN32
-    _pclose(pipe);
-#else
-    pclose(pipe);
-#endif
-    
-    size_t first = result.find_first_not_of(" \t\n\r");
-    if (first == std::string::npos) {
-        result = "";
-    } else {
-        size_t last = result.find_last_not_of(" \t\n\r");
-        result = result.substr(first, (last - first + 1));
-    }
+    std::string result = call_logic(request);
 
     // Network Logic: Intercept successful Lobby actions to update session map
     if (result.find("\"status\": \"success\"") != std::string::npos) {
@@ -143,3 +99,119 @@ std::string NetworkInterface::process_request(SOCKET clientSocket, const std::st
 
     return result;
 }
+
+std::string NetworkInterface::call_logic(const std::string& request) {
+    std::string result;
+    if (!query_logic_socket(request, result)) {
+        result = spawn_logic(request);
+    }
+
+    size_t first = result.find_first_not_of(" \t\n\r");
+    if (first == std::string::npos) {
+        return "";
+    }
+    size_t last = result.find_last_not_of(" \t\n\r");
+    return result.substr(first, (last - first + 1));
+}
+
+bool NetworkInterface::query_logic_socket(const std::string& request, std::string& response) {
+#ifdef _WIN32
+    (void)request;
+    (void)response;
+    return false;
+#else
+    // Pre-forked workers started with `python3 logic_wrapper.py --serve`
+    const char* env_path = std::getenv("CHESS_LOGIC_SOCKET");
+    std::string path = env_path ? env_path : "logic_wrapper.sock";
+
+    sockaddr_un addr{};
+    if (path.size() >= sizeof(addr.sun_path)) {
+        return false;
+    }
+    addr.sun_family = AF_UNIX;
+    std::copy(path.begin(), path.end(), addr.sun_path);
+
+    int fd = socket(AF_UNIX, SOCK_STREAM, 0);
+    if (fd < 0) {
+        return false;
+    }
+    if (connect(fd, reinterpret_cast<sockaddr *>(&addr), sizeof(addr)) < 0) {
+        close(fd);
+        return false;
+    }
+
+    // From here on the request may have been applied, so never fall back to a second run
+    std::string line = request + "\n";
+    size_t sent = 0;
+    while (sent < line.size()) {
+        ssize_t n = send(fd, line.data() + sent, line.size() - sent, 0);
+        if (n <= 0) {
+            close(fd);
+            response = "{\"status\": \"error\", \"message\": \"Logic worker connection lost\"}";
+            return true;
+        }
+        sent += static_cast<size_t>(n);
+    }
+
+    char buffer[4096];
+    response.clear();
+    while (response.find('\n') == std::string::npos) {
+        ssize_t n = recv(fd, buffer, sizeof(buffer), 0);
+        if (n <= 0) {
+            break;
+        }
+        response.append(buffer, static_cast<size_t>(n));
+    }
+    close(fd);
+
+    size_t pos = response.find('\n');
+    if (pos == std::string::npos) {
+        response = "{\"status\": \"error\", \"message\": \"Logic worker connection lost\"}";
+        return true;
+    }
+    response.erase(pos);
+    return true;
+#endif
+}
+
+std::string NetworkInterface::spawn_logic(const std::string& request) {
+    std::string escaped_request;
+    for (char c : request) {
+        if (c == '"') {
+            escaped_request += "\\\"";
+        } else {
+            escaped_request += c;
+        }
+    }
+
+    std::string command = "python3 logic_wrapper.py \"" + escaped_request + "\"";
+#ifdef _WIN32
+    command = "python logic_wrapper.py \"" + escaped_request + "\"";
+#endif
+    
+    std::string result = "";
+    FILE* pipe = nullptr;
+
+#ifdef _WIN32
+    pipe = _popen(command.c_str(), "r");
+#else
+    pipe = popen(command.c_str(), "r");
+#endif
+
+    if (!pipe) {
+        return "{\"status\": \"error\", \"message\": \"Failed to open pipe\"}";
+    }
+
+    char buffer[128];
+    while (fgets(buffer, 128, pipe) != NULL) {
+        result += buffer;
+    }
+
+#ifdef _WIN32
+    _pclose(pipe);
+#else
+    pclose(pipe);
+#endif
+
+    return result;
+}
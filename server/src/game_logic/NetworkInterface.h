@@ -22,6 +22,11 @@ private:
 
     std::string process_request(SOCKET clientSocket, const std::string& request);
     void handle_disconnect(SOCKET clientSocket);
+
+    // Logic layer: persistent worker socket first, one-shot python process as fallback
+    std::string call_logic(const std::string& request);
+    bool query_logic_socket(const std::string& request, std::string& response);
+    std::string spawn_logic(const std::string& request);
     
     // In-memory session tracking
     std::mutex session_mutex;
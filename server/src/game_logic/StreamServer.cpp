@@ -119,8 +119,9 @@ void StreamServer::handleClient(SOCKET clientSocket) {
             if (response.empty()) {
                 response = "{\"status\": \"error\", \"message\": \"Empty response\"}";
             }
+            // One send per message: a separate 1-byte "\n" send waits on Nagle/delayed ACK
+            response += '\n';
             send(clientSocket, response.c_str(), static_cast<int>(response.length()), 0);
-            send(clientSocket, "\n", 1, 0);
         }
     }
 
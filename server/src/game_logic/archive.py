@@ -0,0 +1,63 @@
+"""
+Scheduled archival job: moves finished games out of the hot tables.
+
+Live play looks moves and repetition counts up by game_id in GameMoves and
+GamePosition; finished games only make those tables (and their indexes) bigger.
+Each run packs every game that finished more than ARCHIVE_AFTER_DAYS ago into one
+zlib-compressed GameArchive row (headers + packed moves, see move_codec) and deletes
+its hot rows, BATCH_SIZE games per transaction so live moves never wait long on the
+write lock. get_replay, get_game_log and get_pgn read archived games transparently.
+
+Usage:
+    python3 archive.py                  # archive everything older than 7 days
+    python3 archive.py --days 1 --every 3600
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+# Ensure we can import from the same directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db_handler import archive_finished_games
+
+ARCHIVE_AFTER_DAYS = 7
+BATCH_SIZE = 500
+
+
+def run_archive(days=ARCHIVE_AFTER_DAYS, batch_size=BATCH_SIZE, now=None):
+    """
+    Archive all FINISHED games that ended more than `days` ago. Returns how many.
+    """
+    now = now or datetime.datetime.utcnow()
+    before = (now - datetime.timedelta(days=days)).isoformat()
+    total = 0
+    after_id = 0
+    while after_id is not None:
+        archived, after_id = archive_finished_games(before, batch_size, after_id)
+        total += archived
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive finished games")
+    parser.add_argument("--days", type=float, default=ARCHIVE_AFTER_DAYS,
+                        help="archive games that finished more than N days ago")
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--every", type=float, default=None,
+                        help="keep running, archiving every N seconds")
+    args = parser.parse_args()
+
+    while True:
+        start = time.perf_counter()
+        archived = run_archive(args.days, args.batch)
+        print(f"Archived {archived} games in {time.perf_counter() - start:.2f}s")
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
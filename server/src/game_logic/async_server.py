@@ -0,0 +1,656 @@
+"""
+Pure-Python asyncio game server.
+
+Speaks the same newline-delimited JSON as StreamServer/NetworkInterface (or, after a
+HELLO, length-prefixed JSON; see framing), but runs the logic_wrapper action handlers
+in-process: one event loop holds every client connection
+instead of one OS thread per socket and one python process per request line.
+
+Usage:
+    python3 async_server.py [--host 127.0.0.1] [--port 5001]
+"""
+import argparse
+import asyncio
+import functools
+import json
+import os
+import random
+import signal
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Ensure we can import from the same directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from database import close_all_connections
+from game_cache import DEFAULT_MAX_BYTES
+from flag_scheduler import FlagScheduler, flag_deadline
+import framing
+from lag_compensation import LagBudget, LagTracker, MAX_LAG_PER_MOVE, PING_SECONDS
+from lobby_feed import LobbyFeed
+import logic_wrapper
+import rank_index
+from logic_wrapper import handle_request, MODE_TIMES
+from matchmaking import MatchQueue, TICK_SECONDS
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 5001
+MAX_LINE_BYTES = framing.MAX_MESSAGE_BYTES
+# Requests that may run for seconds or minutes (batch validation, bulk PGN export):
+# they get their own thread so MOVEs, flag checks and matchmaking never queue behind
+# them. Background work (pre_export_pgn) runs there too.
+BULK_ACTIONS = frozenset({"validate_moves", "export_games"})
+
+
+class ClientConnection:
+    """Per-socket state (the C++ server keys this by SOCKET)."""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.player_id = None
+        self.games = set()  # game ids this connection gets GAME_UPDATE pushes for
+        self.lag = LagTracker()
+        self.pings = False  # opted in with HELLO {"ping": true}; plain clients never get PINGs
+        self.peer = writer.get_extra_info("peername")
+        self.framing = framing.LINE
+
+    def send(self, message):
+        """Queue one framed message (a single write); the caller drains."""
+        self.writer.write(framing.encode(message, self.framing))
+
+    async def read_frame(self):
+        """
+        Next request body as bytes, or None once the client is gone.
+        """
+        if self.framing == framing.LENGTH:
+            try:
+                header = await self.reader.readexactly(framing.HEADER.size)
+                (size,) = framing.HEADER.unpack(header)
+                if size > MAX_LINE_BYTES:
+                    raise framing.FramingError("Message too long")
+                return await self.reader.readexactly(size)
+            except asyncio.IncompleteReadError:
+                return None
+        line = await self.reader.readline()
+        return line.rstrip(b"\r\n") if line else None
+
+
+class GameServer:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, logic_threads=1,
+                 board_cache_bytes=DEFAULT_MAX_BYTES):
+        self.host = host
+        self.port = port
+        # Handlers block on SQLite; run them off the event loop. SQLite has a single
+        # writer anyway, so one thread keeps ordering simple and the loop responsive.
+        self.executor = ThreadPoolExecutor(max_workers=logic_threads, thread_name_prefix="logic")
+        self.bulk_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bulk")
+        # This process is the only writer, so live boards can stay in memory (0 = off)
+        if board_cache_bytes:
+            logic_wrapper.enable_board_cache(max_bytes=board_cache_bytes)
+        self.server = None
+        self.connections = set()
+        self.client_tasks = set()
+
+        # In-memory session tracking (mirrors NetworkInterface)
+        self.client_sessions = {}  # ClientConnection -> player_id
+        # Ready list kept here; changes are pushed as LOBBY_DELTA to clients that asked for it
+        self.lobby = LobbyFeed()
+        self.lobby_subscribers = set()
+
+        # RANDOM_MATCH: one ELO-sorted queue per mode, paired every TICK_SECONDS
+        self.match_queues = {mode: MatchQueue() for mode in MODE_TIMES}
+        self.match_conns = {}      # queued player_id -> ClientConnection
+        self.matchmaker = None
+
+        # GAME_UPDATE fan-out: game_id -> connections subscribed to that game
+        self.game_subscribers = {}
+
+        # Flag-fall deadlines of running clocks; the flag task sleeps until the next one
+        self.flags = FlagScheduler()
+        self.flag_wakeup = None
+        self.flag_task = None
+
+        # Monotonic time each game's clock was last punched (elapsed time for the next MOVE)
+        self.move_clocks = {}
+        # Lag credited per game and player (per game, not per connection: reconnecting
+        # does not reset it)
+        self.lag_budget = LagBudget()
+        self.pinger = None
+
+        # Fire-and-forget logic requests (PGN of games that just ended)
+        self.background_tasks = set()
+
+        self._stopped = None
+
+    @property
+    def ready_players(self):
+        """Just IDs, in join order"""
+        return list(self.lobby.players)
+
+    async def start(self):
+        self._stopped = asyncio.Event()
+        # Bulk-load the rank index on the logic thread before taking clients
+        await asyncio.get_running_loop().run_in_executor(self.executor, rank_index.get_index)
+        # Games left running by a previous server still flag
+        clocks = await self.run_logic({"action": "get_running_clocks"})
+        for game_id, deadline in clocks.get("deadlines", []):
+            self.flags.schedule(game_id, deadline)
+        # Players a previous server left in the Lobby table are still ready
+        ready = await self.run_logic({"action": "get_ready_players"})
+        self.lobby.load(ready.get("players", []))
+        self.flag_wakeup = asyncio.Event()
+        self.flag_task = asyncio.create_task(self.flag_loop())
+        self.pinger = asyncio.create_task(self.ping_loop())
+        self.server = await asyncio.start_server(
+            self.handle_client, self.host, self.port, limit=MAX_LINE_BYTES
+        )
+        self.matchmaker = asyncio.create_task(self.matchmaking_loop())
+        print(f"Async server listening on {self.host}:{self.port}")
+
+    async def serve_forever(self):
+        await self.start()
+        await self._stopped.wait()
+
+    async def run_logic(self, req, **context):
+        return await self._run_on(self.executor, req, **context)
+
+    async def run_bulk(self, req):
+        return await self._run_on(self.bulk_executor, req)
+
+    async def _run_on(self, executor, req, **context):
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(
+                executor, functools.partial(handle_request, req, **context))
+        except Exception as e:
+            return {"status": "error", "message": str(e)}
+
+    async def handle_client(self, reader, writer):
+        conn = ClientConnection(reader, writer)
+        framing.set_nodelay(writer.get_extra_info("socket"))
+        self.connections.add(conn)
+        task = asyncio.current_task()
+        self.client_tasks.add(task)
+        try:
+            while True:
+                try:
+                    line = await conn.read_frame()
+                except (asyncio.LimitOverrunError, ValueError):
+                    conn.send({"status": "error", "message": "Message too long"})
+                    break
+                except ConnectionError:
+                    break
+                if line is None:
+                    break
+                if not line:
+                    continue
+
+                response = await self.process_request(conn, line)
+                if response is not None:
+                    conn.send(response)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self.client_tasks.discard(task)
+            self.connections.discard(conn)
+            await self.handle_disconnect(conn)
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+
+    async def process_request(self, conn, line):
+        """
+        The response to send back, or None for messages that get no reply (PONG) or
+        have already answered (HELLO).
+        """
+        arrived = time.monotonic()
+        try:
+            req = json.loads(line)
+        except ValueError as e:
+            return {"status": "error", "message": str(e)}
+        if not isinstance(req, dict):
+            return {"status": "error", "message": "Request must be a JSON object"}
+
+        action = req.get("action") or req.get("type")
+        if action == "RANDOM_MATCH":
+            return await self.on_random_match(conn, req)
+        if action == "CANCEL_MATCH":
+            return self.on_cancel_match(conn, req)
+        if action in ("get_ready_players", "GET_PLAYERS"):
+            return self.on_get_ready_players(conn, req)
+        if action == "PONG":
+            conn.lag.pong(req.get("id"))
+            return None
+        if action == "HELLO":
+            # Reply in the current framing, then switch both directions
+            mode = framing.negotiate(req.get("framing"))
+            conn.send({"type": "HELLO", "status": "success", "framing": mode})
+            conn.framing = mode
+            conn.pings = bool(req.get("ping"))
+            return None
+        if action == "MOVE":
+            return await self.on_move(conn, req, arrived)
+        if action in ("SUBSCRIBE_GAME", "UNSUBSCRIBE_GAME"):
+            game_id = self._game_id(req.get("game_id"))
+            if game_id is None:
+                return {"type": action, "status": "error", "message": "Invalid game_id"}
+            if action == "SUBSCRIBE_GAME":
+                self.subscribe_game(conn, game_id)
+            else:
+                self.unsubscribe_game(conn, game_id)
+            return {"type": action, "status": "success", "game_id": game_id}
+
+        if action in BULK_ACTIONS:
+            response = await self.run_bulk(req)
+        else:
+            response = await self.run_logic(req)
+        if not response:
+            return {"status": "error", "message": "Empty response from logic"}
+
+        # Network Logic: Intercept successful Lobby actions to update session map
+        if response.get("status") == "success":
+            if action == "join_lobby":
+                await self.on_join_lobby(conn, req.get("player_id"), response.get("player"))
+            elif action == "leave_lobby":
+                await self.on_leave_lobby(req.get("player_id"))
+            elif action == "process_match_elo":
+                for side, key in (("player_a", "player_a_id"), ("player_b", "player_b_id")):
+                    await self.on_elo_changed(req.get(key), response[side]["new_elo"])
+            elif action == "update_elo":
+                await self.on_elo_changed(req.get("player_id"), req.get("new_elo"))
+            elif action == "create_game":
+                # White's clock runs from creation: flag them even if they never move
+                self.schedule_flag(response["game_id"], response.get("deadline"))
+
+        # Players of a game follow it from their first legal move request (or MOVE) on
+        if action in ("GET_LEGAL_MOVES", "get_legal_moves"):
+            game_id = self._game_id(req.get("game_id"))
+            if game_id is not None and response.get("status") != "error":
+                self.subscribe_game(conn, game_id)
+        return response
+
+    async def on_move(self, conn, req, arrived):
+        """
+        MOVE with server-side timing: thinking time is measured on the monotonic clock
+        from when the game's clock was last punched to when this request arrived, and
+        up to the connection's lag allowance of it is credited back, within the
+        mover's budget for the game.
+        """
+        game_id = self._game_id(req.get("game_id"))
+        context = {}
+        if game_id is not None:
+            punched = self.move_clocks.get(game_id)
+            if punched is not None:
+                context["elapsed"] = max(arrived - punched, 0.0)
+            context["lag_allowance"] = conn.lag.allowance()
+            context["lag_used"] = self.lag_budget.used(game_id)
+        response = await self.run_logic(req, **context)
+        if not response:
+            return {"status": "error", "message": "Empty response from logic"}
+        if game_id is None:
+            return response
+
+        if "white_time" in response:
+            # The clock was punched (valid or invalid move) when the move committed
+            self.move_clocks[game_id] = time.monotonic()
+            self.lag_budget.charge(game_id, response.get("player_id"), response.get("lag_credit"))
+        if response.get("status") != "error":
+            self.subscribe_game(conn, game_id)
+        await self.on_move_committed(conn, req, response)
+        return response
+
+    async def on_join_lobby(self, conn, player_id, player=None):
+        try:
+            pid = int(player_id)
+        except (TypeError, ValueError):
+            return
+        if pid <= 0:
+            return
+        conn.player_id = pid
+        self.client_sessions[conn] = pid
+        await self.publish(self.lobby.join(dict(player or {}, player_id=pid)))
+
+    async def on_leave_lobby(self, player_id):
+        try:
+            pid = int(player_id)
+        except (TypeError, ValueError):
+            return
+        # Note: We don't remove from client_sessions because they are still connected, just not in lobby
+        await self.publish(self.lobby.leave(pid))
+
+    async def on_elo_changed(self, player_id, elo):
+        try:
+            pid = int(player_id)
+        except (TypeError, ValueError):
+            return
+        await self.publish(self.lobby.elo_changed(pid, elo))
+
+    # ========== Game subscriptions (GAME_UPDATE) ==========
+
+    @staticmethod
+    def _game_id(value):
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return None
+
+    def subscribe_game(self, conn, game_id):
+        self.game_subscribers.setdefault(game_id, set()).add(conn)
+        conn.games.add(game_id)
+
+    def unsubscribe_game(self, conn, game_id):
+        conns = self.game_subscribers.get(game_id)
+        if conns is not None:
+            conns.discard(conn)
+            if not conns:
+                del self.game_subscribers[game_id]
+        conn.games.discard(game_id)
+
+    async def on_move_committed(self, conn, req, response):
+        """
+        Push the move, new FEN and clocks to everyone else following the game.
+        MOVE_RESULT is only returned after apply_move's transaction committed, so
+        subscribers never see a move that was rolled back.
+        """
+        game_id = self._game_id(req.get("game_id"))
+        if game_id is None or not (response.get("is_valid") or response.get("game_result") == "timeout"):
+            return
+        update = {"type": "GAME_UPDATE", "game_id": game_id,
+                  "game_result": response.get("game_result"),
+                  "white_time": response.get("white_time"),
+                  "black_time": response.get("black_time")}
+        if response.get("is_valid"):
+            update.update(last_move={"from": req.get("from"), "to": req.get("to")},
+                          fen=response.get("next_fen"), legal_moves=response.get("legal_moves"))
+        else:
+            update["winner_id"] = response.get("winner_id")
+        await self.push_game_update(game_id, update, exclude=conn)
+        if update["game_result"] not in (None, "in_progress"):
+            self.flags.cancel(game_id)
+            self.move_clocks.pop(game_id, None)
+            self.lag_budget.forget(game_id)
+            for other in list(self.game_subscribers.get(game_id, ())):
+                self.unsubscribe_game(other, game_id)
+            self.pre_export(game_id)
+        elif response.get("is_valid"):
+            # The clock of the side now to move started when this move committed
+            self.schedule_flag(game_id, flag_deadline(
+                response.get("next_fen"), response.get("white_time"), response.get("black_time"),
+                time.time(), MAX_LAG_PER_MOVE))
+
+    async def push_game_update(self, game_id, update, exclude=None):
+        conns = [c for c in self.game_subscribers.get(game_id, ())
+                 if c is not exclude and c in self.connections]
+        for other in conns:
+            other.send(update)
+        await asyncio.gather(*[c.writer.drain() for c in conns], return_exceptions=True)
+
+    # ========== Lag measurement ==========
+
+    async def ping_loop(self):
+        """
+        PING the connections that asked for it in their HELLO every PING_SECONDS; they
+        answer {"type": "PONG", "id": ...}. Request/response clients would take a PING
+        for the reply to their next request.
+        """
+        while True:
+            await asyncio.sleep(PING_SECONDS)
+            conns = [c for c in self.connections if c.pings]
+            for conn in conns:
+                conn.send({"type": "PING", "id": conn.lag.ping()})
+            await asyncio.gather(*[c.writer.drain() for c in conns], return_exceptions=True)
+
+    # ========== Flag fall ==========
+
+    def schedule_flag(self, game_id, deadline):
+        if deadline is None:
+            self.flags.cancel(game_id)
+        elif self.flags.schedule(game_id, deadline) and self.flag_wakeup is not None:
+            self.flag_wakeup.set()
+
+    async def flag_loop(self):
+        """
+        Sleep until the earliest deadline (or until an earlier one is scheduled),
+        then let check_flag end every game that is due.
+        """
+        while True:
+            delay = self.flags.next_deadline() - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self.flag_wakeup.wait(),
+                                           None if delay == float("inf") else delay)
+                except asyncio.TimeoutError:
+                    pass
+                self.flag_wakeup.clear()
+            for game_id in self.flags.pop_due(time.time()):
+                try:
+                    await self.on_flag_due(game_id)
+                except Exception as e:
+                    print(f"Flag check for game {game_id} failed: {e}")
+
+    async def on_flag_due(self, game_id):
+        res = await self.run_logic({"action": "check_flag", "game_id": game_id})
+        if not res.get("flagged"):
+            # A move got in first: the clock now runs for the other side
+            if res.get("deadline") is not None:
+                self.schedule_flag(game_id, res["deadline"])
+            return
+        self.move_clocks.pop(game_id, None)
+        self.lag_budget.forget(game_id)
+        await self.push_game_update(game_id, {
+            "type": "GAME_UPDATE", "game_id": game_id, "game_result": "timeout",
+            "winner_id": res["winner_id"], "white_time": res["white_time"],
+            "black_time": res["black_time"]})
+        for conn in list(self.game_subscribers.get(game_id, ())):
+            self.unsubscribe_game(conn, game_id)
+        self.pre_export(game_id)
+
+    def pre_export(self, game_id):
+        """
+        Render a finished game's PGN on the bulk thread, so get_pgn and exports find
+        it ready without live moves waiting for it.
+        """
+        task = asyncio.create_task(self.run_bulk({"action": "pre_export_pgn", "game_id": game_id}))
+        self.background_tasks.add(task)
+        task.add_done_callback(self.background_tasks.discard)
+
+    # ========== Lobby delta stream ==========
+
+    def on_get_ready_players(self, conn, req):
+        """
+        Full list, or with "since_version" (and the "epoch" it came from) just the
+        deltas after it (a full list is sent instead when the server no longer has them). Subscribes the connection
+        to LOBBY_DELTA pushes unless "subscribe" is false.
+        """
+        if req.get("subscribe", True):
+            self.lobby_subscribers.add(conn)
+        else:
+            self.lobby_subscribers.discard(conn)
+        response = {"type": "PLAYER_LIST", "status": "success"}
+        since = req.get("since_version")
+        deltas = None
+        if since is not None:
+            try:
+                deltas = self.lobby.since(int(since), req.get("epoch"))
+            except (TypeError, ValueError):
+                return {"type": "PLAYER_LIST", "status": "error", "message": "Invalid since_version"}
+        if deltas is not None:
+            response.update(epoch=self.lobby.epoch, version=self.lobby.version, deltas=deltas)
+        else:
+            response.update(self.lobby.snapshot())
+        return response
+
+    async def publish(self, delta):
+        """
+        Push one LOBBY_DELTA to every subscriber.
+        """
+        if delta is None:
+            return
+        conns = [c for c in self.lobby_subscribers if c in self.connections]
+        for conn in conns:
+            conn.send(delta)
+        await asyncio.gather(*[c.writer.drain() for c in conns], return_exceptions=True)
+
+    # ========== Matchmaking ==========
+
+    def _queued_player(self, conn, req):
+        try:
+            pid = int(req.get("player_id") or conn.player_id)
+        except (TypeError, ValueError):
+            return None
+        return pid if pid > 0 else None
+
+    def dequeue(self, player_id):
+        self.match_conns.pop(player_id, None)
+        for queue in self.match_queues.values():
+            queue.remove(player_id)
+
+    async def on_random_match(self, conn, req):
+        pid = self._queued_player(conn, req)
+        if pid is None:
+            return {"type": "RANDOM_MATCH", "status": "error", "message": "Missing player_id"}
+        mode = (req.get("mode") or "RAPID").upper()
+        if mode not in self.match_queues:
+            return {"type": "RANDOM_MATCH", "status": "error", "message": f"Invalid mode: {mode}"}
+        stats = await self.run_logic({"action": "get_player_stats", "player_id": pid})
+        if stats.get("status") != "success":
+            return {"type": "RANDOM_MATCH", "status": "error", "message": "Player not found"}
+
+        # Leave the other modes' queues; asking again for the same mode keeps the waiting time
+        for other, queue in self.match_queues.items():
+            if other != mode:
+                queue.remove(pid)
+        conn.player_id = pid
+        self.match_conns[pid] = conn
+        self.match_queues[mode].add(pid, stats["elo"] or 0)
+        return {"type": "RANDOM_MATCH", "status": "success", "message": "Searching", "mode": mode,
+                "queued": len(self.match_queues[mode])}
+
+    def on_cancel_match(self, conn, req):
+        pid = self._queued_player(conn, req)
+        if pid is None or pid not in self.match_conns:
+            return {"type": "CANCEL_MATCH", "status": "error", "message": "Not searching"}
+        self.dequeue(pid)
+        return {"type": "CANCEL_MATCH", "status": "success"}
+
+    async def matchmaking_loop(self):
+        while True:
+            await asyncio.sleep(TICK_SECONDS)
+            try:
+                await self.run_matchmaking()
+            except Exception as e:
+                print(f"Matchmaking tick failed: {e}")
+
+    async def run_matchmaking(self):
+        """
+        One tick: pair every due couple, create all their games in one batch and
+        send GAME_START to both players.
+        """
+        for mode, queue in self.match_queues.items():
+            pairs = queue.tick()
+            if not pairs:
+                continue
+            # Random colours; the queue pairs by rating only
+            pairs = [(a, b) if random.random() < 0.5 else (b, a) for a, b in pairs]
+            conns = [(self.match_conns.pop(w, None), self.match_conns.pop(b, None)) for w, b in pairs]
+            res = await self.run_logic({"action": "create_games", "pairs": pairs, "mode": mode})
+            if res.get("status") != "success":
+                print(f"Matchmaking: could not create {mode} games: {res.get('message')}")
+                continue
+            for game, (white_conn, black_conn) in zip(res["games"], conns):
+                self.schedule_flag(game["game_id"], res.get("deadline"))
+                for conn, color, opponent in ((white_conn, "white", "black"),
+                                              (black_conn, "black", "white")):
+                    if conn is None or conn not in self.connections:
+                        continue
+                    self.subscribe_game(conn, game["game_id"])
+                    conn.send({"type": "GAME_START", "game_id": game["game_id"], "mode": mode,
+                               "time_limit": res["time_limit"], "your_color": color,
+                               "opponent": game[f"{opponent}_username"],
+                               "opponent_elo": game[f"{opponent}_elo"]})
+            await asyncio.gather(*[c.writer.drain() for pair in conns for c in pair
+                                   if c is not None and c in self.connections],
+                                 return_exceptions=True)
+
+    async def handle_disconnect(self, conn):
+        self.lobby_subscribers.discard(conn)
+        for game_id in list(conn.games):
+            self.unsubscribe_game(conn, game_id)
+        if conn.player_id is not None and self.match_conns.get(conn.player_id) is conn:
+            self.dequeue(conn.player_id)
+        player_id = self.client_sessions.pop(conn, None)
+        if player_id is None:
+            return
+        print(f"Client disconnected: {conn.peer} (Player {player_id})")
+        if player_id in self.lobby:
+            await self.publish(self.lobby.leave(player_id))
+            # Sync DB
+            await self.run_logic({"action": "leave_lobby", "player_id": player_id})
+
+    async def stop(self, timeout=5.0):
+        """
+        Graceful shutdown: stop accepting, let in-flight requests finish, then close
+        every connection and the logic executors.
+        """
+        for task in (self.matchmaker, self.flag_task, self.pinger):
+            if task is not None:
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+        # EOF ends each reader loop once its current request is answered
+        for conn in list(self.connections):
+            if conn.reader is not None:
+                conn.reader.feed_eof()
+        tasks = list(self.client_tasks)
+        if tasks:
+            done, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        if self.background_tasks:
+            await asyncio.gather(*self.background_tasks, return_exceptions=True)
+
+        self.executor.shutdown(wait=True)
+        self.bulk_executor.shutdown(wait=True)
+        logic_wrapper.disable_board_cache()
+        logic_wrapper.shutdown_batch_pool()
+        close_all_connections()
+        if self._stopped is not None:
+            self._stopped.set()
+
+
+async def run_server(host, port, board_cache_bytes=DEFAULT_MAX_BYTES):
+    server = GameServer(host, port, board_cache_bytes=board_cache_bytes)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, lambda: asyncio.ensure_future(server.stop()))
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: fall back to KeyboardInterrupt
+    await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asyncio chess game server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--cache-mb", type=float, default=DEFAULT_MAX_BYTES / (1024 * 1024),
+                        help="memory cap for cached live boards (0 disables the cache)")
+    args = parser.parse_args()
+    try:
+        asyncio.run(run_server(args.host, args.port, int(args.cache_mb * 1024 * 1024)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+Micro-benchmarks for the game logic hot paths.
+
+Usage:
+    python3 benchmark.py db [--moves 2000]
+    python3 benchmark.py move [--moves 2000]
+    python3 benchmark.py validate [--games 200]
+    python3 benchmark.py elo [--players 2000] [--games 100000]
+    python3 benchmark.py storage [--games 2000]
+    python3 benchmark.py export [--games 20000] [--workers N]
+    python3 benchmark.py pgn [--games 200] [--plies 150]
+
+Each benchmark runs against a throw-away database in a temp directory.
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+import chess
+
+# Ensure we can import from the same directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import database
+import db_handler
+import elo_recompute
+import game_logic
+import logic_wrapper
+import move_codec
+import pgn_export
+from concurrent.futures import ProcessPoolExecutor
+from elo_system import calculate_elo
+from init_db import init_db, INITIAL_FEN
+
+
+def setup_temp_db():
+    """
+    Point database.DB_NAME at a fresh database with two players and one game.
+    Returns (tmpdir, game_id, white_id, black_id).
+    """
+    tmpdir = tempfile.TemporaryDirectory()
+    database.DB_NAME = os.path.join(tmpdir.name, "bench.db")
+    init_db()
+    with database.transaction() as conn:
+        white_id = conn.execute(
+            "INSERT INTO Player (username, password) VALUES ('bench_white', 'x')").lastrowid
+        black_id = conn.execute(
+            "INSERT INTO Player (username, password) VALUES ('bench_black', 'x')").lastrowid
+    game_id = db_handler.create_game(white_id, black_id, "RAPID", 600.0)
+    return tmpdir, game_id, white_id, black_id
+
+
+def report(name, n, seconds):
+    print(f"{name:<40} {n:>7} ops  {seconds / n * 1e6:>10.1f} us/op")
+
+
+# ========== db: connection/commit overhead on the MOVE path ==========
+
+def _legacy_call(db_name, sql, params, write):
+    # What every db_handler function used to do: connect, run one statement, commit, close
+    conn = sqlite3.connect(db_name)
+    cur = conn.cursor()
+    cur.execute(sql, params)
+    row = None if write else cur.fetchone()
+    if write:
+        conn.commit()
+    conn.close()
+    return row
+
+
+def legacy_move_path(db_name, game_id, player_id, move, now):
+    _legacy_call(db_name, "SELECT game_id, white_id, black_id, mode, start_time, end_time, "
+                          "winner_id, status, current_fen FROM Game WHERE game_id = ?", (game_id,), False)
+    _legacy_call(db_name, "SELECT white_time, black_time, last_move_time FROM Game WHERE game_id = ?",
+                 (game_id,), False)
+    _legacy_call(db_name, "UPDATE Game SET white_time = ?, black_time = ?, last_move_time = ? "
+                          "WHERE game_id = ?", (600.0, 600.0, str(now), game_id), True)
+    _legacy_call(db_name, "INSERT INTO Move (game_id, player_id, move_notation) VALUES (?, ?, ?)",
+                 (game_id, player_id, move), True)
+    _legacy_call(db_name, "UPDATE Game SET current_fen = ? WHERE game_id = ?",
+                 (INITIAL_FEN, game_id), True)
+
+
+def pooled_move_path(game_id, player_id, move, now):
+    db_handler.get_game_info(game_id)
+    db_handler.get_game_time(game_id)
+    db_handler.update_game_time(game_id, 600.0, 600.0, str(now))
+    db_handler.insert_move(game_id, player_id, move)
+    db_handler.update_game_fen(game_id, INITIAL_FEN)
+
+
+def unit_of_work_move_path(game_id, player_id, move, now):
+    def resolve(game):
+        updates = {"white_time": 600.0, "black_time": 600.0, "last_move_time": str(now),
+                   "current_fen": INITIAL_FEN}
+        return updates, (player_id, move), None
+    db_handler.apply_move(game_id, resolve)
+
+
+def bench_db(moves):
+    tmpdir, game_id, white_id, _ = setup_temp_db()
+    try:
+        # Same journal mode for both runs, so only connect/commit overhead differs
+        start = time.perf_counter()
+        for _ in range(moves):
+            legacy_move_path(database.DB_NAME, game_id, white_id, "e2e4", time.time())
+        report("move path, connect per call", moves, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(moves):
+            pooled_move_path(game_id, white_id, "e2e4", time.time())
+        report("move path, pooled connection", moves, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for _ in range(moves):
+            unit_of_work_move_path(game_id, white_id, "e2e4", time.time())
+        report("move path, apply_move (1 transaction)", moves, time.perf_counter() - start)
+    finally:
+        database.close_all_connections()
+        tmpdir.cleanup()
+
+
+# ========== move: full MOVE handler, with and without the board cache ==========
+
+def benchmark_game(plies=120, seed=7):
+    """
+    A reproducible random game of up to `plies` moves that never ends early
+    (no mate, stalemate, repetition or fifty-move draw), as (from, to) pairs.
+    """
+    rng = random.Random(seed)
+    board = chess.Board()
+    moves = []
+    while len(moves) < plies:
+        candidates = list(board.legal_moves)
+        rng.shuffle(candidates)
+        for move in candidates:
+            board.push(move)
+            if board.outcome(claim_draw=True) is None:
+                break
+            board.pop()
+        else:
+            break
+        uci = move.uci()
+        moves.append((uci[:2], uci[2:]))
+    return moves
+
+
+def run_moves(moves, white_id, black_id, game_moves):
+    game_id = None
+    for i in range(moves):
+        if i % len(game_moves) == 0:
+            game_id = db_handler.create_game(white_id, black_id, "RAPID", 600.0)
+        frm, to = game_moves[i % len(game_moves)]
+        res = logic_wrapper.handle_request(
+            {"type": "MOVE", "game_id": str(game_id), "from": frm, "to": to})
+        assert res.get("is_valid"), res
+
+
+def bench_move(moves):
+    tmpdir, _, white_id, black_id = setup_temp_db()
+    game_moves = benchmark_game()
+    try:
+        logic_wrapper.disable_board_cache()
+        start = time.perf_counter()
+        run_moves(moves, white_id, black_id, game_moves)
+        report("MOVE handler, no cache", moves, time.perf_counter() - start)
+
+        logic_wrapper.enable_board_cache()
+        start = time.perf_counter()
+        run_moves(moves, white_id, black_id, game_moves)
+        report("MOVE handler, live board cache", moves, time.perf_counter() - start)
+    finally:
+        logic_wrapper.disable_board_cache()
+        database.close_all_connections()
+        tmpdir.cleanup()
+
+
+# ========== validate: transposition cache on repeated openings ==========
+
+def opening_checks(games, plies=16, seed=3):
+    """
+    (fen, move) pairs from many short random games. Openings share their first
+    moves the way real games do, so positions repeat across games.
+    """
+    rng = random.Random(seed)
+    book = benchmark_game(plies=plies, seed=seed)
+    checks = []
+    for _ in range(games):
+        board = chess.Board()
+        in_book = True
+        for i in range(plies):
+            # Follow the "main line" for a few moves, then leave it for good
+            in_book = in_book and i < 6 and rng.random() < 0.8
+            if in_book:
+                move = chess.Move.from_uci("".join(book[i]))
+            else:
+                move = rng.choice(list(board.legal_moves))
+            checks.append((board.fen(), move.uci()))
+            board.push(move)
+            if board.is_game_over():
+                break
+    return checks
+
+
+def bench_validate(games):
+    checks = opening_checks(games)
+    start = time.perf_counter()
+    for fen, move_uci in checks:
+        game_logic._check_move_uncached(fen, move_uci)
+    report("move check, uncached", len(checks), time.perf_counter() - start)
+
+    game_logic.transposition_cache.clear()
+    start = time.perf_counter()
+    for fen, move_uci in checks:
+        game_logic.check_move(fen, move_uci)
+    report("move check, transposition cache", len(checks), time.perf_counter() - start)
+    stats = game_logic.transposition_cache.stats()
+    print(f"  hit rate {stats['hits'] / max(1, stats['hits'] + stats['misses']):.1%}")
+
+
+# ========== elo: full rating recompute, per-game vs vectorized ==========
+
+def insert_finished_games(players, games, seed=1):
+    rng = random.Random(seed)
+    with database.transaction() as conn:
+        conn.executemany("INSERT INTO Player (username, password) VALUES (?, 'x')",
+                         [(f"elo_{i}",) for i in range(players)])
+        ids = [row[0] for row in conn.execute("SELECT player_id FROM Player")]
+        rows = []
+        for i in range(games):
+            white, black = rng.sample(ids, 2)
+            rows.append((white, black, rng.choice([white, black, None]),
+                         f"2024-01-01 00:00:00.{i:06d}"))
+        conn.executemany(
+            "INSERT INTO Game (white_id, black_id, mode, status, winner_id, end_time) "
+            "VALUES (?, ?, 'RAPID', 'FINISHED', ?, ?)", rows)
+
+
+def scalar_recompute(initial):
+    # The per-game path: read both ratings, calculate_elo, write both back
+    with database.transaction() as conn:
+        conn.execute("UPDATE Player SET elo = ?", (initial,))
+    games = database.get_connection().execute(
+        "SELECT white_id, black_id, winner_id FROM Game "
+        "WHERE status = 'FINISHED' ORDER BY end_time, game_id").fetchall()
+    for white, black, winner in games:
+        result = 0.5 if winner is None else 1.0 if winner == white else 0.0
+        new_white, new_black = calculate_elo(db_handler.get_player_rating(white),
+                                             db_handler.get_player_rating(black), result)
+        db_handler.update_both_players_elo(white, new_white, black, new_black)
+
+
+def bench_elo(players, games):
+    tmpdir = tempfile.TemporaryDirectory()
+    database.DB_NAME = os.path.join(tmpdir.name, "bench.db")
+    init_db()
+    try:
+        insert_finished_games(players, games)
+        read_elos = "SELECT player_id, elo FROM Player ORDER BY player_id"
+
+        start = time.perf_counter()
+        scalar_recompute(elo_recompute.DEFAULT_INITIAL_ELO)
+        report("ELO recompute, per game", games, time.perf_counter() - start)
+        scalar = database.get_connection().execute(read_elos).fetchall()
+
+        start = time.perf_counter()
+        elo_recompute.recompute()
+        report("ELO recompute, vectorized waves", games, time.perf_counter() - start)
+        vectorized = database.get_connection().execute(read_elos).fetchall()
+        assert vectorized == scalar, "vectorized ratings differ from the per-game path"
+    finally:
+        database.close_all_connections()
+        tmpdir.cleanup()
+
+
+# ========== storage: per-ply Move rows vs packed GameMoves blobs ==========
+
+def fill_move_storage(db_name, games, game_moves, packed):
+    """
+    Size in bytes of a fresh database holding `games` copies of game_moves (0 games: schema only).
+    """
+    database.DB_NAME = db_name
+    init_db()
+    with database.transaction() as conn:
+        if packed:
+            blob = move_codec.pack_moves(game_moves)
+            conn.executemany("INSERT INTO GameMoves (game_id, moves) VALUES (?, ?)",
+                             [(g, blob) for g in range(1, games + 1)])
+        else:
+            conn.executemany(
+                "INSERT INTO Move (game_id, player_id, move_notation) VALUES (?, ?, ?)",
+                [(g, 1 + ply % 2, m) for g in range(1, games + 1)
+                 for ply, m in enumerate(game_moves)])
+    conn = database.get_connection()
+    conn.execute("VACUUM")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")  # count pages still in the WAL
+    return os.path.getsize(db_name)
+
+
+def bench_storage(games):
+    tmpdir = tempfile.TemporaryDirectory()
+    game_moves = ["".join(m) for m in benchmark_game()]
+    plies = games * len(game_moves)
+    try:
+        empty = fill_move_storage(os.path.join(tmpdir.name, "empty.db"), 0, game_moves, True)
+        for name, packed in (("Move rows", False), ("GameMoves blobs", True)):
+            database.close_all_connections()
+            size = fill_move_storage(os.path.join(tmpdir.name, f"{name}.db"), games, game_moves, packed)
+            print(f"{'storage, ' + name:<40} {plies:>7} plies {(size - empty) / plies:>8.1f} bytes/ply")
+            start = time.perf_counter()
+            for game_id in range(1, games + 1):
+                moves = db_handler.get_move_list(game_id)
+            report(f"replay read, {name}", games, time.perf_counter() - start)
+            assert moves == game_moves
+    finally:
+        database.close_all_connections()
+        tmpdir.cleanup()
+
+
+# ========== export: bulk PGN export, one process vs a pool ==========
+
+def bench_export(games, workers):
+    tmpdir = tempfile.TemporaryDirectory()
+    database.DB_NAME = os.path.join(tmpdir.name, "bench.db")
+    init_db()
+    try:
+        insert_finished_games(200, games)
+        blob = move_codec.pack_moves(["".join(m) for m in benchmark_game(plies=80)])
+        with database.transaction() as conn:
+            conn.execute("INSERT INTO GameMoves (game_id, moves) SELECT game_id, ? FROM Game", (blob,))
+        sink = open(os.devnull, "wb")
+        for n in sorted({1, workers}):
+            pool = ProcessPoolExecutor(max_workers=n) if n > 1 else None
+            start = time.perf_counter()
+            exported, _ = pgn_export.write_pgn(sink, executor=pool, workers=n)
+            report(f"PGN export, {n} worker(s)", exported, time.perf_counter() - start)
+            if pool is not None:
+                pool.shutdown()
+        sink.close()
+    finally:
+        database.close_all_connections()
+        tmpdir.cleanup()
+
+
+# ========== pgn: export_pgn, verified vs trusted replay ==========
+
+def bench_pgn(games, plies):
+    game_moves = [["".join(m) for m in benchmark_game(plies, seed)] for seed in range(games)]
+    for name, verify in (("verified", True), ("trusted", False)):
+        start = time.perf_counter()
+        for moves in game_moves:
+            game_logic.export_pgn(moves, "white", "black", "*", "2024.01.01", verify=verify)
+        report(f"export_pgn {plies} plies, {name}", games, time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Game logic micro-benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+    p_db = sub.add_parser("db", help="connection/commit overhead on the MOVE path")
+    p_db.add_argument("--moves", type=int, default=2000)
+    p_move = sub.add_parser("move", help="MOVE handler with and without the board cache")
+    p_move.add_argument("--moves", type=int, default=2000)
+    p_validate = sub.add_parser("validate", help="transposition cache on repeated openings")
+    p_validate.add_argument("--games", type=int, default=200)
+    p_elo = sub.add_parser("elo", help="full ELO recompute, per-game vs vectorized")
+    p_elo.add_argument("--players", type=int, default=2000)
+    p_elo.add_argument("--games", type=int, default=100000)
+    p_storage = sub.add_parser("storage", help="per-ply Move rows vs packed move blobs")
+    p_storage.add_argument("--games", type=int, default=2000)
+    p_export = sub.add_parser("export", help="bulk PGN export throughput")
+    p_export.add_argument("--games", type=int, default=20000)
+    p_export.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    p_pgn = sub.add_parser("pgn", help="export_pgn with and without re-validating moves")
+    p_pgn.add_argument("--games", type=int, default=200)
+    p_pgn.add_argument("--plies", type=int, default=150)
+    args = parser.parse_args()
+
+    if args.bench == "db":
+        bench_db(args.moves)
+    elif args.bench == "move":
+        bench_move(args.moves)
+    elif args.bench == "validate":
+        bench_validate(args.games)
+    elif args.bench == "elo":
+        bench_elo(args.players, args.games)
+    elif args.bench == "storage":
+        bench_storage(args.games)
+    elif args.bench == "export":
+        bench_export(args.games, args.workers)
+    elif args.bench == "pgn":
+        bench_pgn(args.games, args.plies)
+
+
+if __name__ == "__main__":
+    main()
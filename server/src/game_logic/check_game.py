@@ -3,6 +3,7 @@ Script để kiểm tra trạng thái game trong database
 """
 import sqlite3
 from database import get_connection, DB_NAME
+from db_handler import get_move_list
 import os
 
 def check_database():
@@ -53,22 +54,23 @@ def check_database():
             else:
                 print(f"   - Current FEN: NULL (⚠️ VẤN ĐỀ!)")
     
-    # Kiểm tra moves
+    # Kiểm tra moves: một blob 16-bit mỗi game trong GameMoves (move_codec), ván cũ
+    # đã lưu trữ nằm trong GameArchive, bảng Move chỉ còn dữ liệu cũ
+    cur.execute("SELECT COUNT(*), COALESCE(SUM(length(moves)), 0) / 2 FROM GameMoves")
+    games_with_moves, move_count = cur.fetchone()
+    cur.execute("SELECT COUNT(*) FROM GameArchive")
+    archived_count = cur.fetchone()[0]
     cur.execute("SELECT COUNT(*) FROM Move")
-    move_count = cur.fetchone()[0]
-    print(f"\n📊 Số lượng moves: {move_count}")
-    
+    legacy_count = cur.fetchone()[0]
+    print(f"\n📊 Số lượng moves: {move_count} ({games_with_moves} games, "
+          f"{archived_count} games đã lưu trữ, {legacy_count} dòng Move cũ)")
+
     if move_count > 0:
-        cur.execute("""
-            SELECT move_id, game_id, player_id, move_notation 
-            FROM Move 
-            ORDER BY move_id
-            LIMIT 10
-        """)
-        moves = cur.fetchall()
+        cur.execute("SELECT game_id FROM GameMoves ORDER BY game_id DESC LIMIT 10")
         print("\n♟️  Một số moves gần đây:")
-        for mid, gid, pid, move in moves:
-            print(f"   - Move {mid}: Game {gid}, Player {pid}, Move: {move}")
+        for (gid,) in cur.fetchall():
+            moves = get_move_list(gid)
+            print(f"   - Game {gid}: {len(moves)} moves, cuối: {' '.join(moves[-6:])}")
     
     conn.close()
     
@@ -1,6 +1,136 @@
+import atexit
+import os
 import sqlite3
+import threading
+from contextlib import contextmanager
 
 DB_NAME = "chess_game.db"
 
+# Tuning applied once, when a thread first opens the database
+CACHE_SIZE_KB = 16 * 1024             # page cache per connection
+MMAP_SIZE = 256 * 1024 * 1024         # memory-mapped reads
+BUSY_TIMEOUT_MS = 5000                # wait for the writer lock instead of failing
+STATEMENT_CACHE_SIZE = 256            # sqlite3 default is 128
+
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    f"PRAGMA cache_size=-{CACHE_SIZE_KB}",
+    f"PRAGMA mmap_size={MMAP_SIZE}",
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    Connection kept open for the lifetime of its thread.
+    close() only releases it (rolling back anything left uncommitted), so existing
+    `conn.close()` call sites keep working without reopening the database each time.
+    """
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def really_close(self):
+        self.is_closed = True
+        super().close()
+
+
+_local = threading.local()
+_all_lock = threading.Lock()
+_all_connections = []
+
+
+def _open(db_name):
+    conn = sqlite3.connect(
+        db_name,
+        factory=PooledConnection,
+        cached_statements=STATEMENT_CACHE_SIZE,
+        check_same_thread=False,  # Only ever used by its owner thread; lets close_all() run at exit
+    )
+    conn.owner_pid = os.getpid()
+    conn.is_closed = False
+    for pragma in PRAGMAS:
+        conn.execute(pragma)
+    with _all_lock:
+        _all_connections.append(conn)
+    return conn
+
+
 def get_connection():
-    return sqlite3.connect(DB_NAME)
+    """
+    Return this thread's persistent, tuned connection to DB_NAME.
+    """
+    pid = os.getpid()
+    if getattr(_local, "pid", None) != pid:
+        # Never reuse a connection inherited across fork()
+        _local.pid = pid
+        _local.connections = {}
+    conn = _local.connections.get(DB_NAME)
+    if conn is None or conn.is_closed:
+        conn = _local.connections[DB_NAME] = _open(DB_NAME)
+    return conn
+
+
+@contextmanager
+def transaction(conn=None, immediate=False):
+    """
+    Run a block in one transaction: commit on success, roll back on error.
+
+        with transaction() as conn:
+            conn.execute(...)
+
+    immediate=True takes the write lock up front (BEGIN IMMEDIATE) so a read-then-write
+    block cannot fail halfway with SQLITE_BUSY. Nested blocks join the outer transaction.
+    """
+    if conn is None:
+        conn = get_connection()
+    if conn.in_transaction:
+        yield conn
+        return
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def close_connection():
+    """
+    Close this thread's connections (e.g. before deleting the database file).
+    """
+    if getattr(_local, "pid", None) != os.getpid():
+        return
+    for conn in _local.connections.values():
+        _really_close(conn)
+    _local.connections = {}
+
+
+def close_all_connections():
+    """
+    Close every pooled connection this process opened (shutdown only).
+    Closing the last connection checkpoints and removes the WAL file.
+    """
+    pid = os.getpid()
+    with _all_lock:
+        connections = [c for c in _all_connections if c.owner_pid == pid]
+    for conn in connections:
+        _really_close(conn)
+    _local.connections = {}
+
+
+def _really_close(conn):
+    with _all_lock:
+        if conn in _all_connections:
+            _all_connections.remove(conn)
+    try:
+        conn.really_close()
+    except sqlite3.Error:
+        pass
+
+
+atexit.register(close_all_connections)
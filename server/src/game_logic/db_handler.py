@@ -1,72 +1,191 @@
-import sqlite3
-from database import get_connection
+from database import get_connection, transaction
 from init_db import INITIAL_FEN
+from game_logic import INITIAL_POSITION_HASH
+from move_codec import encode_move, pack_moves, unpack_moves, pack_archive, unpack_archive
+import rank_index
+import time
+
+# All functions share the calling thread's pooled connection (see database.py).
+# Writes go through transaction(), which commits once at the end of the block.
+
+
+# Append packed move codes to a game's GameMoves blob (creating it on the first move).
+# SQLite's || yields TEXT; the CAST keeps the bytes as they are.
+APPEND_MOVES = """
+    INSERT INTO GameMoves (game_id, moves) VALUES (?, ?)
+    ON CONFLICT(game_id) DO UPDATE SET moves = CAST(moves || excluded.moves AS BLOB)
+"""
 
 
 def insert_move(game_id, player_id, move_notation):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO Move (game_id, player_id, move_notation)
-        VALUES (?, ?, ?)
-        """,
-        (game_id, player_id, move_notation),
-    )
-    conn.commit()
-    conn.close()
+    """
+    Append a UCI move to the game (ValueError if it isn't one, or if the game is
+    FINISHED). The mover is implied by the ply number, so player_id is not stored.
+    """
+    encode_move(move_notation)
+    with transaction(get_connection(), immediate=True) as conn:
+        row = conn.execute("SELECT status FROM Game WHERE game_id = ?", (game_id,)).fetchone()
+        if row and row[0] == 'FINISHED':
+            raise ValueError("Game is already over")
+        conn.execute(APPEND_MOVES, (game_id, pack_moves([move_notation])))
 
 
-def create_game(white_id, black_id, mode, time_limit):
+def create_game(white_id, black_id, mode, time_limit, start=None):
     """
     Create a new game with specified mode and time limit.
-    time_limit should be in seconds.
+    time_limit should be in seconds. White's clock runs from `start` (default: now),
+    so a game whose first mover never moves still flags.
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO Game (white_id, black_id, mode, white_time, black_time, status)
-        VALUES (?, ?, ?, ?, ?, 'ONGOING')
-        """,
-        (white_id, black_id, mode, time_limit, time_limit)
-    )
-    game_id = cur.lastrowid
-    conn.commit()
-    conn.close()
+    start = time.time() if start is None else start
+    with transaction(get_connection()) as conn:
+        cur = conn.execute(
+            """
+            INSERT INTO Game (white_id, black_id, mode, white_time, black_time, status, last_move_time)
+            VALUES (?, ?, ?, ?, ?, 'ONGOING', ?)
+            """,
+            (white_id, black_id, mode, time_limit, time_limit, str(start))
+        )
+        game_id = cur.lastrowid
+        # The starting position counts as its first occurrence
+        conn.execute(
+            "INSERT INTO GamePosition (game_id, position_hash, count) VALUES (?, ?, 1)",
+            (game_id, INITIAL_POSITION_HASH)
+        )
     return game_id
 
 
+def create_games(pairs, mode, time_limit, start=None):
+    """
+    create_game for many (white_id, black_id) pairs in one transaction.
+    Returns the new game ids in the same order.
+    """
+    start = time.time() if start is None else start
+    game_ids = []
+    with transaction(get_connection()) as conn:
+        for white_id, black_id in pairs:
+            game_id = conn.execute(
+                """
+                INSERT INTO Game (white_id, black_id, mode, white_time, black_time, status, last_move_time)
+                VALUES (?, ?, ?, ?, ?, 'ONGOING', ?)
+                """,
+                (white_id, black_id, mode, time_limit, time_limit, str(start))
+            ).lastrowid
+            game_ids.append(game_id)
+        conn.executemany(
+            "INSERT INTO GamePosition (game_id, position_hash, count) VALUES (?, ?, 1)",
+            [(game_id, INITIAL_POSITION_HASH) for game_id in game_ids]
+        )
+    return game_ids
+
+
+
+def get_move_list(game_id, conn=None):
+    """
+    The game's moves as UCI strings, in order.
+    """
+    conn = conn or get_connection()
+    row = conn.execute("SELECT moves FROM GameMoves WHERE game_id = ?", (game_id,)).fetchone()
+    if row is not None:
+        return unpack_moves(row[0])
+    archived = get_archived_game(game_id, conn)
+    if archived is not None:
+        return archived[1]
+    # Rows left in Move from before GameMoves (see init_db.migrate_move_rows)
+    cur = conn.execute(
+        "SELECT move_notation FROM Move WHERE game_id = ? ORDER BY move_id", (game_id,))
+    return [r[0] for r in cur]
+
+
+def get_archived_game(game_id, conn=None):
+    """
+    (headers, moves) of a game in GameArchive, or None. headers is what
+    get_game_details returned (without the moves) when the game was archived.
+    """
+    conn = conn or get_connection()
+    row = conn.execute("SELECT data FROM GameArchive WHERE game_id = ?", (game_id,)).fetchone()
+    if row is None:
+        return None
+    headers, blob = unpack_archive(row[0])
+    return headers, unpack_moves(blob)
+
+
+def archive_finished_games(before, limit, after_id=0):
+    """
+    Move up to `limit` unarchived FINISHED games with game_id > after_id that ended
+    at or before `before` (an ISO time like Game.end_time; games without an end_time
+    count as ended) into GameArchive, in game_id order, in one transaction: their
+    moves and position counts leave the hot tables. The Game row stays (ratings and
+    stats read it). Returns (games archived, last game_id looked at or None if there
+    were none); pass the latter as after_id for the next batch, so games that cannot
+    be archived are not picked again.
+    """
+    with transaction(get_connection(), immediate=True) as conn:
+        # end_time comes from the request, so no watermark: any unarchived game qualifies
+        ids = [row[0] for row in conn.execute(
+            """
+            SELECT g.game_id FROM Game g
+            WHERE g.status = 'FINISHED' AND g.game_id > ?
+              AND (g.end_time IS NULL OR g.end_time <= ?)
+              AND NOT EXISTS (SELECT 1 FROM GameArchive a WHERE a.game_id = g.game_id)
+            ORDER BY g.game_id
+            LIMIT ?
+            """,
+            (after_id, before, limit)
+        )]
+        records = []
+        for game_id in ids:
+            details = get_game_details(game_id, conn)
+            if details is None:
+                continue  # players missing: nothing to build headers from
+            moves = details.pop("moves")
+            try:
+                blob = pack_moves(moves)
+            except ValueError:
+                continue  # legacy non-UCI rows stay in Move
+            records.append((game_id, details["end_time"], pack_archive(details, blob)))
+        done = [(r[0],) for r in records]
+        conn.executemany(
+            "INSERT INTO GameArchive (game_id, end_time, data) VALUES (?, ?, ?)", records)
+        conn.executemany("DELETE FROM GameMoves WHERE game_id = ?", done)
+        conn.executemany("DELETE FROM Move WHERE game_id = ?", done)
+        conn.executemany("DELETE FROM GamePosition WHERE game_id = ?", done)
+    return len(records), (ids[-1] if ids else None)
+
 
 def get_moves(game_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "SELECT move_id, move_notation FROM Move WHERE game_id = ? ORDER BY move_id",
-        (game_id,),
-    )
-    moves = cur.fetchall()
-    conn.close()
-    return moves
+    """
+    [(ply, move_notation), ...] with ply counting from 1.
+    """
+    return list(enumerate(get_move_list(game_id), 1))
 
 
 def update_player_elo(player_id, new_elo):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE Player SET elo = ? WHERE player_id = ?",
-        (new_elo, player_id),
-    )
-    conn.commit()
-    conn.close()
+    with transaction(get_connection(), immediate=True) as conn:
+        before = rank_index.rating_version(conn)
+        conn.execute(
+            "UPDATE Player SET elo = ? WHERE player_id = ?",
+            (new_elo, player_id),
+        )
+        after = rank_index.rating_version(conn)
+    rank_index.on_elo_changed([(player_id, new_elo)], before, after)
+
+
+def get_player_names(player_ids):
+    """
+    {player_id: (username, elo)} for the given ids, in one query.
+    """
+    ids = list(player_ids)
+    if not ids:
+        return {}
+    placeholders = ",".join("?" * len(ids))
+    cur = get_connection().execute(
+        f"SELECT player_id, username, elo FROM Player WHERE player_id IN ({placeholders})", ids)
+    return {row[0]: (row[1], row[2]) for row in cur}
 
 
 def get_player_rating(player_id):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute("SELECT elo FROM Player WHERE player_id = ?", (player_id,))
+    cur = get_connection().execute("SELECT elo FROM Player WHERE player_id = ?", (player_id,))
     result = cur.fetchone()
-    conn.close()
     if result:
         return result[0]
     return 1200 # Default if not found, though ideally should exist
@@ -76,38 +195,68 @@ def update_both_players_elo(player_a_id, new_elo_a, player_b_id, new_elo_b):
     """
     Updates ELO for two players within a single transaction.
     """
-    conn = get_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute(
+    with transaction(get_connection(), immediate=True) as conn:
+        before = rank_index.rating_version(conn)
+        conn.execute(
             "UPDATE Player SET elo = ? WHERE player_id = ?",
             (new_elo_a, player_a_id),
         )
-        cur.execute(
+        conn.execute(
             "UPDATE Player SET elo = ? WHERE player_id = ?",
             (new_elo_b, player_b_id),
         )
-        conn.commit()
-    except Exception as e:
-        conn.rollback()
-        raise e
-    finally:
-        conn.close()
+        after = rank_index.rating_version(conn)
+    rank_index.on_elo_changed([(player_a_id, new_elo_a), (player_b_id, new_elo_b)], before, after)
 
 
 def update_game_result(game_id, winner_id, status, end_time):
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+    with transaction(get_connection()) as conn:
+        before = conn.execute(
+            "SELECT white_id, black_id, status FROM Game WHERE game_id = ?",
+            (game_id,)
+        ).fetchone()
+        conn.execute(
+            """
+            UPDATE Game
+            SET winner_id = ?, status = ?, end_time = ?
+            WHERE game_id = ?
+            """,
+            (winner_id, status, end_time, game_id),
+        )
+        # The result is part of the PGN: drop any copy rendered before this change
+        conn.execute("DELETE FROM GamePgn WHERE game_id = ?", (game_id,))
+        # Count each game once: only the call that finishes it updates PlayerStats
+        if before and status == 'FINISHED' and before[2] != 'FINISHED':
+            count_finished_game(conn, before[0], before[1], winner_id)
+
+
+def count_finished_game(conn, white_id, black_id, winner_id):
+    """
+    Add one finished game to both players' PlayerStats (winner_id None = draw).
+    Runs on the caller's connection, inside the transaction that finishes the game.
+    """
+    try:
+        winner_id = None if winner_id is None else int(winner_id)
+    except (TypeError, ValueError):
+        return
+    if winner_id is None:
+        rows = [(white_id, 0, 0, 1), (black_id, 0, 0, 1)]
+    elif winner_id == white_id:
+        rows = [(white_id, 1, 0, 0), (black_id, 0, 1, 0)]
+    elif winner_id == black_id:
+        rows = [(white_id, 0, 1, 0), (black_id, 1, 0, 0)]
+    else:
+        return  # Winner is not a player of this game
+    conn.executemany(
         """
-        UPDATE Game
-        SET winner_id = ?, status = ?, end_time = ?
-        WHERE game_id = ?
+        INSERT INTO PlayerStats (player_id, wins, losses, draws) VALUES (?, ?, ?, ?)
+        ON CONFLICT (player_id) DO UPDATE SET
+            wins = wins + excluded.wins,
+            losses = losses + excluded.losses,
+            draws = draws + excluded.draws
         """,
-        (winner_id, status, end_time, game_id),
+        rows
     )
-    conn.commit()
-    conn.close()
 
 
 # ========== Game State Management Functions ==========
@@ -117,14 +266,11 @@ def get_game_fen(game_id):
     Get current FEN (board state) of a game.
     Returns INITIAL_FEN if game not found or FEN is NULL.
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+    cur = get_connection().execute(
         "SELECT current_fen FROM Game WHERE game_id = ?",
         (game_id,)
     )
     result = cur.fetchone()
-    conn.close()
     
     if result and result[0]:
         return result[0]
@@ -135,14 +281,11 @@ def update_game_fen(game_id, new_fen):
     """
     Update current FEN (board state) of a game after a move.
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        "UPDATE Game SET current_fen = ? WHERE game_id = ?",
-        (new_fen, game_id)
-    )
-    conn.commit()
-    conn.close()
+    with transaction(get_connection()) as conn:
+        conn.execute(
+            "UPDATE Game SET current_fen = ? WHERE game_id = ?",
+            (new_fen, game_id)
+        )
 
 
 
@@ -150,18 +293,15 @@ def update_game_time(game_id, white_time, black_time, last_move_time):
     """
     Update remaining time for both players and the last move timestamp.
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
-        """
-        UPDATE Game 
-        SET white_time = ?, black_time = ?, last_move_time = ?
-        WHERE game_id = ?
-        """,
-        (white_time, black_time, last_move_time, game_id)
-    )
-    conn.commit()
-    conn.close()
+    with transaction(get_connection()) as conn:
+        conn.execute(
+            """
+            UPDATE Game 
+            SET white_time = ?, black_time = ?, last_move_time = ?
+            WHERE game_id = ?
+            """,
+            (white_time, black_time, last_move_time, game_id)
+        )
 
 
 def get_game_time(game_id):
@@ -169,17 +309,112 @@ def get_game_time(game_id):
     Get current time status of a game.
     Returns tuple: (white_time, black_time, last_move_time)
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+    cur = get_connection().execute(
         "SELECT white_time, black_time, last_move_time FROM Game WHERE game_id = ?",
         (game_id,)
     )
     result = cur.fetchone()
-    conn.close()
     return result if result else (600.0, 600.0, None)
 
 
+def record_position(game_id, position_hash, irreversible):
+    """
+    Count one more occurrence of a position in a game and return the new count.
+    irreversible: the move was a capture or pawn move (halfmove clock reset), so no
+    earlier position can ever recur and the game's older rows are dropped first.
+    """
+    with transaction(get_connection()) as conn:
+        if irreversible:
+            conn.execute("DELETE FROM GamePosition WHERE game_id = ?", (game_id,))
+        row = conn.execute(
+            """
+            INSERT INTO GamePosition (game_id, position_hash, count) VALUES (?, ?, 1)
+            ON CONFLICT (game_id, position_hash) DO UPDATE SET count = count + 1
+            RETURNING count
+            """,
+            (game_id, position_hash)
+        ).fetchone()
+    return row[0]
+
+
+# Game columns a move may write, and the state apply_move reads in one query
+MOVE_WRITABLE_COLUMNS = (
+    "white_time", "black_time", "last_move_time", "current_fen",
+    "winner_id", "status", "end_time",
+)
+MOVE_STATE_COLUMNS = (
+    "game_id", "white_id", "black_id", "status", "current_fen",
+    "white_time", "black_time", "last_move_time",
+)
+
+
+def get_move_state(game_id, conn=None):
+    """
+    The Game columns the MOVE path needs, as a dict (None if the game does not exist).
+    """
+    row = (conn or get_connection()).execute(
+        f"SELECT {', '.join(MOVE_STATE_COLUMNS)} FROM Game WHERE game_id = ?",
+        (game_id,)
+    ).fetchone()
+    return dict(zip(MOVE_STATE_COLUMNS, row)) if row else None
+
+
+def get_running_clocks():
+    """
+    (game_id, current_fen, white_time, black_time, last_move_time) of every ONGOING
+    game whose clock has started, for the flag-fall scheduler to load at startup.
+    """
+    cur = get_connection().execute(
+        """
+        SELECT game_id, current_fen, white_time, black_time, last_move_time FROM Game
+        WHERE status = 'ONGOING' AND last_move_time IS NOT NULL
+        """
+    )
+    return cur.fetchall()
+
+
+def apply_move(game_id, resolve, state=None):
+    """
+    Process one move as a single unit of work.
+
+    Reads the game and clock state in one query, then calls resolve(game) with a dict
+    of MOVE_STATE_COLUMNS (or None if the game does not exist). resolve returns
+    (game_updates, move, result):
+        game_updates: dict of MOVE_WRITABLE_COLUMNS to set on the Game row
+        move: (player_id, move_notation) to append to the game's moves, or None
+        result: returned to the caller as-is
+    Everything runs inside one BEGIN IMMEDIATE transaction: one commit per move, and a
+    crash midway leaves nothing half-written. If resolve raises, nothing is written.
+    Appending a move to a game that was already FINISHED raises ValueError (its moves
+    may live in GameArchive by now, which a new GameMoves row would hide).
+
+    state: an already-known state dict to pass to resolve instead of reading the row
+    (used by the write-through board cache, which keeps it in sync with the table).
+    """
+    with transaction(get_connection(), immediate=True) as conn:
+        if state is not None:
+            game = state
+        else:
+            game = get_move_state(game_id, conn)
+
+        game_updates, move, result = resolve(game)
+        if game and move and game['status'] == 'FINISHED':
+            raise ValueError("Game is already over")
+
+        if game and game_updates:
+            columns = [c for c in MOVE_WRITABLE_COLUMNS if c in game_updates]
+            conn.execute(
+                f"UPDATE Game SET {', '.join(c + ' = ?' for c in columns)} WHERE game_id = ?",
+                [game_updates[c] for c in columns] + [game_id]
+            )
+            if game_updates.get('status') == 'FINISHED' and game['status'] != 'FINISHED':
+                count_finished_game(conn, game['white_id'], game['black_id'],
+                                    game_updates.get('winner_id'))
+        if game and move:
+            conn.execute(APPEND_MOVES, (game_id, pack_moves([move[1]])))
+    return result
+
+
 def get_current_player_turn(game_id):
     """
     Get player_id of the player whose turn it is to move.
@@ -187,14 +422,11 @@ def get_current_player_turn(game_id):
     Returns None if game not found or invalid.
     """
     # First check if game exists
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+    cur = get_connection().execute(
         "SELECT white_id, black_id, current_fen FROM Game WHERE game_id = ?",
         (game_id,)
     )
     result = cur.fetchone()
-    conn.close()
     
     if not result:
         return None  # Game not found
@@ -228,9 +460,7 @@ def get_game_info(game_id):
                     winner_id, status, current_fen)
     Returns None if game not found.
     """
-    conn = get_connection()
-    cur = conn.cursor()
-    cur.execute(
+    cur = get_connection().execute(
         """
         SELECT game_id, white_id, black_id, mode, start_time, end_time,
                winner_id, status, current_fen
@@ -239,17 +469,20 @@ def get_game_info(game_id):
         """,
         (game_id,)
     )
-    game = cur.fetchone()
-    conn.close()
-    return game
+    return cur.fetchone()
 
 
-def get_game_details(game_id):
+def get_game_details(game_id, conn=None):
     """
     Get full game details for logging/replay.
     Returns dictionary with game info, players, and moves.
+    Archived games are answered from GameArchive (player ELOs as of archiving).
     """
-    conn = get_connection()
+    conn = conn or get_connection()
+    archived = get_archived_game(game_id, conn)
+    if archived is not None:
+        headers, moves = archived
+        return dict(headers, moves=moves)
     cur = conn.cursor()
     
     # Get Game and Player info
@@ -269,17 +502,9 @@ def get_game_details(game_id):
     game_row = cur.fetchone()
     
     if not game_row:
-        conn.close()
         return None
         
-    # Get Moves
-    cur.execute(
-        "SELECT move_notation from Move WHERE game_id = ? ORDER BY move_id ASC",
-        (game_id,)
-    )
-    moves = [row[0] for row in cur.fetchall()]
-    
-    conn.close()
+    moves = get_move_list(game_id, conn)
     
     return {
         "game_id": game_row[0],
@@ -294,56 +519,184 @@ def get_game_details(game_id):
     }
 
 
+# ========== Bulk export ==========
+
+# Finished games with everything a PGN needs; the moves come from GameMoves, or from
+# GameArchive (still compressed) once archived
+EXPORT_COLUMNS = """
+    g.game_id, g.white_id, g.winner_id, g.start_time, g.end_time,
+    pw.username, pb.username, m.moves, a.data, c.pgn
+"""
+EXPORT_JOINS = """
+    JOIN Player pw ON pw.player_id = g.white_id
+    JOIN Player pb ON pb.player_id = g.black_id
+    LEFT JOIN GameMoves m ON m.game_id = g.game_id
+    LEFT JOIN GameArchive a ON a.game_id = g.game_id
+    LEFT JOIN GamePgn c ON c.game_id = g.game_id
+"""
+EXPORT_BY_TIME = f"""
+    SELECT {EXPORT_COLUMNS} FROM Game g {EXPORT_JOINS}
+    WHERE g.status = 'FINISHED' AND (g.end_time, g.game_id) > (?, ?) AND g.end_time < ?
+    ORDER BY g.end_time, g.game_id LIMIT ?
+"""
+# Unary + keeps the planner on the player's index instead of idx_game_status
+EXPORT_BY_WHITE = f"""
+    SELECT {EXPORT_COLUMNS} FROM Game g {EXPORT_JOINS}
+    WHERE g.white_id = ? AND g.game_id > ? AND +g.status = 'FINISHED'
+      AND g.end_time >= ? AND g.end_time < ?
+    ORDER BY g.game_id LIMIT ?
+"""
+EXPORT_BY_BLACK = f"""
+    SELECT {EXPORT_COLUMNS} FROM Game g {EXPORT_JOINS}
+    WHERE g.black_id = ? AND g.game_id > ? AND +g.status = 'FINISHED'
+      AND g.end_time >= ? AND g.end_time < ?
+    ORDER BY g.game_id LIMIT ?
+"""
+EXPORT_END = "9999-12-31"    # later than any end_time
+
+
+def get_export_batch(after, limit, player_id=None, since=None, until=None):
+    """
+    Next `limit` FINISHED games of a bulk export, keyset-paginated, as rows of
+    (game_id, white_id, winner_id, start_time, end_time, white_name, black_name,
+     moves_blob, archive_data, cached_pgn).
+    Without player_id games come in (end_time, game_id) order and `after` is the last
+    row's (end_time, game_id); with player_id they come in game_id order and `after`
+    is the last game_id. None starts from the beginning. since/until bound end_time
+    to [since, until).
+    """
+    conn = get_connection()
+    since, until = since or "", until or EXPORT_END
+    if player_id is None:
+        after = after or (since, 0)
+        return conn.execute(EXPORT_BY_TIME, (after[0], after[1], until, limit)).fetchall()
+    # One index range per colour, merged; each side needs at most `limit` rows
+    params = (player_id, after or 0, since, until, limit)
+    rows = {row[0]: row for row in conn.execute(EXPORT_BY_WHITE, params)}
+    rows.update((row[0], row) for row in conn.execute(EXPORT_BY_BLACK, params))
+    return [rows[game_id] for game_id in sorted(rows)[:limit]]
+
+
+def get_cached_pgn(game_id):
+    row = get_connection().execute(
+        "SELECT pgn FROM GamePgn WHERE game_id = ?", (game_id,)).fetchone()
+    return row[0] if row else None
+
+
+def save_pgn(game_id, pgn):
+    with transaction(get_connection()) as conn:
+        conn.execute("INSERT OR REPLACE INTO GamePgn (game_id, pgn) VALUES (?, ?)", (game_id, pgn))
+
+
+def get_player_id(username):
+    cur = get_connection().execute("SELECT player_id FROM Player WHERE username = ?", (username,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
 # ========== Lobby / Ready Players Management ==========
 
 def add_to_lobby(player_id):
     """
     Add a player to the ready lobby.
     """
-    conn = get_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute("INSERT OR IGNORE INTO Lobby (player_id) VALUES (?)", (player_id,))
-        conn.commit()
-    finally:
-        conn.close()
+    with transaction(get_connection()) as conn:
+        conn.execute("INSERT OR IGNORE INTO Lobby (player_id) VALUES (?)", (player_id,))
 
 
 def remove_from_lobby(player_id):
     """
     Remove a player from the ready lobby.
     """
-    conn = get_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute("DELETE FROM Lobby WHERE player_id = ?", (player_id,))
-        conn.commit()
-    finally:
-        conn.close()
+    with transaction(get_connection()) as conn:
+        conn.execute("DELETE FROM Lobby WHERE player_id = ?", (player_id,))
 
 
 def get_lobby_players():
     """
     Get a list of all players currently in the lobby.
     """
-    conn = get_connection()
-    try:
-        cur = conn.cursor()
-        cur.execute("""
-            SELECT l.player_id, p.username, p.elo, l.joined_at
-            FROM Lobby l
-            JOIN Player p ON l.player_id = p.player_id
-            ORDER BY l.joined_at ASC
-        """)
-        return [
-            {
-                "player_id": r[0], 
-                "username": r[1], 
-                "elo": r[2], 
-                "joined_at": r[3]
-            } 
-            for r in cur.fetchall()
-        ]
-    finally:
-        conn.close()
+    cur = get_connection().execute("""
+        SELECT l.player_id, p.username, p.elo, l.joined_at
+        FROM Lobby l
+        JOIN Player p ON l.player_id = p.player_id
+        ORDER BY l.joined_at ASC
+    """)
+    return [
+        {
+            "player_id": r[0], 
+            "username": r[1], 
+            "elo": r[2], 
+            "joined_at": r[3]
+        } 
+        for r in cur.fetchall()
+    ]
+
+
+# ========== Leaderboard ==========
+
+LEADERBOARD_MAX_LIMIT = 200
+
+
+def get_leaderboard(limit=50, after_elo=None, after_id=None):
+    """
+    Players by ELO (highest first, ties by newest player_id), with win/loss/draw totals.
+    Keyset pagination: pass the last row's (elo, player_id) as (after_elo, after_id)
+    to get the next page. Each page is one range read of idx_player_elo, however
+    deep it is.
+    """
+    limit = max(1, min(int(limit), LEADERBOARD_MAX_LIMIT))
+    if after_elo is None or after_id is None:
+        cur = get_connection().execute(
+            """
+            SELECT p.player_id, p.username, p.elo,
+                   COALESCE(s.wins, 0), COALESCE(s.losses, 0), COALESCE(s.draws, 0)
+            FROM Player p LEFT JOIN PlayerStats s ON s.player_id = p.player_id
+            ORDER BY p.elo DESC, p.player_id DESC
+            LIMIT ?
+            """,
+            (limit,)
+        )
+    else:
+        cur = get_connection().execute(
+            """
+            SELECT p.player_id, p.username, p.elo,
+                   COALESCE(s.wins, 0), COALESCE(s.losses, 0), COALESCE(s.draws, 0)
+            FROM Player p LEFT JOIN PlayerStats s ON s.player_id = p.player_id
+            WHERE (p.elo, p.player_id) < (?, ?)
+            ORDER BY p.elo DESC, p.player_id DESC
+            LIMIT ?
+            """,
+            (int(after_elo), int(after_id), limit)
+        )
+    return cur.fetchall()
+
 
+def get_player_stats(player_id=None, username=None):
+    """
+    (player_id, username, elo, wins, losses, draws, glicko_rating, glicko_rd)
+    by id or username, or None.
+    """
+    if player_id is not None:
+        cur = get_connection().execute(
+            """
+            SELECT p.player_id, p.username, p.elo,
+                   COALESCE(s.wins, 0), COALESCE(s.losses, 0), COALESCE(s.draws, 0),
+                   p.glicko_rating, p.glicko_rd
+            FROM Player p LEFT JOIN PlayerStats s ON s.player_id = p.player_id
+            WHERE p.player_id = ?
+            """,
+            (player_id,)
+        )
+    else:
+        cur = get_connection().execute(
+            """
+            SELECT p.player_id, p.username, p.elo,
+                   COALESCE(s.wins, 0), COALESCE(s.losses, 0), COALESCE(s.draws, 0),
+                   p.glicko_rating, p.glicko_rd
+            FROM Player p LEFT JOIN PlayerStats s ON s.player_id = p.player_id
+            WHERE p.username = ?
+            """,
+            (username,)
+        )
+    return cur.fetchone()
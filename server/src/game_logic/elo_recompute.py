@@ -0,0 +1,165 @@
+"""
+Recompute every player's ELO from scratch by replaying all finished games.
+
+Needed after changing elo_system (K-factor or formula). Games are streamed in
+end_time order and ratings are kept in a NumPy array indexed by player. Games that
+share no player are independent, so each chunk of games is split into "waves" of
+player-disjoint games that are updated together with array operations. Per player,
+games still apply in chronological order, so the result is exactly what calling
+calculate_elo game by game gives. All ratings are written back with one executemany.
+
+Usage:
+    python3 elo_recompute.py [--initial 1000] [--dry-run]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Ensure we can import from the same directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import rank_index
+from database import get_connection, transaction
+import elo_system
+
+DEFAULT_INITIAL_ELO = 1000  # Player.elo column default
+CHUNK_SIZE = 100000
+
+
+def k_factors(ratings):
+    """
+    elo_system.get_k_factor of every rating, called once per distinct value, so the
+    bulk recompute follows whatever rule the live path uses.
+    """
+    values, inverse = np.unique(ratings, return_inverse=True)
+    return np.array([elo_system.get_k_factor(v) for v in values.tolist()])[inverse]
+
+
+def calculate_elo_arrays(ratings_a, ratings_b, results_a):
+    """
+    elo_system.calculate_elo over arrays, with the same operations in the same order
+    (so the floating-point results are bit-identical) and the same rounding:
+    np.rint rounds half to even, like Python's round().
+    """
+    k_a = k_factors(ratings_a)
+    k_b = k_factors(ratings_b)
+
+    expected_a = 1 / (1 + 10 ** ((ratings_b - ratings_a) / 400))
+    expected_b = 1 - expected_a
+
+    results_b = 1.0 - results_a
+
+    new_a = ratings_a + k_a * (results_a - expected_a)
+    new_b = ratings_b + k_b * (results_b - expected_b)
+    return np.rint(new_a), np.rint(new_b)
+
+
+def assign_waves(white, black, num_players):
+    """
+    Wave number per game: one more than the latest wave either player was already in.
+    Games in one wave share no player, and each player's games keep their order.
+    """
+    last_wave = np.zeros(num_players, dtype=np.int64)
+    waves = np.empty(len(white), dtype=np.int64)
+    for i, (w, b) in enumerate(zip(white.tolist(), black.tolist())):
+        wave = max(last_wave[w], last_wave[b]) + 1
+        waves[i] = wave
+        last_wave[w] = last_wave[b] = wave
+    return waves
+
+
+def apply_chunk(ratings, white, black, results):
+    """
+    Apply one chronological chunk of games to ratings (in place), wave by wave.
+    """
+    waves = assign_waves(white, black, len(ratings))
+    order = np.argsort(waves, kind="stable")
+    bounds = np.flatnonzero(np.diff(waves[order])) + 1
+    for idx in np.split(order, bounds):
+        w, b = white[idx], black[idx]
+        new_w, new_b = calculate_elo_arrays(ratings[w], ratings[b], results[idx])
+        ratings[w] = new_w
+        ratings[b] = new_b
+
+
+def stream_games(conn, player_index, chunk_size=CHUNK_SIZE):
+    """
+    Yield (white, black, result_white) arrays of finished games in end_time order.
+    Games whose winner is neither player are skipped (there is no result to apply).
+    """
+    cur = conn.execute(
+        """
+        SELECT white_id, black_id, winner_id FROM Game
+        WHERE status = 'FINISHED'
+        ORDER BY end_time, game_id
+        """
+    )
+    while True:
+        rows = cur.fetchmany(chunk_size)
+        if not rows:
+            return
+        white, black, results = [], [], []
+        for white_id, black_id, winner_id in rows:
+            if winner_id is None:
+                result = 0.5
+            elif winner_id == white_id:
+                result = 1.0
+            elif winner_id == black_id:
+                result = 0.0
+            else:
+                continue
+            w, b = player_index.get(white_id), player_index.get(black_id)
+            if w is None or b is None:
+                continue
+            white.append(w)
+            black.append(b)
+            results.append(result)
+        yield (np.array(white, dtype=np.int64), np.array(black, dtype=np.int64),
+               np.array(results, dtype=np.float64))
+
+
+def recompute(initial=DEFAULT_INITIAL_ELO, dry_run=False, chunk_size=CHUNK_SIZE):
+    """
+    Replay all finished games and (unless dry_run) store the new ratings.
+    Returns {player_id: elo}.
+    """
+    conn = get_connection()
+    player_ids = [row[0] for row in conn.execute("SELECT player_id FROM Player")]
+    player_index = {pid: i for i, pid in enumerate(player_ids)}
+    ratings = np.full(len(player_ids), float(initial))
+
+    games = 0
+    for white, black, results in stream_games(conn, player_index, chunk_size):
+        apply_chunk(ratings, white, black, results)
+        games += len(white)
+
+    new_elos = {pid: int(elo) for pid, elo in zip(player_ids, ratings.tolist())}
+    if not dry_run:
+        with transaction(conn) as conn:
+            conn.executemany(
+                "UPDATE Player SET elo = ? WHERE player_id = ?",
+                [(elo, pid) for pid, elo in new_elos.items()]
+            )
+        rank_index.reset()
+    return new_elos, games
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute all ELO ratings from game history")
+    parser.add_argument("--initial", type=int, default=DEFAULT_INITIAL_ELO,
+                        help="rating every player starts from")
+    parser.add_argument("--dry-run", action="store_true", help="compute but do not write")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    new_elos, games = recompute(args.initial, args.dry_run)
+    elapsed = time.perf_counter() - start
+    action = "computed" if args.dry_run else "updated"
+    print(f"Replayed {games} games, {action} {len(new_elos)} ratings in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
+# K-factor: K_LOW below K_THRESHOLD, K_HIGH from it on.
+# elo_recompute.py calls get_k_factor too, so changing the rule here changes both.
+K_THRESHOLD = 1300
+K_LOW = 24
+K_HIGH = 32
+
 def get_k_factor(rating):
-    if rating < 1300:
-        return 24
-    return 32
+    if rating < K_THRESHOLD:
+        return K_LOW
+    return K_HIGH
 
 def calculate_elo(player_a_rating, player_b_rating, result_a):
     """
@@ -0,0 +1,84 @@
+"""
+Flag-fall deadlines of running games, for ending games on time without a MOVE.
+
+Each ongoing game has at most one deadline: the wall-clock time at which the side
+to move runs out (their remaining time after the last move). Deadlines sit in a
+min-heap; rescheduling a game just pushes a new entry and the old one is skipped
+when it surfaces, so every move costs O(log n) and the owner only has to wake up
+at next_deadline().
+"""
+import heapq
+import itertools
+import math
+
+
+def flag_deadline(fen, white_time, black_time, last_move_time, grace=0.0):
+    """
+    When the side to move in this position flags, or None while the clock is not
+    running (games created before clocks started at creation, until their first move).
+    grace: extra seconds to wait, e.g. for a move still in transit.
+    """
+    if not last_move_time:
+        return None
+    try:
+        started = float(last_move_time)
+    except ValueError:
+        return None
+    parts = (fen or "").split()
+    white_to_move = len(parts) < 2 or parts[1] != 'b'
+    remaining = white_time if white_to_move else black_time
+    if remaining is None:
+        return None
+    return started + max(remaining, 0.0) + grace
+
+
+class FlagScheduler:
+    def __init__(self):
+        self.heap = []          # (deadline, seq, game_id)
+        self.deadlines = {}     # game_id -> (deadline, seq) of its live entry
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def __contains__(self, game_id):
+        return game_id in self.deadlines
+
+    def schedule(self, game_id, deadline):
+        """
+        Set (or replace) a game's deadline. Returns True if it is now the earliest one,
+        i.e. whoever sleeps until next_deadline() has to wake up sooner.
+        """
+        entry = (deadline, next(self.seq))
+        self.deadlines[game_id] = entry
+        heapq.heappush(self.heap, (entry[0], entry[1], game_id))
+        # Superseded entries are skipped lazily; compact if they pile up
+        if len(self.heap) > 2 * len(self.deadlines) + 64:
+            self.heap = [(d, s, g) for g, (d, s) in self.deadlines.items()]
+            heapq.heapify(self.heap)
+        return self.next_deadline() == deadline
+
+    def cancel(self, game_id):
+        return self.deadlines.pop(game_id, None) is not None
+
+    def _discard_stale(self):
+        while self.heap:
+            deadline, seq, game_id = self.heap[0]
+            if self.deadlines.get(game_id) == (deadline, seq):
+                return
+            heapq.heappop(self.heap)
+
+    def next_deadline(self):
+        self._discard_stale()
+        return self.heap[0][0] if self.heap else math.inf
+
+    def pop_due(self, now):
+        """
+        Remove and return the games whose deadline is <= now, earliest first.
+        """
+        due = []
+        while self.next_deadline() <= now:
+            _, _, game_id = heapq.heappop(self.heap)
+            del self.deadlines[game_id]
+            due.append(game_id)
+        return due
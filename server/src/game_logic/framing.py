@@ -0,0 +1,151 @@
+"""
+Message framing shared by the Python servers and the UI client.
+
+Connections start in LINE mode (newline-delimited JSON, what StreamServer and the
+logic workers speak). A client may offer other modes in a HELLO; the async server
+answers with the one it picked, in the old mode, and both sides switch right after:
+    {"type": "HELLO", "framing": ["length", "line"]}  ->  {"type": "HELLO", "framing": "length"}
+Servers that don't know HELLO answer with an error, so the client stays on LINE.
+
+    line    JSON + b"\\n"
+    length  4-byte big-endian body length + JSON; the reader knows the size up front,
+            so it receives the body in place without scanning for a delimiter.
+
+Every message is encoded into one buffer and sent with a single write, and sockets
+get TCP_NODELAY, so a small message never waits on Nagle / delayed ACK.
+"""
+import json
+import socket
+import struct
+
+LINE = "line"
+LENGTH = "length"
+PREFERRED = (LENGTH, LINE)     # our order of preference when negotiating
+HEADER = struct.Struct("!I")
+MAX_MESSAGE_BYTES = 1024 * 1024
+READ_BUFFER_BYTES = 64 * 1024
+
+
+class FramingError(ValueError):
+    pass
+
+
+def negotiate(offered):
+    """
+    Pick the mode to use from the ones a peer offered (LINE if none is known).
+    """
+    if isinstance(offered, str):
+        offered = [offered]
+    for mode in PREFERRED:
+        if mode in (offered or ()):
+            return mode
+    return LINE
+
+
+def encode(message, mode=LINE):
+    """
+    One complete frame (header and body together) for a single write.
+    """
+    body = json.dumps(message).encode("utf-8")
+    if mode == LENGTH:
+        return HEADER.pack(len(body)) + body
+    return body + b"\n"
+
+
+def set_nodelay(sock):
+    """
+    Disable Nagle on TCP sockets; other sockets (e.g. AF_UNIX) are left alone.
+    """
+    if sock is None:
+        return
+    try:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    except (OSError, AttributeError):
+        pass
+
+
+class FrameReader:
+    """
+    Reads frames from a blocking socket into one reusable bytearray.
+
+    Data is received with recv_into() through a memoryview, so it is copied once
+    (kernel -> buffer) and decoded straight out of the buffer. Consumed bytes are
+    reclaimed by sliding the unread tail to the front; the buffer only grows for a
+    frame bigger than itself.
+    """
+
+    def __init__(self, sock, mode=LINE, size=READ_BUFFER_BYTES):
+        self.sock = sock
+        self.mode = mode
+        self.buf = bytearray(size)
+        self.start = 0      # first unread byte
+        self.end = 0        # end of received data
+
+    def _make_room(self, need):
+        # Room for `need` unread bytes from self.start on
+        pending = self.end - self.start
+        if self.start:
+            self.buf[:pending] = self.buf[self.start:self.end]
+            self.start, self.end = 0, pending
+        if need > len(self.buf):
+            self.buf.extend(bytes(max(need, 2 * len(self.buf)) - len(self.buf)))
+
+    def _fill(self, need):
+        """
+        Receive until at least `need` unread bytes are buffered. False on EOF.
+        """
+        while self.end - self.start < need:
+            if self.start + need > len(self.buf) or self.end == len(self.buf):
+                self._make_room(need)
+            with memoryview(self.buf) as view:
+                n = self.sock.recv_into(view[self.end:])
+            if not n:
+                return False
+            self.end += n
+        return True
+
+    def _take(self, begin, stop, next_start):
+        with memoryview(self.buf) as view:
+            text = str(view[begin:stop], "utf-8")
+        self.start = next_start
+        if self.start == self.end:
+            self.start = self.end = 0
+        return text
+
+    def read_frame(self):
+        """
+        Next frame body as text, or None once the peer closed the connection.
+        """
+        if self.mode == LENGTH:
+            if not self._fill(HEADER.size):
+                return None
+            (size,) = HEADER.unpack_from(self.buf, self.start)
+            if size > MAX_MESSAGE_BYTES:
+                raise FramingError("Message too long")
+            if not self._fill(HEADER.size + size):
+                return None
+            begin = self.start + HEADER.size
+            return self._take(begin, begin + size, begin + size)
+
+        scanned = 0     # unread bytes already searched for the newline
+        while True:
+            pos = self.buf.find(b"\n", self.start + scanned, self.end)
+            if pos >= 0:
+                stop = pos - 1 if pos > self.start and self.buf[pos - 1] == 0x0D else pos
+                return self._take(self.start, stop, pos + 1)
+            scanned = self.end - self.start
+            if scanned > MAX_MESSAGE_BYTES:
+                raise FramingError("Message too long")
+            if not self._fill(scanned + 1):
+                return None
+
+    def read(self):
+        """
+        Next message decoded from JSON (blank lines skipped), or None on EOF.
+        """
+        while True:
+            text = self.read_frame()
+            if text is None:
+                return None
+            if text.strip():
+                return json.loads(text)
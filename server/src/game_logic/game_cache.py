@@ -0,0 +1,81 @@
+"""
+Write-through cache of live (ONGOING) games for the MOVE hot path.
+
+Each entry is the MOVE_STATE_COLUMNS dict apply_move would read, plus a parsed
+chess.Board under 'board'. A cached move skips both the Game SELECT and FEN parsing;
+every change is still written to SQLite in the move's transaction, and the entry is
+only updated after that transaction commits.
+
+Only valid while this process is the sole writer of the Game rows it caches
+(the async server). Pre-forked serve-mode workers must not use it: each would keep
+its own copy and go stale as soon as another worker moved in the same game.
+"""
+import threading
+
+import chess
+
+from db_handler import apply_move
+from init_db import INITIAL_FEN
+from lru import LRUCache
+
+DEFAULT_MAX_GAMES = 10000
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# Measured with tracemalloc: board with an empty move stack plus the state dict
+ENTRY_BYTES = 1536
+
+
+class GameCache:
+    def __init__(self, max_games=DEFAULT_MAX_GAMES, max_bytes=DEFAULT_MAX_BYTES):
+        self.games = LRUCache(max_entries=max_games, max_bytes=max_bytes,
+                              sizeof=lambda entry: ENTRY_BYTES)
+        # One move at a time: the entry is mutated in place while its transaction runs
+        self.lock = threading.RLock()
+
+    def apply_move(self, game_id, resolve):
+        """
+        db_handler.apply_move with the state served from (and written back to) the cache.
+        On a miss the row is read as usual and the board is parsed once.
+        """
+        with self.lock:
+            entry = self.games.get(game_id)
+            loaded = []
+
+            def resolve_with_board(game):
+                if game is not None and game.get('board') is None:
+                    game['board'] = chess.Board(game['current_fen'] or INITIAL_FEN)
+                updates, move, result = resolve(game)
+                loaded.append((game, updates))
+                return updates, move, result
+
+            try:
+                result = apply_move(game_id, resolve_with_board, state=entry)
+            except BaseException:
+                # resolve may have touched the board before the rollback
+                self.games.pop(game_id)
+                raise
+
+            game, updates = loaded[0]
+            if game is not None:
+                game.update(updates)
+                # Keep the board small: the cache never needs the move history
+                game['board'].clear_stack()
+                if game['status'] == 'ONGOING':
+                    self.games.put(game_id, game)
+                else:
+                    self.games.pop(game_id)
+            return result
+
+    def invalidate(self, game_id):
+        """
+        Drop a game after something other than apply_move wrote its row.
+        """
+        with self.lock:
+            self.games.pop(game_id)
+
+    def clear(self):
+        with self.lock:
+            self.games.clear()
+
+    def stats(self):
+        return self.games.stats()
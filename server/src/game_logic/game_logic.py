@@ -1,42 +1,268 @@
+from collections import namedtuple
+
 import chess.pgn
+import chess.polyglot
+
+from lru import LRUCache
 
 def validate_move(fen, move_uci):
     """
     Validate move based on FEN and move in UCI format (e.g., 'e2e4')
     """
-    board = chess.Board(fen)
+    check = check_move(fen, move_uci)
+    return check.is_valid, check.next_fen
+
+def push_if_legal(board, move_uci):
+    """
+    Play move_uci on an existing board if it is legal. Returns True if it was played.
+    """
     move = chess.Move.from_uci(move_uci)
     if move in board.legal_moves:
         board.push(move)
-        return True, board.fen()
-    else:
-        return False, fen
+        return True
+    return False
 
-def determine_result(fen):
-    board = chess.Board(fen)
-    if board.is_checkmate():
-        return "checkmate"
-    elif board.is_stalemate():
-        return "draw"
+# Legal moves only depend on placement, side to move, castling and en passant (the
+# first four FEN fields), so positions reached by different move orders share entries.
+LEGAL_MOVES_CACHE_ENTRIES = 50000
+legal_moves_cache = LRUCache(max_entries=LEGAL_MOVES_CACHE_ENTRIES)
+
+def legal_moves(fen, board=None):
+    """
+    All legal moves of a position as UCI strings. Pass board if it is already parsed.
+    """
+    key = " ".join(fen.split()[:4])
+    moves = legal_moves_cache.get(key)
+    if moves is None:
+        if board is None:
+            board = chess.Board(fen)
+        moves = tuple(move.uci() for move in board.legal_moves)
+        legal_moves_cache.put(key, moves)
+    return list(moves)
+
+def determine_result(fen, repetitions=1):
+    parsed = _split_fen(fen)
+    if parsed is None:
+        return board_result(chess.Board(fen), repetitions)
+    key, halfmove_clock, _ = parsed
+    result = transposition_cache.get((key, None))
+    if result is None:
+        result = _position_result(chess.Board(fen))
+        transposition_cache.put((key, None), result)
+    return apply_draw_rules(result, halfmove_clock, repetitions)
+
+def board_result(board, repetitions=1):
+    """
+    repetitions: how many times the current position has occurred in the game
+    (see db_handler.record_position). Threefold repetition and the fifty-move rule
+    end the game as a draw without either player having to claim it.
+    """
+    return apply_draw_rules(_position_result(board), board.halfmove_clock, repetitions)
+
+def _position_result(board):
+    # Outcome decided by the pieces alone (not by the move counters or game history).
+    # One legal-move probe answers both checkmate and stalemate.
+    if not any(board.generate_legal_moves()):
+        return "checkmate" if board.is_check() else "draw"
     elif board.is_insufficient_material():
         return "draw"
-    elif board.is_seventyfive_moves():
-        return "draw"
     else:
         return "in_progress"
 
-def export_pgn(moves, white_name, black_name, result, date, event="Network Chess Game"):
+def apply_draw_rules(result, halfmove_clock=0, repetitions=1):
+    """
+    Add threefold repetition and the fifty-move rule to a position's result.
+    """
+    if result == "in_progress" and (repetitions >= 3 or halfmove_clock >= 100):
+        return "draw"
+    return result
+
+def position_hash(board):
+    """
+    Polyglot Zobrist hash of the position (pieces, side to move, castling rights,
+    en passant), as a signed 64-bit int so SQLite can store it as an INTEGER.
+    """
+    h = chess.polyglot.zobrist_hash(board)
+    return h - (1 << 64) if h >= (1 << 63) else h
+
+INITIAL_POSITION_HASH = position_hash(chess.Board())
+
+# ========== Transposition cache ==========
+# Shared by every handler that validates moves. Keyed by the first four FEN fields
+# (the position itself, compared exactly, so no hash collisions) and the UCI move.
+# The move counters are not part of the key: the next FEN's counters and the
+# fifty-move rule are worked out from the caller's FEN, the same way push() would.
+
+TRANSPOSITION_CACHE_BYTES = 16 * 1024 * 1024
+_ENTRY_OVERHEAD = 300  # tuple, key and namedtuple headers (measured with tracemalloc)
+
+# Result of check_move. result is board_result() of the position after the move
+# (of the unchanged position if the move is illegal), before repetitions are applied.
+MoveCheck = namedtuple("MoveCheck", "is_valid next_fen result position_hash halfmove_clock")
+
+# What is cached per (position, move): counters left out of next_position
+_MoveOutcome = namedtuple("_MoveOutcome", "is_valid next_position zeroing result position_hash")
+
+def _entry_size(value):
+    if isinstance(value, _MoveOutcome):
+        return _ENTRY_OVERHEAD + 2 * len(value.next_position or "")
+    return _ENTRY_OVERHEAD
+
+transposition_cache = LRUCache(max_bytes=TRANSPOSITION_CACHE_BYTES, sizeof=_entry_size)
+
+def _split_fen(fen):
+    """
+    (position key, halfmove clock, fullmove number) as chess.Board(fen) would read
+    them, or None for FENs the cache leaves to python-chess (short or malformed ones).
+    """
+    if not isinstance(fen, str):
+        return None
+    parts = fen.split()
+    if len(parts) != 6:
+        return None
+    try:
+        halfmove_clock, fullmove_number = int(parts[4]), int(parts[5])
+    except ValueError:
+        return None
+    if halfmove_clock < 0 or fullmove_number < 0:
+        return None
+    return " ".join(parts[:4]), halfmove_clock, max(fullmove_number, 1)
+
+def _check_move_uncached(fen, move_uci, board=None):
+    if board is None:
+        board = chess.Board(fen)
+    if not push_if_legal(board, move_uci):
+        return MoveCheck(False, fen, board_result(board), None, board.halfmove_clock)
+    return MoveCheck(True, board.fen(), board_result(board), position_hash(board),
+                     board.halfmove_clock)
+
+def check_move(fen, move_uci, board=None):
+    """
+    validate_move plus the result and Zobrist hash of the position after the move,
+    through the transposition cache. Answers are identical to the uncached path.
+
+    board: the already-parsed position of fen, if the caller has one. It is used on a
+    miss instead of parsing fen, and either way ends up with the move played if valid.
+    """
+    parsed = _split_fen(fen)
+    if parsed is None or not isinstance(move_uci, str):
+        return _check_move_uncached(fen, move_uci, board)
+    key, halfmove_clock, fullmove_number = parsed
+
+    outcome = transposition_cache.get((key, move_uci))
+    if outcome is None:
+        if board is None:
+            board = chess.Board(fen)
+        if not push_if_legal(board, move_uci):
+            result = _position_result(board)
+            transposition_cache.put((key, move_uci), _MoveOutcome(False, None, False, result, None))
+            return MoveCheck(False, fen, apply_draw_rules(result, halfmove_clock), None,
+                             halfmove_clock)
+        result = _position_result(board)
+        next_fen = board.fen()
+        next_hash = position_hash(board)
+        transposition_cache.put((key, move_uci), _MoveOutcome(
+            True, next_fen.rsplit(" ", 2)[0], board.halfmove_clock == 0, result, next_hash))
+        return MoveCheck(True, next_fen, apply_draw_rules(result, board.halfmove_clock),
+                         next_hash, board.halfmove_clock)
+
+    if not outcome.is_valid:
+        return MoveCheck(False, fen, apply_draw_rules(outcome.result, halfmove_clock), None,
+                         halfmove_clock)
+
+    if board is not None:
+        board.push(chess.Move.from_uci(move_uci))
+    next_halfmove = 0 if outcome.zeroing else halfmove_clock + 1
+    black_moved = key.split()[1] == "b"
+    next_fullmove = fullmove_number + 1 if black_moved else fullmove_number
+    return MoveCheck(True, f"{outcome.next_position} {next_halfmove} {next_fullmove}",
+                     apply_draw_rules(outcome.result, next_halfmove), outcome.position_hash,
+                     next_halfmove)
+
+def _check_one(fen, move_uci):
+    if not isinstance(fen, str):
+        return {"is_valid": False, "error": "Missing FEN"}
+    try:
+        check = check_move(fen, move_uci)
+    except (TypeError, ValueError) as e:
+        return {"is_valid": False, "error": str(e)}
+    return {"is_valid": check.is_valid, "next_fen": check.next_fen, "result": check.result}
+
+def validate_pairs(pairs):
+    """
+    validate_move + determine_result for independent (fen, move_uci) pairs.
+    Each item: {"is_valid", "next_fen", "result"}, or {"is_valid": False, "error"}
+    if the FEN or move could not be parsed.
+    """
+    return [_check_one(fen, move_uci) for fen, move_uci in pairs]
+
+def validate_sequence(fen, moves):
+    """
+    Play moves one after another from fen. Items have the validate_pairs shape;
+    repetition counts are kept along the line. Once a move is invalid or the game
+    has ended, the remaining moves are reported as errors and not tried.
+    """
+    try:
+        board = chess.Board(fen)
+    except (TypeError, ValueError) as e:
+        return [{"is_valid": False, "error": str(e)} for _ in moves]
+
+    seen = {position_hash(board): 1}
+    repetitions = 1
+    results = []
+    stop_reason = None
+    for move_uci in moves:
+        if stop_reason:
+            results.append({"is_valid": False, "error": stop_reason})
+            continue
+        try:
+            is_valid = push_if_legal(board, move_uci)
+        except (TypeError, ValueError) as e:
+            is_valid, error = False, str(e)
+        else:
+            error = None
+        if not is_valid:
+            item = {"is_valid": False, "next_fen": board.fen(),
+                    "result": board_result(board, repetitions)}
+            if error:
+                item["error"] = error
+            results.append(item)
+            stop_reason = "follows an invalid move"
+            continue
+
+        h = position_hash(board)
+        repetitions = seen[h] = seen.get(h, 0) + 1
+        result = board_result(board, repetitions)
+        results.append({"is_valid": True, "next_fen": board.fen(), "result": result})
+        if result != "in_progress":
+            stop_reason = "game is over"
+    return results
+
+_parsed_moves = {}   # UCI -> chess.Move (immutable); at most 64*64*5 entries
+
+def export_pgn(moves, white_name, black_name, result, date, event="Network Chess Game",
+               verify=False):
     """
     Generate PGN string from a list of UCI moves.
+
+    By default the movetext is written as SAN is generated, without building a
+    chess.pgn tree; each move only gets a board.is_legal check, and a history with an
+    illegal move (old, never validated Move rows) falls back to the chess.pgn replay,
+    which skips illegal moves. verify=True always takes that replay. Both give the
+    same text.
     """
+    headers = (("Event", event), ("Site", "Local Server"), ("Date", date), ("Round", "1"),
+               ("White", white_name), ("Black", black_name), ("Result", result))
+    if not verify:
+        try:
+            return "\n".join([f'[{tag} "{value}"]' for tag, value in headers]
+                             + ["", _pgn_movetext(moves, result)])
+        except ValueError:
+            pass  # Not a legal history: the replay below skips the illegal moves
+
     game = chess.pgn.Game()
-    game.headers["Event"] = event
-    game.headers["Site"] = "Local Server"
-    game.headers["Date"] = date
-    game.headers["Round"] = "1"
-    game.headers["White"] = white_name
-    game.headers["Black"] = black_name
-    game.headers["Result"] = result
+    for tag, value in headers:
+        game.headers[tag] = value
 
     # Replay moves to build the game node tree
     node = game
@@ -50,4 +276,22 @@ def export_pgn(moves, white_name, black_name, result, date, event="Network Chess
     
     return str(game)
 
+def _pgn_movetext(moves, result):
+    """
+    Movetext as str(chess.pgn.Game) writes it: one line, "1. e4 e5 2. Nf3 ... result".
+    """
+    board = chess.Board()
+    tokens = []
+    for move_uci in moves:
+        move = _parsed_moves.get(move_uci)
+        if move is None:
+            move = _parsed_moves[move_uci] = chess.Move.from_uci(move_uci)
+        if not board.is_legal(move):
+            raise ValueError(f"Illegal move in history: {move_uci}")
+        if board.turn == chess.WHITE:
+            tokens.append(f"{board.fullmove_number}.")
+        tokens.append(board.san_and_push(move))
+    tokens.append(result)
+    return " ".join(tokens)
+
 
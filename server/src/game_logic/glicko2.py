@@ -0,0 +1,104 @@
+"""
+Glicko-2 ratings, computed one rating period at a time for all players at once.
+
+Unlike elo_system.calculate_elo (one game, two players, applied as each game ends),
+Glicko-2 rates every player from all of their results in a period, using the
+ratings as they stood at the start of the period. rate_period does this with NumPy
+over arrays of players and games; rating_period.py is the batch job that feeds it.
+
+Reference: Mark Glickman, "Example of the Glicko-2 system" (2013).
+"""
+import numpy as np
+
+DEFAULT_RATING = 1500.0
+DEFAULT_RD = 350.0
+DEFAULT_VOLATILITY = 0.06
+
+TAU = 0.5           # constrains volatility change per period
+EPSILON = 1e-6      # convergence tolerance of the volatility iteration
+MAX_ITERATIONS = 100
+SCALE = 173.7178    # Glicko <-> Glicko-2 scale factor
+
+
+def _g(phi):
+    return 1 / np.sqrt(1 + 3 * phi ** 2 / np.pi ** 2)
+
+
+def _solve_volatility(delta, phi, v, sigma):
+    """
+    Step 5 of the algorithm (Illinois method), for every player in the arrays at once.
+    Entries stop moving as soon as their own bracket is within EPSILON.
+    """
+    a = np.log(sigma ** 2)
+    delta2, phi2 = delta ** 2, phi ** 2
+
+    def f(x):
+        ex = np.exp(x)
+        return ex * (delta2 - phi2 - v - ex) / (2 * (phi2 + v + ex) ** 2) - (x - a) / TAU ** 2
+
+    # Initial bracket [A, B] with f(A) and f(B) of opposite sign
+    A = a.copy()
+    big = delta2 > phi2 + v
+    B = np.where(big, np.log(np.where(big, delta2 - phi2 - v, 1.0)), a - TAU)
+    searching = ~big & (f(B) < 0)
+    k = 1
+    while searching.any():
+        k += 1
+        B = np.where(searching, a - k * TAU, B)
+        searching &= f(B) < 0
+
+    fA, fB = f(A), f(B)
+    active = np.abs(B - A) > EPSILON
+    for _ in range(MAX_ITERATIONS):
+        if not active.any():
+            break
+        C = A + (A - B) * fA / (fB - fA)
+        fC = f(C)
+        swap = active & (fC * fB <= 0)
+        A = np.where(swap, B, A)
+        fA = np.where(swap, fB, np.where(active, fA / 2, fA))
+        B = np.where(active, C, B)
+        fB = np.where(active, fC, fB)
+        active &= np.abs(B - A) > EPSILON
+    return np.exp(A / 2)
+
+
+def rate_period(ratings, rds, volatilities, white, black, results_white):
+    """
+    New (ratings, rds, volatilities) after one rating period.
+
+    ratings / rds / volatilities: float arrays, one entry per player.
+    white / black: player indexes of each game in the period; results_white: 1, 0.5 or 0.
+    Players without games keep their rating and volatility; their RD grows.
+    """
+    mu = (ratings - DEFAULT_RATING) / SCALE
+    phi = rds / SCALE
+    sigma = volatilities
+    n = len(ratings)
+
+    # Every game counts once for each side
+    player = np.concatenate([white, black])
+    opponent = np.concatenate([black, white])
+    score = np.concatenate([results_white, 1 - results_white])
+
+    g = _g(phi[opponent])
+    expected = 1 / (1 + np.exp(-g * (mu[player] - mu[opponent])))
+    v_inv = np.bincount(player, weights=g ** 2 * expected * (1 - expected), minlength=n)
+    score_sum = np.bincount(player, weights=g * (score - expected), minlength=n)
+
+    new_mu, new_phi, new_sigma = mu.copy(), np.sqrt(phi ** 2 + sigma ** 2), sigma.copy()
+
+    rated = v_inv > 0
+    if rated.any():
+        v = 1 / v_inv[rated]
+        delta = v * score_sum[rated]
+        sigma_r = _solve_volatility(delta, phi[rated], v, sigma[rated])
+        phi_star = np.sqrt(phi[rated] ** 2 + sigma_r ** 2)
+        phi_r = 1 / np.sqrt(1 / phi_star ** 2 + 1 / v)
+        new_mu[rated] = mu[rated] + phi_r ** 2 * score_sum[rated]
+        new_phi[rated] = phi_r
+        new_sigma[rated] = sigma_r
+
+    # An unrated player's RD never exceeds the starting value
+    new_rd = np.minimum(new_phi * SCALE, DEFAULT_RD)
+    return new_mu * SCALE + DEFAULT_RATING, new_rd, new_sigma
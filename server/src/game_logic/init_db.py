@@ -1,9 +1,62 @@
 import sqlite3
+from itertools import groupby
 from database import get_connection
+from move_codec import pack_moves
 
 # Starting position FEN
 INITIAL_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
 
+SECONDARY_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_move_game ON Move(game_id, move_id)",
+    "CREATE INDEX IF NOT EXISTS idx_game_white ON Game(white_id)",
+    "CREATE INDEX IF NOT EXISTS idx_game_black ON Game(black_id)",
+    "CREATE INDEX IF NOT EXISTS idx_game_status ON Game(status)",
+    "CREATE INDEX IF NOT EXISTS idx_lobby_joined_at ON Lobby(joined_at)",
+    "CREATE INDEX IF NOT EXISTS idx_player_elo ON Player(elo, player_id)",
+    "CREATE INDEX IF NOT EXISTS idx_game_finished_end ON Game(status, end_time)",
+    "CREATE INDEX IF NOT EXISTS idx_archive_end ON GameArchive(end_time)",
+]
+
+# One-off fill of PlayerStats from games finished before the table existed
+BACKFILL_PLAYER_STATS = """
+    INSERT INTO PlayerStats (player_id, wins, losses, draws)
+    SELECT player_id, SUM(win), SUM(loss), SUM(draw) FROM (
+        SELECT white_id AS player_id,
+               COALESCE(winner_id = white_id, 0) AS win,
+               COALESCE(winner_id = black_id, 0) AS loss,
+               winner_id IS NULL AS draw
+        FROM Game WHERE status = 'FINISHED'
+        UNION ALL
+        SELECT black_id,
+               COALESCE(winner_id = black_id, 0),
+               COALESCE(winner_id = white_id, 0),
+               winner_id IS NULL
+        FROM Game WHERE status = 'FINISHED'
+    )
+    GROUP BY player_id
+"""
+
+def migrate_move_rows(cur):
+    """
+    Pack per-ply Move rows into GameMoves, one blob per game, and drop the packed rows.
+    """
+    rows = cur.execute("""
+        SELECT game_id, move_notation FROM Move
+        WHERE game_id NOT IN (SELECT game_id FROM GameMoves)
+        ORDER BY game_id, move_id
+    """).fetchall()
+    packed = []
+    for game_id, group in groupby(rows, key=lambda row: row[0]):
+        try:
+            packed.append((game_id, pack_moves([row[1] for row in group])))
+        except ValueError:
+            pass  # Not UCI: leave that game's rows where they are
+    if packed:
+        cur.executemany("INSERT INTO GameMoves (game_id, moves) VALUES (?, ?)", packed)
+        cur.executemany("DELETE FROM Move WHERE game_id = ?", [(g,) for g, _ in packed])
+        print(f"✅ Packed the moves of {len(packed)} games into GameMoves")
+
+
 def init_db():
     conn = get_connection()
     cur = conn.cursor()
@@ -14,10 +67,28 @@ def init_db():
             player_id INTEGER PRIMARY KEY AUTOINCREMENT,
             username TEXT NOT NULL UNIQUE,
             password TEXT NOT NULL,
-            elo INTEGER DEFAULT 1000
+            elo INTEGER DEFAULT 1000,
+            glicko_rating REAL DEFAULT 1500.0,
+            glicko_rd REAL DEFAULT 350.0,
+            glicko_vol REAL DEFAULT 0.06
         )
     """)
 
+    # Migration: Glicko-2 columns (written by rating_period.py)
+    player_migrations = [
+        ("ALTER TABLE Player ADD COLUMN glicko_rating REAL DEFAULT 1500.0", "glicko_rating"),
+        ("ALTER TABLE Player ADD COLUMN glicko_rd REAL DEFAULT 350.0", "glicko_rd"),
+        ("ALTER TABLE Player ADD COLUMN glicko_vol REAL DEFAULT 0.06", "glicko_vol")
+    ]
+
+    for sql, col_name in player_migrations:
+        try:
+            cur.execute(sql)
+            conn.commit()
+            print(f"✅ Added {col_name} column to existing Player table")
+        except sqlite3.OperationalError:
+            pass  # Column already exists, no need to add
+
     # Bảng Game
     cur.execute("""
         CREATE TABLE IF NOT EXISTS Game (
@@ -79,6 +150,39 @@ def init_db():
         )
     """)
 
+    # Bảng GameMoves: each game's moves as one packed blob of 16-bit codes (see move_codec),
+    # appended to on every move. Move above only keeps rows from before this table existed
+    # whose notation is not plain UCI.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS GameMoves (
+            game_id INTEGER PRIMARY KEY,
+            moves BLOB NOT NULL DEFAULT x'',
+            FOREIGN KEY (game_id) REFERENCES Game(game_id)
+        )
+    """)
+    migrate_move_rows(cur)
+
+    # Bảng GameArchive: finished games moved out of GameMoves/GamePosition by archive.py.
+    # data = zlib(JSON headers + "\n" + packed moves), see move_codec.pack_archive
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS GameArchive (
+            game_id INTEGER PRIMARY KEY,
+            end_time TEXT,
+            data BLOB NOT NULL,
+            FOREIGN KEY (game_id) REFERENCES Game(game_id)
+        )
+    """)
+
+    # Bảng GamePgn: PGN of finished games, rendered once in the background (see
+    # logic_wrapper pre_export_pgn) for get_pgn and bulk exports
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS GamePgn (
+            game_id INTEGER PRIMARY KEY,
+            pgn TEXT NOT NULL,
+            FOREIGN KEY (game_id) REFERENCES Game(game_id)
+        )
+    """)
+
     # Bảng Lobby (Ready Players)
     cur.execute("""
         CREATE TABLE IF NOT EXISTS Lobby (
@@ -88,6 +192,66 @@ def init_db():
         )
     """)
 
+    # Bảng GamePosition: how often each position (Zobrist hash) has occurred in a game,
+    # for repetition draws. Rows before the last capture/pawn move are pruned.
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS GamePosition (
+            game_id INTEGER NOT NULL,
+            position_hash INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 1,
+            PRIMARY KEY (game_id, position_hash),
+            FOREIGN KEY (game_id) REFERENCES Game(game_id)
+        ) WITHOUT ROWID
+    """)
+
+    # Bảng PlayerStats: win/loss/draw totals, kept up to date as games finish
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS PlayerStats (
+            player_id INTEGER PRIMARY KEY,
+            wins INTEGER NOT NULL DEFAULT 0,
+            losses INTEGER NOT NULL DEFAULT 0,
+            draws INTEGER NOT NULL DEFAULT 0,
+            FOREIGN KEY (player_id) REFERENCES Player(player_id)
+        )
+    """)
+    if cur.execute("SELECT COUNT(*) FROM PlayerStats").fetchone()[0] == 0:
+        cur.execute(BACKFILL_PLAYER_STATS)
+
+    # Bảng RatingPeriod: Glicko-2 periods already rated (games with end_time in
+    # (period_start, period_end])
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS RatingPeriod (
+            period_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            period_start TEXT,
+            period_end TEXT NOT NULL,
+            games INTEGER NOT NULL,
+            processed_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Bảng RatingVersion: bumped by the triggers below in the same transaction as
+    # any change to the set of ratings, so rank_index only rebuilds when they change
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS RatingVersion (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            version INTEGER NOT NULL
+        )
+    """)
+    cur.execute("INSERT OR IGNORE INTO RatingVersion (id, version) VALUES (0, 0)")
+    for name, event in (("player_rating_insert", "INSERT ON Player"),
+                        ("player_rating_update", "UPDATE OF elo ON Player WHEN OLD.elo IS NOT NEW.elo"),
+                        ("player_rating_delete", "DELETE ON Player")):
+        cur.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {name} AFTER {event}
+            BEGIN
+                UPDATE RatingVersion SET version = version + 1 WHERE id = 0;
+            END
+        """)
+
+    # Secondary indexes (replay/log reads, games by player, lobby order)
+    for sql in SECONDARY_INDEXES:
+        cur.execute(sql)
+
     conn.commit()
     conn.close()
     print("✅ Database initialized successfully!")
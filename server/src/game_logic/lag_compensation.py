@@ -0,0 +1,85 @@
+"""
+Network lag compensation for time control.
+
+The async server pings the connections that opted in (HELLO) and keeps a smoothed round-trip time. When
+a MOVE arrives, the mover is credited back an estimate of the one-way transit time
+(half the RTT), at most MAX_LAG_PER_MOVE per move and LAG_BUDGET_PER_GAME per player
+per game, so a slow link costs little clock time but cannot be used to stop the clock.
+The RTT belongs to the connection; the budget to the game (see LagBudget), so
+reconnecting does not reset it.
+"""
+import time
+
+PING_SECONDS = 5.0
+RTT_SMOOTHING = 0.25        # weight of the newest sample in the moving average
+MAX_PENDING_PINGS = 4
+MAX_LAG_PER_MOVE = 1.0      # seconds
+LAG_BUDGET_PER_GAME = 10.0  # seconds per player per game
+
+
+class LagTracker:
+    """Per-connection RTT estimate."""
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.rtt = None
+        self.pending = {}       # ping id -> send time
+        self.next_id = 0
+
+    def ping(self):
+        """
+        Start a ping; returns the id to send. Old unanswered pings are forgotten.
+        """
+        self.next_id += 1
+        self.pending[self.next_id] = self.clock()
+        while len(self.pending) > MAX_PENDING_PINGS:
+            del self.pending[min(self.pending)]
+        return self.next_id
+
+    def pong(self, ping_id):
+        sent = self.pending.pop(ping_id, None)
+        if sent is None:
+            return None
+        sample = self.clock() - sent
+        if self.rtt is None:
+            self.rtt = sample
+        else:
+            self.rtt += RTT_SMOOTHING * (sample - self.rtt)
+        return sample
+
+    def allowance(self):
+        """
+        Most lag the next move from this connection may be credited, before the
+        mover's per-game budget (LagBudget.left) is applied.
+        """
+        if self.rtt is None:
+            return 0.0
+        return min(self.rtt / 2, MAX_LAG_PER_MOVE)
+
+
+class LagBudget:
+    """Lag already credited per game and player, kept by the server."""
+
+    def __init__(self):
+        self.credited = {}      # game_id -> {player_id: seconds credited so far}
+
+    def used(self, game_id):
+        """
+        Copy of the game's {player_id: seconds}, for the logic thread.
+        """
+        return dict(self.credited.get(game_id, ()))
+
+    def charge(self, game_id, player_id, credit):
+        if credit and player_id is not None:
+            game = self.credited.setdefault(game_id, {})
+            game[player_id] = game.get(player_id, 0.0) + credit
+
+    def forget(self, game_id):
+        self.credited.pop(game_id, None)
+
+
+def budget_left(used, player_id):
+    """
+    Lag a player may still be credited in a game, given LagBudget.used of it.
+    """
+    return max(0.0, LAG_BUDGET_PER_GAME - (used or {}).get(player_id, 0.0))
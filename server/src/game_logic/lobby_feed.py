@@ -0,0 +1,85 @@
+"""
+In-memory ready list with a versioned change log, for pushing lobby updates.
+
+Every change (joined / left / elo) bumps the version and is kept in a bounded log,
+so a client that saw version v can catch up with since(v) instead of refetching the
+whole list; clients that fell further behind than the log get a snapshot.
+
+Versions restart at 0 with the server, so every feed also has a random epoch, sent
+with each delta and snapshot: a client that sees a new epoch refetches the list.
+"""
+import secrets
+from collections import deque
+
+DEFAULT_HISTORY = 1024
+
+
+class LobbyFeed:
+    def __init__(self, history=DEFAULT_HISTORY, epoch=None):
+        self.players = {}               # player_id -> player dict, in join order
+        self.epoch = epoch or secrets.token_hex(4)
+        self.version = 0
+        self.log = deque(maxlen=history)
+
+    def _record(self, delta):
+        self.version += 1
+        delta = dict(delta, type="LOBBY_DELTA", epoch=self.epoch, version=self.version)
+        self.log.append(delta)
+        return delta
+
+    def load(self, players):
+        """
+        Start from the players the database lists as ready (at server start). Not
+        logged: they are in every snapshot, and no client holds an older version.
+        """
+        for player in players:
+            self.players.setdefault(player["player_id"], {
+                "player_id": player["player_id"], "username": player.get("username"),
+                "elo": player.get("elo")})
+
+    def join(self, player):
+        """
+        player: dict with at least player_id. Returns the delta, or None if already ready.
+        """
+        pid = player["player_id"]
+        if pid in self.players:
+            return None
+        self.players[pid] = player
+        return self._record({"op": "joined", "player": dict(player)})
+
+    def leave(self, player_id):
+        if self.players.pop(player_id, None) is None:
+            return None
+        return self._record({"op": "left", "player_id": player_id})
+
+    def elo_changed(self, player_id, elo):
+        player = self.players.get(player_id)
+        if player is None or player.get("elo") == elo:
+            return None
+        player["elo"] = elo
+        return self._record({"op": "elo", "player_id": player_id, "elo": elo})
+
+    def snapshot(self):
+        return {"epoch": self.epoch, "version": self.version, "players": list(self.players.values())}
+
+    def since(self, version, epoch=None):
+        """
+        Deltas after `version`, oldest first, or None if the log no longer reaches back
+        that far, or the version is from another epoch (a previous server) or the future.
+        """
+        if epoch is not None and epoch != self.epoch:
+            return None
+        if version > self.version:
+            return None
+        if version == self.version:
+            return []
+        if not self.log or self.log[0]["version"] > version + 1:
+            return None
+        start = version + 1 - self.log[0]["version"]
+        return [self.log[i] for i in range(start, len(self.log))]
+
+    def __contains__(self, player_id):
+        return player_id in self.players
+
+    def __len__(self):
+        return len(self.players)
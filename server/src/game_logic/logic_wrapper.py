@@ -6,438 +6,1052 @@ import os
 # Ensure we can import from the same directory
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from game_logic import validate_move, determine_result, export_pgn
+from game_logic import (
+    validate_move, determine_result, export_pgn, check_move, apply_draw_rules,
+    validate_pairs, validate_sequence, legal_moves, legal_moves_cache, transposition_cache
+)
 from elo_system import calculate_elo
 from db_handler import (
-    insert_move, get_moves, update_player_elo, update_game_result,
-    get_game_fen, update_game_fen, get_current_player_turn, get_game_info,
+    get_move_list, update_player_elo, update_game_result, get_game_info,
     get_player_rating, update_both_players_elo, get_game_details,
     add_to_lobby, remove_from_lobby, get_lobby_players,
-    get_game_time, update_game_time, create_game
+    update_game_time, create_game, apply_move, record_position,
+    get_move_state, get_leaderboard, LEADERBOARD_MAX_LIMIT, get_player_stats,
+    create_games, get_player_names, get_running_clocks, get_player_id,
+    get_cached_pgn, save_pgn
 )
+from init_db import INITIAL_FEN
+from database import get_connection, transaction
+from flag_scheduler import flag_deadline
+from framing import FrameReader, FramingError
+from lag_compensation import MAX_LAG_PER_MOVE, budget_left
+from game_cache import GameCache, DEFAULT_MAX_GAMES, DEFAULT_MAX_BYTES
+import perf_stats
+import pgn_export
+import rank_index
 import datetime
+import multiprocessing
 import time
+from concurrent.futures import ProcessPoolExecutor
 
-def main():
+# ========== Action Registry ==========
+# Each handler takes the decoded request dict and returns the response dict.
+# handle_request() looks the action up here and times every call (see perf_stats).
+
+ACTIONS = {}
+
+# Live-board cache for MOVE (see game_cache). Off unless enable_board_cache() is called,
+# which only a process that is the sole writer of the Game table may do.
+board_cache = None
+
+
+def action(*names):
+    """
+    Register the decorated function as the handler for the given action names.
+    """
+    def register(handler):
+        for name in names:
+            ACTIONS[name] = handler
+        return handler
+    return register
+
+
+def enable_board_cache(max_games=DEFAULT_MAX_GAMES, max_bytes=DEFAULT_MAX_BYTES):
+    global board_cache
+    board_cache = GameCache(max_games, max_bytes)
+    return board_cache
+
+
+def disable_board_cache():
+    global board_cache
+    board_cache = None
+
+
+def invalidate_cached_game(game_id):
+    if board_cache is None:
+        return
     try:
-        # Read JSON from stdin or command line argument
-        
-        if len(sys.argv) > 1:
-            # Join all args in case spaces split them (though we should quote properly)
-            input_str = " ".join(sys.argv[1:])
-        else:
-            # Fallback to stdin
-            input_str = sys.stdin.read()
-
-        if not input_str.strip():
-            print(json.dumps({"status": "error", "message": "No input provided"}))
-            return
-
-        req = json.loads(input_str)
-        
-        # Support both formats: "action" (from test) and "type" (from client)
-        action = req.get('action') or req.get('type')
-        response = {}
-
-        if action == 'validate_move':
-            fen = req.get('fen')
-            move = req.get('move')
-            is_valid, next_fen = validate_move(fen, move)
-            response = {"status": "success", "is_valid": is_valid, "next_fen": next_fen}
-        
-        elif action == 'game_result':
-            fen = req.get('fen')
-            result = determine_result(fen)
-            response = {"status": "success", "result": result}
-        
-        elif action == 'calculate_elo':
-            p_a = req.get('player_a_elo')
-            p_b = req.get('player_b_elo')
-            res_a = req.get('result_a')
-            new_a, new_b = calculate_elo(p_a, p_b, res_a)
-            response = {"status": "success", "new_elo_a": new_a, "new_elo_b": new_b}
-
-        elif action == 'process_match_elo':
-            p_a_id = req.get('player_a_id')
-            p_b_id = req.get('player_b_id')
-            result_a = req.get('result_a') # 1, 0.5, 0
-
-            # Fetch ratings
-            rating_a = get_player_rating(p_a_id)
-            rating_b = get_player_rating(p_b_id)
-
-            # Calculate new ratings
-            new_a, new_b = calculate_elo(rating_a, rating_b, result_a)
-
-            # Update DB transactionally
-            update_both_players_elo(p_a_id, new_a, p_b_id, new_b)
+        board_cache.invalidate(int(game_id))
+    except (TypeError, ValueError):
+        pass
 
-            response = {
-                "status": "success",
-                "player_a": {"old_elo": rating_a, "new_elo": new_a},
-                "player_b": {"old_elo": rating_b, "new_elo": new_b}
-            }
-        
-        elif action == 'update_elo':
-            pid = req.get('player_id')
-            elo = req.get('new_elo')
-            update_player_elo(pid, elo)
-            response = {"status": "success"}
-        
-        elif action == 'log_move':
-            gid = req.get('game_id')
-            pid = req.get('player_id')
-            move = req.get('move')
-            insert_move(gid, pid, move)
-            response = {"status": "success"}
-        
-        elif action == 'get_replay':
-            gid = req.get('game_id')
-            moves = get_moves(gid)
-            move_list = [m[1] for m in moves]
-            response = {"status": "success", "moves": move_list}
-        
-        elif action == 'get_game_log':
-            gid = req.get('game_id')
-            game_details = get_game_details(gid)
-            if game_details:
-                response = {"status": "success", "game_log": game_details}
-            else:
-                response = {"status": "error", "message": "Game not found"}
-
-        elif action == 'get_pgn':
-            gid = req.get('game_id')
-            game_details = get_game_details(gid)
-            if game_details:
-                # Need: moves list, white name, black name, result, date
-                moves = game_details.get('moves', [])
-                white = game_details['white_player']['username']
-                black = game_details['black_player']['username']
-                # Result format text needs to be standard? e.g. "1-0", "0-1", "1/2-1/2"
-                # Database stores winner_id or NULL.
-                # game_details has winner_id. 
-                # Let's infer result string.
-                wid = game_details.get('winner_id')
-                status = game_details.get('status')
-                
-                result_str = "*"
-                if status == 'FINISHED':
-                    if wid == game_details['white_player'].get('player_id') or wid == game_details['white_player']['username']: 
-                        # db_handler returns username/elo but game_details actually fetches from JOIN. 
-                        # Let's check get_game_details implementation in db_handler.py to be sure what we have.
-                        # It returns 'winner_id' as raw ID. we don't have player_ids in the sub-dicts easily?
-                        # Wait, get_game_details does not return player_ids in white_player/black_player dicts, just username/elo.
-                        # But it returns winner_id at top level.
-                        # We need to map winner_id to white/black.
-                        # We can fetch white_id/black_id from get_game_info or trust we can figure it out?
-                        # Actually db_handler.get_game_details DOES NOT return white/black IDs.
-                        # Let's fetch them separately or update db_handler?
-                        # Easier: Use get_game_info to get IDs.
-                        pass # resolved below
-                    pass
-                
-                # Fetch simple game info for IDs
-                g_info = get_game_info(gid) 
-                if g_info:
-                    # (game_id, white_id, black_id, mode, start_time, end_time, winner_id, status, current_fen, white_time, black_time, last_move_time)
-                    # Note: db_handler get_game_info might need update if we added columns? 
-                    # Yes, we added columns to DB but did we update get_game_info SELECT? 
-                    # ... checking logic ... 
-                    # We didn't update get_game_info SELECT statement in db_handler.py! 
-                    # It selects specific columns: "SELECT game_id, white_id, black_id ..."
-                    # So g_info indices are stable: 1=white_id, 2=black_id, 6=winner_id.
-                    
-                    white_id = g_info[1]
-                    winner_id_raw = g_info[6]
-                    
-                    if status == 'FINISHED':
-                        if winner_id_raw == white_id:
-                            result_str = "1-0"
-                        elif winner_id_raw is None:
-                             result_str = "1/2-1/2" # Draw
-                        else:
-                             result_str = "0-1" # Black won
-                
-                start_time = game_details.get('start_time')
-                if start_time and isinstance(start_time, str):
-                    date_str = start_time.split('T')[0]
+
+@action('validate_move')
+def handle_validate_move(req):
+    fen = req.get('fen')
+    move = req.get('move')
+    is_valid, next_fen = validate_move(fen, move)
+    response = {"status": "success", "is_valid": is_valid, "next_fen": next_fen}
+    return response
+
+
+@action('game_result')
+def handle_game_result(req):
+    fen = req.get('fen')
+    result = determine_result(fen)
+    response = {"status": "success", "result": result}
+    return response
+
+
+@action('get_legal_moves', 'GET_LEGAL_MOVES')
+def handle_get_legal_moves(req):
+    # Either a "fen", or a "game_id" to use that game's current position
+    fen = req.get('fen')
+    game_id = req.get('game_id')
+    if not fen and game_id:
+        game = get_move_state(game_id)
+        if game is None:
+            return {"type": "LEGAL_MOVES", "status": "error", "message": f"Game ID {game_id} does not exist."}
+        fen = game['current_fen'] or INITIAL_FEN
+    if not fen or not isinstance(fen, str):
+        return {"type": "LEGAL_MOVES", "status": "error", "message": "Missing 'fen' or 'game_id'"}
+    try:
+        moves = legal_moves(fen)
+    except ValueError as e:
+        return {"type": "LEGAL_MOVES", "status": "error", "message": str(e)}
+    response = {"type": "LEGAL_MOVES", "status": "success", "game_id": game_id, "fen": fen,
+                "legal_moves": moves}
+    return response
+
+
+# ========== Batch validation ==========
+
+# Larger "pairs" batches are split into chunks for a process pool: move generation is
+# CPU-bound, so threads would just take turns on the GIL.
+BATCH_PARALLEL_THRESHOLD = 512
+BATCH_CHUNK_SIZE = 256
+MAX_BATCH_ITEMS = 100000
+BATCH_WORKERS = int(os.environ.get("CHESS_BATCH_WORKERS", str(os.cpu_count() or 1)))
+
+_batch_pool = None
+_batch_pool_pid = None
+
+
+def _get_batch_pool():
+    # Created on first use, per process (a pool inherited across fork() is unusable).
+    # Workers must not be plain forks: the async server creates the pool from its bulk
+    # thread, and a fork would copy locks (board cache, perf_stats) the logic thread
+    # holds at that moment, deadlocking the child.
+    global _batch_pool, _batch_pool_pid
+    if _batch_pool is None or _batch_pool_pid != os.getpid():
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _batch_pool = ProcessPoolExecutor(max_workers=BATCH_WORKERS,
+                                          mp_context=multiprocessing.get_context(method))
+        _batch_pool_pid = os.getpid()
+    return _batch_pool
+
+
+def shutdown_batch_pool():
+    global _batch_pool
+    if _batch_pool is not None and _batch_pool_pid == os.getpid():
+        _batch_pool.shutdown(wait=True)
+    _batch_pool = None
+
+
+def validate_pairs_batch(pairs):
+    if len(pairs) < BATCH_PARALLEL_THRESHOLD or BATCH_WORKERS <= 1:
+        return validate_pairs(pairs)
+    chunks = [pairs[i:i + BATCH_CHUNK_SIZE] for i in range(0, len(pairs), BATCH_CHUNK_SIZE)]
+    results = []
+    for chunk_results in _get_batch_pool().map(validate_pairs, chunks):
+        results.extend(chunk_results)
+    return results
+
+
+def _as_pair(item):
+    if isinstance(item, dict):
+        return item.get('fen'), item.get('move')
+    if isinstance(item, (list, tuple)) and len(item) == 2:
+        return item[0], item[1]
+    return None
+
+
+@action('validate_moves')
+def handle_validate_moves(req):
+    # Either {"pairs": [[fen, uci], ...]} (independent positions)
+    # or {"fen": base_fen, "moves": [uci, ...]} (one line of play; fen defaults to the start)
+    pairs = req.get('pairs')
+    moves = req.get('moves')
+    items = pairs if pairs is not None else moves
+    if not isinstance(items, list):
+        return {"status": "error", "message": "Expected a 'pairs' or 'moves' list"}
+    if len(items) > MAX_BATCH_ITEMS:
+        return {"status": "error", "message": f"Batch too large (max {MAX_BATCH_ITEMS} items)"}
+
+    if pairs is None:
+        results = validate_sequence(req.get('fen') or INITIAL_FEN, moves)
+        return {"status": "success", "results": results}
+
+    parsed = [_as_pair(item) for item in pairs]
+    checked = iter(validate_pairs_batch([p for p in parsed if p is not None]))
+    results = [next(checked) if p is not None else {"is_valid": False, "error": "Expected [fen, move]"}
+               for p in parsed]
+    return {"status": "success", "results": results}
+
+
+@action('calculate_elo')
+def handle_calculate_elo(req):
+    p_a = req.get('player_a_elo')
+    p_b = req.get('player_b_elo')
+    res_a = req.get('result_a')
+    new_a, new_b = calculate_elo(p_a, p_b, res_a)
+    response = {"status": "success", "new_elo_a": new_a, "new_elo_b": new_b}
+    return response
+
+
+@action('process_match_elo')
+def handle_process_match_elo(req):
+    p_a_id = req.get('player_a_id')
+    p_b_id = req.get('player_b_id')
+    result_a = req.get('result_a') # 1, 0.5, 0
+
+    # Fetch ratings
+    rating_a = get_player_rating(p_a_id)
+    rating_b = get_player_rating(p_b_id)
+
+    # Calculate new ratings
+    new_a, new_b = calculate_elo(rating_a, rating_b, result_a)
+
+    # Update DB transactionally
+    update_both_players_elo(p_a_id, new_a, p_b_id, new_b)
+
+    response = {
+        "status": "success",
+        "player_a": {"old_elo": rating_a, "new_elo": new_a},
+        "player_b": {"old_elo": rating_b, "new_elo": new_b}
+    }
+    return response
+
+
+@action('update_elo')
+def handle_update_elo(req):
+    pid = req.get('player_id')
+    elo = req.get('new_elo')
+    update_player_elo(pid, elo)
+    response = {"status": "success"}
+    return response
+
+
+@action('log_move')
+def handle_log_move(req):
+    gid = req.get('game_id')
+    pid = req.get('player_id')
+    move = req.get('move')
+
+    def resolve(game):
+        # Only legal moves are logged: checked against the current position, which
+        # then advances with the move
+        if game is None:
+            raise ValueError("Game not found")
+        check = check_move(game['current_fen'] or INITIAL_FEN, move)
+        if not check.is_valid:
+            raise ValueError(f"Illegal move: {move}")
+        return {'current_fen': check.next_fen}, (pid, move), None
+
+    try:
+        apply_move(gid, resolve)
+    except (TypeError, ValueError) as e:
+        return {"status": "error", "message": str(e)}
+    invalidate_cached_game(gid)
+    response = {"status": "success"}
+    return response
+
+
+@action('get_replay')
+def handle_get_replay(req):
+    gid = req.get('game_id')
+    response = {"status": "success", "moves": get_move_list(gid)}
+    return response
+
+
+@action('get_game_log')
+def handle_get_game_log(req):
+    gid = req.get('game_id')
+    game_details = get_game_details(gid)
+    if game_details:
+        response = {"status": "success", "game_log": game_details}
+    else:
+        response = {"status": "error", "message": "Game not found"}
+    return response
+
+
+def build_game_pgn(gid, verify=False):
+    """
+    PGN text of a game, or None if it doesn't exist. verify: re-check every move's
+    legality instead of trusting the stored history.
+    """
+    game_details = get_game_details(gid)
+    if game_details:
+        # Need: moves list, white name, black name, result, date
+        moves = game_details.get('moves', [])
+        white = game_details['white_player']['username']
+        black = game_details['black_player']['username']
+        # Result format text needs to be standard? e.g. "1-0", "0-1", "1/2-1/2"
+        # Database stores winner_id or NULL.
+        # game_details has winner_id. 
+        # Let's infer result string.
+        wid = game_details.get('winner_id')
+        status = game_details.get('status')
+
+        result_str = "*"
+        if status == 'FINISHED':
+            if wid == game_details['white_player'].get('player_id') or wid == game_details['white_player']['username']: 
+                # db_handler returns username/elo but game_details actually fetches from JOIN. 
+                # Let's check get_game_details implementation in db_handler.py to be sure what we have.
+                # It returns 'winner_id' as raw ID. we don't have player_ids in the sub-dicts easily?
+                # Wait, get_game_details does not return player_ids in white_player/black_player dicts, just username/elo.
+                # But it returns winner_id at top level.
+                # We need to map winner_id to white/black.
+                # We can fetch white_id/black_id from get_game_info or trust we can figure it out?
+                # Actually db_handler.get_game_details DOES NOT return white/black IDs.
+                # Let's fetch them separately or update db_handler?
+                # Easier: Use get_game_info to get IDs.
+                pass # resolved below
+            pass
+
+        # Fetch simple game info for IDs
+        g_info = get_game_info(gid) 
+        if g_info:
+            # (game_id, white_id, black_id, mode, start_time, end_time, winner_id, status, current_fen, white_time, black_time, last_move_time)
+            # Note: db_handler get_game_info might need update if we added columns? 
+            # Yes, we added columns to DB but did we update get_game_info SELECT? 
+            # ... checking logic ... 
+            # We didn't update get_game_info SELECT statement in db_handler.py! 
+            # It selects specific columns: "SELECT game_id, white_id, black_id ..."
+            # So g_info indices are stable: 1=white_id, 2=black_id, 6=winner_id.
+
+            white_id = g_info[1]
+            winner_id_raw = g_info[6]
+
+            if status == 'FINISHED':
+                if winner_id_raw == white_id:
+                    result_str = "1-0"
+                elif winner_id_raw is None:
+                     result_str = "1/2-1/2" # Draw
                 else:
-                    date_str = "????.??.??"
-                
-                pgn_str = export_pgn(moves, white, black, result_str, date_str)
-                response = {"status": "success", "pgn": pgn_str}
-            else:
-                response = {"status": "error", "message": "Game not found"}
-
-        elif action == 'update_game_result':
-            gid = req.get('game_id')
-            wid = req.get('winner_id')
-            stat = req.get('status')
-            end = req.get('end_time')
-            update_game_result(gid, wid, stat, end)
-
-            response = {"status": "success"}
-        
-
-        elif action == 'create_game':
-            white_id = req.get('white_id')
-            black_id = req.get('black_id')
-            mode = req.get('mode', 'RAPID').upper()
-
-            # Time limits in seconds
-            mode_times = {
-                "BLITZ": 300.0,      # 5 mins
-                "RAPID": 600.0,      # 10 mins
-                "CLASSICAL": 1800.0  # 30 mins
+                     result_str = "0-1" # Black won
+
+        date_str = pgn_export.pgn_date(game_details.get('start_time'))
+        return export_pgn(moves, white, black, result_str, date_str, verify=verify)
+    return None
+
+
+@action('get_pgn')
+def handle_get_pgn(req):
+    gid = req.get('game_id')
+    verify = bool(req.get('verify'))
+    # Finished games are usually rendered already (pre_export_pgn)
+    pgn_str = None if verify else get_cached_pgn(gid)
+    if pgn_str is None:
+        pgn_str = build_game_pgn(gid, verify)
+    if pgn_str is None:
+        return {"status": "error", "message": "Game not found"}
+    return {"status": "success", "pgn": pgn_str}
+
+
+@action('pre_export_pgn')
+def handle_pre_export_pgn(req):
+    # Sent by the server in the background when a game ends, so get_pgn and bulk
+    # exports of finished games don't replay them again
+    gid = req.get('game_id')
+    info = get_game_info(gid)
+    if not info or info[7] != 'FINISHED':
+        return {"status": "error", "message": "Game not finished"}
+    save_pgn(gid, build_game_pgn(gid))
+    return {"status": "success"}
+
+
+# Bulk export goes to a file under EXPORT_DIR: a response is one JSON line, so the PGN
+# itself is not sent back (pgn_export.py streams to stdout or a socket instead)
+EXPORT_DIR = os.environ.get(
+    "CHESS_EXPORT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "exports"))
+
+
+@action('export_games')
+def handle_export_games(req):
+    player_id = req.get('player_id')
+    if player_id is None and req.get('username'):
+        player_id = get_player_id(req.get('username'))
+        if player_id is None:
+            return {"status": "error", "message": "Player not found"}
+    compress = bool(req.get('gzip'))
+    # Only a file name: exports never leave EXPORT_DIR
+    name = os.path.basename(req.get('file') or "")
+    if not name:
+        name = f"export_{int(time.time())}.pgn" + (".gz" if compress else "")
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, name)
+    pool = _get_batch_pool() if BATCH_WORKERS > 1 else None
+    with open(path, "wb") as out:
+        games, _ = pgn_export.write_pgn(out, player_id, req.get('since'), req.get('until'),
+                                        compress, executor=pool, workers=BATCH_WORKERS,
+                                        verify=bool(req.get('verify')))
+    return {"status": "success", "path": path, "games": games, "bytes": os.path.getsize(path)}
+
+
+@action('update_game_result')
+def handle_update_game_result(req):
+    gid = req.get('game_id')
+    wid = req.get('winner_id')
+    stat = req.get('status')
+    end = req.get('end_time')
+    update_game_result(gid, wid, stat, end)
+    invalidate_cached_game(gid)
+
+    response = {"status": "success"}
+    return response
+
+
+@action('check_flag')
+def handle_check_flag(req):
+    # Sent by the flag scheduler when a game's deadline is due
+    try:
+        game_id = int(req.get('game_id'))
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "Invalid game_id"}
+    return flag_game(game_id, time.time())
+
+
+@action('get_running_clocks')
+def handle_get_running_clocks(req):
+    # Deadlines of every running clock, to seed the flag scheduler
+    deadlines = [
+        [game_id, flag_deadline(fen, white_time, black_time, last_move_time, MAX_LAG_PER_MOVE)]
+        for game_id, fen, white_time, black_time, last_move_time in get_running_clocks()
+    ]
+    response = {"status": "success", "deadlines": [d for d in deadlines if d[1] is not None]}
+    return response
+
+
+def flag_game(game_id, now):
+    """
+    End a game on time if the side to move has run out by `now`.
+    Re-checks the stored clock in the same transaction as the write, so a move that
+    committed after the deadline was scheduled simply yields the new deadline.
+    A move may still be in flight when the clock hits zero and get lag credited on
+    arrival, so games only flag MAX_LAG_PER_MOVE after that.
+    """
+    with transaction(get_connection(), immediate=True) as conn:
+        game = get_move_state(game_id, conn)
+        if game is None or game['status'] != 'ONGOING':
+            return {"status": "success", "flagged": False, "deadline": None}
+        fen = game['current_fen'] or INITIAL_FEN
+        deadline = flag_deadline(fen, game['white_time'], game['black_time'],
+                                 game['last_move_time'], MAX_LAG_PER_MOVE)
+        if deadline is None or deadline > now:
+            return {"status": "success", "flagged": False, "deadline": deadline}
+
+        white_to_move = fen.split()[1] != 'b'
+        white_time = 0.0 if white_to_move else game['white_time']
+        black_time = game['black_time'] if white_to_move else 0.0
+        winner_id = game['black_id'] if white_to_move else game['white_id']
+        update_game_time(game_id, white_time, black_time, game['last_move_time'])
+        update_game_result(game_id, winner_id, 'FINISHED', datetime.datetime.utcnow().isoformat())
+    invalidate_cached_game(game_id)
+    response = {"status": "success", "flagged": True, "game_result": "timeout",
+                "winner_id": winner_id, "white_time": white_time, "black_time": black_time}
+    return response
+
+
+# Time limits in seconds
+MODE_TIMES = {
+    "BLITZ": 300.0,      # 5 mins
+    "RAPID": 600.0,      # 10 mins
+    "CLASSICAL": 1800.0  # 30 mins
+}
+
+
+@action('create_game')
+def handle_create_game(req):
+    white_id = req.get('white_id')
+    black_id = req.get('black_id')
+    mode = req.get('mode', 'RAPID').upper()
+
+    if mode not in MODE_TIMES:
+        response = {"status": "error", "message": f"Invalid mode: {mode}. Allowed: BLITZ, RAPID, CLASSICAL"}
+    else:
+        time_limit = MODE_TIMES[mode]
+        now = time.time()
+        try:
+            new_game_id = create_game(white_id, black_id, mode, time_limit, now)
+            response = {
+                "status": "success", 
+                "game_id": new_game_id, 
+                "mode": mode,
+                "time_limit": time_limit,
+                # White's clock is already running
+                "deadline": flag_deadline(INITIAL_FEN, time_limit, time_limit, now, MAX_LAG_PER_MOVE)
             }
-            
-            if mode not in mode_times:
-                response = {"status": "error", "message": f"Invalid mode: {mode}. Allowed: BLITZ, RAPID, CLASSICAL"}
-            else:
-                time_limit = mode_times[mode]
-                try:
-                    new_game_id = create_game(white_id, black_id, mode, time_limit)
-                    response = {
-                        "status": "success", 
-                        "game_id": new_game_id, 
-                        "mode": mode,
-                        "time_limit": time_limit
-                    }
-                except Exception as e:
-                    response = {"status": "error", "message": str(e)}
-        
-        # ========== Lobby / Ready Players ==========
-
-        elif action == 'join_lobby':
-            pid = req.get('player_id')
-            if not pid:
-                response = {"status": "error", "message": "Missing player_id"}
-            else:
-                add_to_lobby(pid)
-                response = {"status": "success", "message": "Added to lobby"}
-
-        elif action == 'leave_lobby':
-            pid = req.get('player_id')
-            if not pid:
-                response = {"status": "error", "message": "Missing player_id"}
-            else:
-                remove_from_lobby(pid)
-                response = {"status": "success", "message": "Removed from lobby"}
-
-        elif action == 'get_ready_players':
-            players = get_lobby_players()
-            response = {"status": "success", "players": players}
-
-        # ========== Client Protocol: MOVE Handler ==========
-        
-        elif action == 'MOVE':
-            # Format from client: {"type": "MOVE", "game_id": "123", "from": "e2", "to": "e4"}
-            
-            # Get request data
-            game_id = req.get('game_id')
-            from_pos = req.get('from')
-            to_pos = req.get('to')
-            
-            # Validate required fields
-            if not game_id or (isinstance(game_id, str) and game_id.strip() == ""):
-                response = {
-                    "type": "MOVE_RESULT",
-                    "status": "error",
-                    "message": "Missing or empty 'game_id' in MOVE request. Please set game_id first."
-                }
-                print(json.dumps(response))
-                return
-            
-            if not from_pos or not to_pos:
-                response = {
-                    "type": "MOVE_RESULT",
-                    "status": "error",
-                    "message": "Missing 'from' or 'to' in MOVE request"
-                }
-                print(json.dumps(response))
-                return
-            
-            try:
-                game_id_int = int(game_id)
-                
-                
-                # Check if game exists
-                game_info = get_game_info(game_id_int)
-                if not game_info:
-                    response = {
-                        "type": "MOVE_RESULT",
-                        "status": "error",
-                        "message": f"Game ID {game_id_int} does not exist."
-                    }
-                    print(json.dumps(response))
-                    return
-
-                # Time Control Logic
-                white_id, black_id = game_info[1], game_info[2]
-                current_fen = game_info[8] # Game info has FEN at index 8
-                
-                # Determine who is moving based on FEN (before the move)
-                is_white_turn = True
-                if current_fen:
-                    parts = current_fen.split()
-                    if len(parts) > 1 and parts[1] == 'b':
-                        is_white_turn = False
-                
-                moving_player_id = white_id if is_white_turn else black_id
-                
-                # Get current time state
-                white_time, black_time, last_move_ts_str = get_game_time(game_id_int)
-                
-                now = time.time()
-                elapsed = 0.0
-                
-                if last_move_ts_str:
-                    try:
-                        last_ts = float(last_move_ts_str)
-                        elapsed = now - last_ts
-                    except ValueError:
-                        elapsed = 0.0 # Should not happen if data is correct
-                
-                # Deduct time from the player who IS currently moving (they spent time thinking)
-                # Note: For the very first move of the game (last_move_ts_str is None), usually we don't deduct,
-                # or we deduct from game start. Let's assume no deduction for the very first move to be safe/simple,
-                # or start clock when game starts.
-                # Implementation: If last_move_ts_str is None, it's the first move.
-                
-                if last_move_ts_str: 
-                    if is_white_turn:
-                        white_time -= elapsed
-                    else:
-                        black_time -= elapsed
-                
-                # Check for timeout
-                timeout = False
-                if white_time <= 0:
-                    white_time = 0
-                    timeout = True
-                    timeout_winner = black_id
-                elif black_time <= 0:
-                    black_time = 0
-                    timeout = True
-                    timeout_winner = white_id
-                
-                if timeout:
-                    update_game_time(game_id_int, white_time, black_time, str(now))
-                    update_game_result(
-                        game_id_int,
-                        timeout_winner,
-                        'FINISHED',
-                        datetime.datetime.utcnow().isoformat()
-                    )
-                    response = {
-                        "type": "MOVE_RESULT",
-                        "status": "success",
-                        "is_valid": False, 
-                        "message": "Timeout",
-                        "game_result": "timeout",
-                        "winner_id": timeout_winner,
-                         "white_time": white_time,
-                        "black_time": black_time
-                    }
-                    print(json.dumps(response))
-                    return
-
-                # Update time in DB (even if not timeout, we update the thinking time)
-                # effectively "punching the clock"
-                update_game_time(game_id_int, white_time, black_time, str(now))
-
-                # --- Normal Move Logic Checks ---
-                
-                # Get current FEN from database (re-fetch not needed as we have it from game_info, 
-                # but valid_move needs it. game_info's valid FEN is `current_fen`)
-                if not current_fen:
-                     current_fen = get_game_fen(game_id_int) 
-                
-                # Convert format: "e2" + "e4" → "e2e4" (UCI format)
-                move_uci = from_pos + to_pos
-                
-                # Validate move
-                is_valid, next_fen = validate_move(current_fen, move_uci)
-                
-                if is_valid:
-                    # Get current player's turn (we effectively did this above, but keep consistency)
-                    current_player_id = moving_player_id # reusing calculation
-                    
-                    if not current_player_id:
-                         # Fallback error handling if something is weird
-                        response = {"type": "MOVE_RESULT", "status": "error", "message": "Could not determine turn"}
-                        print(json.dumps(response))
-                        return
-                    
-                    # Save move to database
-                    insert_move(game_id_int, current_player_id, move_uci)
-                    
-                    # Update FEN in database
-                    update_game_fen(game_id_int, next_fen)
-                    
-                    # Check game result
-                    game_result = determine_result(next_fen)
-                    
-                    # Update game status if game ended
-                    if game_result in ['checkmate', 'draw']:
-                        winner_id = None
-                        if game_result == 'checkmate':
-                            # Winner is the player who just moved
-                            winner_id = current_player_id
-                        
-                        update_game_result(
-                            game_id_int,
-                            winner_id,
-                            'FINISHED',
-                            datetime.datetime.utcnow().isoformat()
-                        )
-                    
-                    # Success response
-                    response = {
-                        "type": "MOVE_RESULT",
-                        "status": "success",
-                        "is_valid": True,
-                        "next_fen": next_fen,
-                        "game_result": game_result,
-                        "white_time": white_time,
-                        "black_time": black_time
-                    }
-                else:
-                    # Invalid move
-                    # We might want to revert the time deduction? 
-                    # In official chess, invalid move adds time penalty or is just rejected.
-                    # Online, usually we don't deduct time for invalid inputs immediately (latency),
-                    # or we do? Let's keep the time deduction because they spent time thinking and sent a bad move.
-                    response = {
-                        "type": "MOVE_RESULT",
-                        "status": "error",
-                        "is_valid": False,
-                        "message": "Invalid move",
-                        "white_time": white_time,
-                        "black_time": black_time
-                    }
-                    
-            except ValueError:
-                response = {
-                    "type": "MOVE_RESULT",
-                    "status": "error",
-                    "message": "Invalid game_id format. Must be a number."
-                }
-            except Exception as e:
-                response = {
-                    "type": "MOVE_RESULT",
-                    "status": "error",
-                    "message": f"Error processing move: {str(e)}"
-                }
+        except Exception as e:
+            response = {"status": "error", "message": str(e)}
+    return response
+
+
+@action('create_games')
+def handle_create_games(req):
+    # Batch create_game for matchmaking: {"pairs": [[white_id, black_id], ...], "mode": ...}
+    mode = (req.get('mode') or 'RAPID').upper()
+    pairs = req.get('pairs')
+    if mode not in MODE_TIMES:
+        return {"status": "error", "message": f"Invalid mode: {mode}. Allowed: BLITZ, RAPID, CLASSICAL"}
+    if not isinstance(pairs, list) or not all(isinstance(p, (list, tuple)) and len(p) == 2 for p in pairs):
+        return {"status": "error", "message": "Expected a 'pairs' list of [white_id, black_id]"}
+
+    time_limit = MODE_TIMES[mode]
+    now = time.time()
+    game_ids = create_games(pairs, mode, time_limit, now)
+    names = get_player_names({pid for pair in pairs for pid in pair})
+    games = []
+    for game_id, (white_id, black_id) in zip(game_ids, pairs):
+        white_name, white_elo = names.get(white_id, (None, None))
+        black_name, black_elo = names.get(black_id, (None, None))
+        games.append({"game_id": game_id, "white_id": white_id, "black_id": black_id,
+                      "white_username": white_name, "black_username": black_name,
+                      "white_elo": white_elo, "black_elo": black_elo})
+    response = {"status": "success", "mode": mode, "time_limit": time_limit, "games": games,
+                "deadline": flag_deadline(INITIAL_FEN, time_limit, time_limit, now, MAX_LAG_PER_MOVE)}
+    return response
+
 
+# ========== Lobby / Ready Players ==========
+
+@action('join_lobby')
+def handle_join_lobby(req):
+    pid = req.get('player_id')
+    if not pid:
+        response = {"status": "error", "message": "Missing player_id"}
+    else:
+        add_to_lobby(pid)
+        response = {"status": "success", "message": "Added to lobby"}
+        for player_id, (username, elo) in get_player_names([pid]).items():
+            response["player"] = {"player_id": player_id, "username": username, "elo": elo}
+    return response
+
+
+@action('leave_lobby')
+def handle_leave_lobby(req):
+    pid = req.get('player_id')
+    if not pid:
+        response = {"status": "error", "message": "Missing player_id"}
+    else:
+        remove_from_lobby(pid)
+        response = {"status": "success", "message": "Removed from lobby"}
+    return response
+
+
+@action('get_ready_players')
+def handle_get_ready_players(req):
+    # Always the full list: versioned deltas (since_version) need the async server's
+    # in-memory lobby, see async_server.on_get_ready_players
+    players = get_lobby_players()
+    response = {"status": "success", "players": players}
+    return response
+
+
+@action('get_leaderboard', 'GET_LEADERBOARD')
+def handle_get_leaderboard(req):
+    # Optional: "limit", and "after_elo"/"after_id" from the previous page's "next"
+    try:
+        limit = max(1, min(int(req.get('limit') or 50), LEADERBOARD_MAX_LIMIT))
+        rows = get_leaderboard(limit, req.get('after_elo'), req.get('after_id'))
+    except (TypeError, ValueError):
+        return {"type": "LEADERBOARD", "status": "error", "message": "Invalid pagination parameters"}
+
+    index = rank_index.get_index()
+    leaderboard = [
+        {"player_id": pid, "username": username, "elo": elo, "rank": index.rank_of_elo(elo or 0),
+         "wins": wins, "losses": losses, "draws": draws}
+        for pid, username, elo, wins, losses, draws in rows
+    ]
+    next_page = None
+    if len(rows) == limit:
+        next_page = {"after_elo": rows[-1][2], "after_id": rows[-1][0]}
+    response = {"type": "LEADERBOARD", "status": "success", "leaderboard": leaderboard,
+                "next": next_page}
+    return response
+
+
+@action('get_rank')
+def handle_get_rank(req):
+    try:
+        player_id = int(req.get('player_id'))
+    except (TypeError, ValueError):
+        return {"status": "error", "message": "Invalid player_id"}
+    index = rank_index.get_index()
+    rank = index.rank(player_id)
+    if rank is None:
+        # Registered after the index was last loaded: rank it by its current rating
+        row = get_player_stats(player_id)
+        if row is None:
+            return {"status": "error", "message": f"Player {player_id} not found"}
+        rank = index.rank_of_elo(row[2] or 0)
+    response = {"status": "success", "player_id": player_id, "rank": rank,
+                "total_players": len(index)}
+    return response
+
+
+@action('get_player_stats', 'GET_STATS')
+def handle_get_player_stats(req):
+    # By "player_id" or "username" (the client sends username)
+    row = get_player_stats(req.get('player_id'), req.get('username'))
+    if row is None:
+        return {"type": "PLAYER_STATS", "status": "error", "message": "Player not found"}
+    pid, username, elo, wins, losses, draws, glicko_rating, glicko_rd = row
+    index = rank_index.get_index()
+    response = {"type": "PLAYER_STATS", "status": "success", "player_id": pid,
+                "username": username, "elo": elo, "wins": wins, "losses": losses,
+                "draws": draws, "rank": index.rank(pid) or index.rank_of_elo(elo or 0),
+                "total_players": len(index),
+                # Updated once per rating period by rating_period.py
+                "glicko_rating": round(glicko_rating), "glicko_rd": round(glicko_rd)}
+    return response
+
+
+# ========== Client Protocol: MOVE Handler ==========
+
+@action('MOVE')
+def handle_move(req, elapsed=None, lag_allowance=0.0, lag_used=None):
+    # Format from client: {"type": "MOVE", "game_id": "123", "from": "e2", "to": "e4"}
+    # elapsed / lag_allowance / lag_used are only ever passed by the server itself
+    # (never read from the request): its monotonic measure of the mover's thinking
+    # time, the transit time it may credit back and the lag already credited in this
+    # game (see lag_compensation).
+
+    # Get request data
+    game_id = req.get('game_id')
+    from_pos = req.get('from')
+    to_pos = req.get('to')
+
+    # Validate required fields
+    if not game_id or (isinstance(game_id, str) and game_id.strip() == ""):
+        response = {
+            "type": "MOVE_RESULT",
+            "status": "error",
+            "message": "Missing or empty 'game_id' in MOVE request. Please set game_id first."
+        }
+        return response
+
+    if not from_pos or not to_pos:
+        response = {
+            "type": "MOVE_RESULT",
+            "status": "error",
+            "message": "Missing 'from' or 'to' in MOVE request"
+        }
+        return response
+
+    try:
+        game_id_int = int(game_id)
+    except ValueError:
+        response = {
+            "type": "MOVE_RESULT",
+            "status": "error",
+            "message": "Invalid game_id format. Must be a number."
+        }
+        return response
+
+    # Convert format: "e2" + "e4" → "e2e4" (UCI format)
+    move_uci = from_pos + to_pos
+
+    try:
+        # Read state and write clock, move, FEN and result as one transaction
+        resolve = lambda game: resolve_move(game_id_int, game, move_uci, time.time(),
+                                            elapsed, lag_allowance, lag_used)
+        if board_cache is not None:
+            response = board_cache.apply_move(game_id_int, resolve)
         else:
-            response = {"status": "error", "message": f"Unknown action: {action}"}
+            response = apply_move(game_id_int, resolve)
+    except Exception as e:
+        response = {
+            "type": "MOVE_RESULT",
+            "status": "error",
+            "message": f"Error processing move: {str(e)}"
+        }
+
+    return response
+
+
+def resolve_move(game_id, game, move_uci, now, elapsed=None, lag_allowance=0.0, lag_used=None):
+    """
+    Decide the outcome of one move from the state apply_move read (inside its transaction).
+    Returns (game_updates, move_row, response) in the shape apply_move expects.
+
+    elapsed: thinking time measured by the caller (default: now - last_move_time);
+    lag_allowance: up to this much of it is credited back as network transit;
+    lag_used: {player_id: lag credited so far} in this game, to cap it at the mover's
+    per-game budget. Responses carry the mover's "player_id" for the caller to charge.
+    """
+    # Check if game exists
+    if game is None:
+        response = {
+            "type": "MOVE_RESULT",
+            "status": "error",
+            "message": f"Game ID {game_id} does not exist."
+        }
+        return {}, None, response
+    if game['status'] == 'FINISHED':
+        response = {
+            "type": "MOVE_RESULT",
+            "status": "error",
+            "message": "Game is already over"
+        }
+        return {}, None, response
+
+    # Time Control Logic
+    white_id, black_id = game['white_id'], game['black_id']
+    current_fen = game['current_fen'] or INITIAL_FEN
+
+    # Determine who is moving based on FEN (before the move)
+    is_white_turn = True
+    parts = current_fen.split()
+    if len(parts) > 1 and parts[1] == 'b':
+        is_white_turn = False
+
+    moving_player_id = white_id if is_white_turn else black_id
+
+    # Get current time state
+    white_time, black_time = game['white_time'], game['black_time']
+    last_move_ts_str = game['last_move_time']
+
+    lag_credit = 0.0
+
+    if not last_move_ts_str:
+        elapsed = 0.0
+    elif elapsed is None:
+        try:
+            last_ts = float(last_move_ts_str)
+            elapsed = now - last_ts
+        except ValueError:
+            elapsed = 0.0 # Should not happen if data is correct
+
+    if last_move_ts_str:
+        # Network transit is not thinking time
+        lag_credit = min(max(lag_allowance, 0.0), max(elapsed, 0.0),
+                         budget_left(lag_used, moving_player_id))
+        elapsed -= lag_credit
+
+    # Deduct time from the player who IS currently moving (they spent time thinking)
+    # White's clock starts when the game is created (create_game); only games created
+    # before that have no last_move_time, and their first move is not charged.
+
+    if last_move_ts_str: 
+        if is_white_turn:
+            white_time -= elapsed
+        else:
+            black_time -= elapsed
+
+    # Check for timeout
+    timeout = False
+    if white_time <= 0:
+        white_time = 0
+        timeout = True
+        timeout_winner = black_id
+    elif black_time <= 0:
+        black_time = 0
+        timeout = True
+        timeout_winner = white_id
+
+    # Update time (even if not timeout, we update the thinking time)
+    # effectively "punching the clock"
+    updates = {"white_time": white_time, "black_time": black_time, "last_move_time": str(now)}
+
+    if timeout:
+        updates.update(
+            winner_id=timeout_winner,
+            status='FINISHED',
+            end_time=datetime.datetime.utcnow().isoformat()
+        )
+        response = {
+            "type": "MOVE_RESULT",
+            "status": "success",
+            "is_valid": False, 
+            "message": "Timeout",
+            "game_result": "timeout",
+            "winner_id": timeout_winner,
+            "white_time": white_time,
+            "black_time": black_time,
+            "elapsed": elapsed,
+            "lag_credit": lag_credit,
+            "player_id": moving_player_id
+        }
+        return updates, None, response
+
+    # --- Normal Move Logic Checks ---
+
+    # Validate move through the shared transposition cache. A live board from the
+    # board cache (if any) is advanced along with it.
+    board = game.get('board')
+    check = check_move(current_fen, move_uci, board)
+
+    if not check.is_valid:
+        # Invalid move
+        # We might want to revert the time deduction? 
+        # In official chess, invalid move adds time penalty or is just rejected.
+        # Online, usually we don't deduct time for invalid inputs immediately (latency),
+        # or we do? Let's keep the time deduction because they spent time thinking and sent a bad move.
+        response = {
+            "type": "MOVE_RESULT",
+            "status": "error",
+            "is_valid": False,
+            "message": "Invalid move",
+            "white_time": white_time,
+            "black_time": black_time,
+            "elapsed": elapsed,
+            "lag_credit": lag_credit,
+            "player_id": moving_player_id,
+            "legal_moves": legal_moves(current_fen, board)
+        }
+        return updates, None, response
+
+    current_player_id = moving_player_id
+    if not current_player_id:
+        if board is not None:
+            board.pop()
+        # Fallback error handling if something is weird
+        response = {"type": "MOVE_RESULT", "status": "error", "message": "Could not determine turn"}
+        return updates, None, response
 
-        print(json.dumps(response))
+    # Save move and new FEN
+    next_fen = check.next_fen
+    updates["current_fen"] = next_fen
 
+    # Check game result (repetition count comes from the game's position table)
+    repetitions = record_position(game_id, check.position_hash, check.halfmove_clock == 0)
+    game_result = apply_draw_rules(check.result, repetitions=repetitions)
+
+    # Update game status if game ended
+    if game_result in ['checkmate', 'draw']:
+        winner_id = None
+        if game_result == 'checkmate':
+            # Winner is the player who just moved
+            winner_id = current_player_id
+
+        updates.update(
+            winner_id=winner_id,
+            status='FINISHED',
+            end_time=datetime.datetime.utcnow().isoformat()
+        )
+
+    # Success response
+    response = {
+        "type": "MOVE_RESULT",
+        "status": "success",
+        "is_valid": True,
+        "next_fen": next_fen,
+        "game_result": game_result,
+        "white_time": white_time,
+        "black_time": black_time,
+        # Time charged for this move, after crediting back lag_credit seconds of transit
+        "elapsed": elapsed,
+        "lag_credit": lag_credit,
+        "player_id": current_player_id,
+        # Lets the client reject illegal clicks locally (empty once the game is over)
+        "legal_moves": legal_moves(next_fen, board) if game_result == "in_progress" else []
+    }
+    return updates, (current_player_id, move_uci), response
+
+
+# ========== Diagnostics ==========
+
+@action('get_perf_stats')
+def handle_get_perf_stats(req):
+    # Latency histograms of this process (each serve-mode worker keeps its own)
+    response = {"status": "success", "pid": os.getpid(), "actions": perf_stats.snapshot()}
+    response["legal_moves_cache"] = legal_moves_cache.stats()
+    response["transposition_cache"] = transposition_cache.stats()
+    if board_cache is not None:
+        response["board_cache"] = board_cache.stats()
+    if req.get('reset'):
+        perf_stats.reset()
+    return response
+
+
+def handle_request(req, **context):
+    """
+    Run a single decoded request against the action handlers.
+    Returns the response dict (the caller decides how to send it).
+    context: extra keyword arguments from the server itself (e.g. MOVE timing), passed
+    to the handler; never taken from the request.
+    """
+    # Support both formats: "action" (from test) and "type" (from client)
+    action_name = req.get('action') or req.get('type')
+    handler = ACTIONS.get(action_name)
+    if handler is None:
+        return {"status": "error", "message": f"Unknown action: {action_name}"}
+
+    start = time.perf_counter()
+    try:
+        return handler(req, **context)
+    finally:
+        perf_stats.record(action_name, time.perf_counter() - start)
+
+
+def handle_line(line):
+    """
+    Decode one JSON request line and return the encoded JSON response (no newline).
+    Errors never escape, so a long-lived worker keeps serving after a bad request.
+    """
+    try:
+        if not line.strip():
+            return json.dumps({"status": "error", "message": "No input provided"})
+        return json.dumps(handle_request(json.loads(line)))
     except Exception as e:
         # traceback.print_exc() # Don't print stacktrace to stdout to avoid corrupting JSON
-        print(json.dumps({"status": "error", "message": str(e)}))
+        return json.dumps({"status": "error", "message": str(e)})
+
+
+# ========== Long-lived Serve Mode ==========
+# Spawning `python3 logic_wrapper.py "<json>"` per request pays interpreter startup,
+# `import chess` and SQLite open on every MOVE. In serve mode the modules are imported
+# once in the parent and a pool of pre-forked workers answers JSON lines directly.
+
+DEFAULT_SOCKET_PATH = os.environ.get("CHESS_LOGIC_SOCKET", "logic_wrapper.sock")
+DEFAULT_WORKERS = int(os.environ.get("CHESS_LOGIC_WORKERS", "4"))
+
+
+def serve_stdio(infile=None, outfile=None):
+    """
+    JSON-lines loop: one request per input line, one response per output line.
+    """
+    infile = infile or sys.stdin
+    outfile = outfile or sys.stdout
+    for line in infile:
+        if not line.strip():
+            continue
+        outfile.write(handle_line(line) + "\n")
+        outfile.flush()
+
+
+def _serve_connection(conn):
+    """
+    Answer newline-delimited requests on one accepted socket until the peer closes it.
+    """
+    reader = FrameReader(conn)
+    try:
+        while True:
+            line = reader.read_frame()
+            if line is None:
+                break
+            if not line:
+                continue
+            response = handle_line(line)
+            conn.sendall(response.encode("utf-8") + b"\n")
+    except (OSError, FramingError, UnicodeDecodeError):
+        pass  # Peer went away mid-request (or sent garbage), nothing to answer
+    finally:
+        conn.close()
+
+
+def _worker_loop(listener):
+    """
+    Body of a pre-forked worker: accept and serve connections forever.
+    """
+    import signal
+    global BATCH_WORKERS
+    BATCH_WORKERS = 1  # Workers already run one per core; no nested process pools
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Parent handles Ctrl+C
+    get_connection()  # Open the database once per worker, after fork
+    rank_index.get_index()  # Bulk-load ratings once, not on the first get_rank
+    while True:
+        try:
+            conn, _ = listener.accept()
+        except InterruptedError:
+            continue
+        _serve_connection(conn)
+
+
+def _spawn_worker(listener):
+    pid = os.fork()
+    if pid == 0:
+        try:
+            _worker_loop(listener)
+        finally:
+            os._exit(0)
+    return pid
+
+
+class _PoolShutdown(Exception):
+    pass
+
+
+def serve_unix(socket_path=DEFAULT_SOCKET_PATH, workers=DEFAULT_WORKERS):
+    """
+    Listen on a Unix socket and keep `workers` pre-forked processes warm.
+    Workers that die are respawned; SIGTERM/SIGINT stop the pool and remove the socket.
+    """
+    import signal
+    import socket
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(socket_path)
+    listener.listen(128)
+
+    children = set()
+
+    def stop(signum, frame):
+        # os.wait() is retried after a handler returns (PEP 475), so unwind explicitly
+        raise _PoolShutdown()
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    try:
+        for _ in range(max(1, workers)):
+            children.add(_spawn_worker(listener))
+        print(f"Logic server listening on {socket_path} with {len(children)} workers", file=sys.stderr)
+
+        while True:
+            try:
+                pid, _ = os.wait()
+            except ChildProcessError:
+                break
+            children.discard(pid)
+            children.add(_spawn_worker(listener))
+    except _PoolShutdown:
+        pass
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in children:
+            try:
+                os.waitpid(pid, 0)
+            except ChildProcessError:
+                pass
+        listener.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+
+
+def main():
+    if len(sys.argv) > 1 and sys.argv[1] in ('--serve', '--stdio'):
+        import argparse
+        parser = argparse.ArgumentParser(description="Chess logic worker")
+        parser.add_argument('--serve', action='store_true', help="pre-forked Unix socket server")
+        parser.add_argument('--stdio', action='store_true', help="JSON-lines loop on stdin/stdout")
+        parser.add_argument('--socket', default=DEFAULT_SOCKET_PATH)
+        parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS)
+        args = parser.parse_args()
+        if args.stdio:
+            serve_stdio()
+        else:
+            serve_unix(args.socket, args.workers)
+        return
+
+    # Read JSON from stdin or command line argument
+    if len(sys.argv) > 1:
+        # Join all args in case spaces split them (though we should quote properly)
+        input_str = " ".join(sys.argv[1:])
+    else:
+        # Fallback to stdin
+        input_str = sys.stdin.read()
+
+    print(handle_line(input_str))
 
 if __name__ == "__main__":
     main()
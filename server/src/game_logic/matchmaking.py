@@ -0,0 +1,125 @@
+"""
+In-memory RANDOM_MATCH queue, paired by ELO.
+
+Waiting players are kept in a list sorted by (elo, player_id), maintained with bisect.
+A player accepts opponents within a rating window that widens the longer they wait:
+    window(wait) = min(BASE_WINDOW + WIDEN_PER_SECOND * wait, MAX_WINDOW)
+
+Two players are only ever paired with a neighbour in rating order (the closest
+candidate on that side). Because windows only grow, the moment each neighbouring
+pair becomes acceptable to both players is known in advance, so candidate pairs sit
+in a heap keyed by that time. A tick pops the pairs that are due, which costs
+O(matches * log n) instead of a scan over the whole queue; joins and leaves push
+the (at most two) new neighbouring pairs they create.
+"""
+import heapq
+import itertools
+import time
+from bisect import bisect_left, insort
+
+BASE_WINDOW = 50.0          # ELO points accepted right away
+WIDEN_PER_SECOND = 10.0     # window growth while waiting
+MAX_WINDOW = 400.0
+TICK_SECONDS = 0.5          # how often the server runs tick()
+
+
+def window(wait):
+    return min(BASE_WINDOW + WIDEN_PER_SECOND * max(wait, 0.0), MAX_WINDOW)
+
+
+class MatchQueue:
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.keys = []          # sorted (elo, player_id)
+        self.players = {}       # player_id -> (elo, joined_at)
+        self.candidates = []    # heap of (due, seq, key_a, key_b); key_a < key_b
+        self.seq = itertools.count()
+
+    def __len__(self):
+        return len(self.players)
+
+    def __contains__(self, player_id):
+        return player_id in self.players
+
+    def _due(self, key_a, key_b):
+        """
+        Earliest time both players accept each other, or None if they never will.
+        """
+        gap = abs(key_b[0] - key_a[0])
+        if gap > MAX_WINDOW:
+            return None
+        widen = max(gap - BASE_WINDOW, 0.0) / WIDEN_PER_SECOND
+        return max(self.players[key_a[1]][1], self.players[key_b[1]][1]) + widen
+
+    def _push(self, i):
+        # Candidate pair: keys[i] and its right neighbour
+        if 0 <= i < len(self.keys) - 1:
+            key_a, key_b = self.keys[i], self.keys[i + 1]
+            due = self._due(key_a, key_b)
+            if due is not None:
+                heapq.heappush(self.candidates, (due, next(self.seq), key_a, key_b))
+
+    def _adjacent(self, key_a, key_b):
+        i = bisect_left(self.keys, key_a)
+        return (i + 1 < len(self.keys) and self.keys[i] == key_a
+                and self.keys[i + 1] == key_b)
+
+    def add(self, player_id, elo, now=None):
+        """
+        Queue a player (re-queueing updates the rating but keeps the waiting time).
+        """
+        now = self.clock() if now is None else now
+        joined_at = now
+        if player_id in self.players:
+            joined_at = self.players[player_id][1]
+            self.remove(player_id)
+        key = (elo, player_id)
+        self.players[player_id] = (elo, joined_at)
+        insort(self.keys, key)
+        i = bisect_left(self.keys, key)
+        self._push(i - 1)
+        self._push(i)
+        # Stale candidates are dropped lazily; rebuild if they pile up
+        if len(self.candidates) > 4 * len(self.keys) + 64:
+            self._rebuild()
+
+    def remove(self, player_id):
+        entry = self.players.pop(player_id, None)
+        if entry is None:
+            return False
+        i = bisect_left(self.keys, (entry[0], player_id))
+        del self.keys[i]
+        # The former neighbours are now adjacent
+        self._push(i - 1)
+        return True
+
+    def _rebuild(self):
+        self.candidates = []
+        for i in range(len(self.keys) - 1):
+            self._push(i)
+
+    def tick(self, now=None):
+        """
+        Take every pair that is due out of the queue.
+        Returns [(player_a, player_b), ...], longest-due pairs first.
+        """
+        now = self.clock() if now is None else now
+        matches = []
+        while self.candidates and self.candidates[0][0] <= now:
+            _, _, key_a, key_b = heapq.heappop(self.candidates)
+            if not self._adjacent(key_a, key_b):
+                continue  # one of them left or was matched since this was pushed
+            i = bisect_left(self.keys, key_a)
+            del self.keys[i:i + 2]
+            del self.players[key_a[1]]
+            del self.players[key_b[1]]
+            self._push(i - 1)
+            matches.append((key_a[1], key_b[1]))
+        return matches
+
+    def waiting_time(self, player_id, now=None):
+        entry = self.players.get(player_id)
+        if entry is None:
+            return None
+        now = self.clock() if now is None else now
+        return now - entry[1]
@@ -0,0 +1,87 @@
+"""
+16-bit move encoding and packed per-game move lists.
+
+A UCI move fits in 15 bits:
+    bits 0-5    from square (a1 = 0 ... h8 = 63, python-chess numbering)
+    bits 6-11   to square
+    bits 12-14  promotion piece (0 none, 1 n, 2 b, 3 r, 4 q)
+A game's moves are stored as one blob of little-endian uint16 codes, appended to
+as the game goes on, and decoded with array('H') in one call instead of one row
+(and one Python tuple) per ply.
+
+Archived games (see archive.py) keep the same blob behind their headers, zlib-compressed.
+"""
+import json
+import sys
+import zlib
+from array import array
+
+SQUARE_NAMES = [f + r for r in "12345678" for f in "abcdefgh"]
+PROMOTIONS = ("", "n", "b", "r", "q")
+# from/to half of the UCI string for every 12-bit square pair
+_FROM_TO = [SQUARE_NAMES[code & 63] + SQUARE_NAMES[code >> 6] for code in range(4096)]
+_SQUARE_INDEX = {name: i for i, name in enumerate(SQUARE_NAMES)}
+_PROMOTION_INDEX = {p: i for i, p in enumerate(PROMOTIONS) if p}
+ARCHIVE_COMPRESSION_LEVEL = 9    # written once, read rarely
+
+
+def encode_move(uci):
+    """
+    Code of a UCI move string ("e2e4", "e7e8q"). ValueError if it isn't one.
+    """
+    try:
+        code = _SQUARE_INDEX[uci[0:2]] | _SQUARE_INDEX[uci[2:4]] << 6
+        if len(uci) == 5:
+            code |= _PROMOTION_INDEX[uci[4]] << 12
+        elif len(uci) != 4:
+            raise KeyError(uci)
+    except (KeyError, TypeError):
+        raise ValueError(f"Not a UCI move: {uci!r}") from None
+    return code
+
+
+def decode_move(code):
+    return _FROM_TO[code & 0xFFF] + PROMOTIONS[code >> 12]
+
+
+def pack_moves(moves):
+    """
+    Blob for a list of UCI strings.
+    """
+    codes = array('H', [encode_move(m) for m in moves])
+    if sys.byteorder != 'little':
+        codes.byteswap()
+    return codes.tobytes()
+
+
+def unpack_codes(blob):
+    codes = array('H')
+    codes.frombytes(blob or b"")
+    if sys.byteorder != 'little':
+        codes.byteswap()
+    return codes
+
+
+def unpack_moves(blob):
+    """
+    UCI strings of a packed move list, in order.
+    """
+    from_to, promotions = _FROM_TO, PROMOTIONS
+    return [from_to[c & 0xFFF] + promotions[c >> 12] for c in unpack_codes(blob)]
+
+
+def pack_archive(headers, moves_blob):
+    """
+    Compressed archive record: JSON headers, a newline, then the packed moves.
+    """
+    raw = json.dumps(headers, separators=(",", ":")).encode("utf-8") + b"\n" + moves_blob
+    return zlib.compress(raw, ARCHIVE_COMPRESSION_LEVEL)
+
+
+def unpack_archive(data):
+    """
+    (headers, moves_blob) of an archive record.
+    """
+    raw = zlib.decompress(data)
+    end = raw.index(b"\n")     # json.dumps never writes a raw newline
+    return json.loads(raw[:end]), raw[end + 1:]
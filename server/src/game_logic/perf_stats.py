@@ -0,0 +1,90 @@
+"""
+Per-action latency histograms for logic_wrapper dispatch.
+
+Latencies go into fixed log-scale buckets (~9% wide, 1 µs .. ~100 s), so memory stays
+constant no matter how many requests are recorded and percentiles are cheap to read.
+Stats are per process: each serve-mode worker keeps its own.
+"""
+import math
+import threading
+
+# 8 buckets per power of two, starting at 1 microsecond
+BUCKETS_PER_OCTAVE = 8
+MIN_LATENCY = 1e-6
+NUM_BUCKETS = BUCKETS_PER_OCTAVE * 27  # up to ~134 s
+
+
+def _bucket_index(seconds):
+    if seconds <= MIN_LATENCY:
+        return 0
+    idx = int(math.log2(seconds / MIN_LATENCY) * BUCKETS_PER_OCTAVE) + 1
+    return min(idx, NUM_BUCKETS - 1)
+
+
+def _bucket_upper_bound(idx):
+    return MIN_LATENCY * 2 ** (idx / BUCKETS_PER_OCTAVE)
+
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts = [0] * NUM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[_bucket_index(seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, pct):
+        """
+        Upper bound of the bucket holding the pct-th percentile (never above max).
+        """
+        if self.count == 0:
+            return 0.0
+        rank = max(1, math.ceil(self.count * pct / 100.0))
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(_bucket_upper_bound(idx), self.max)
+        return self.max
+
+    def summary(self):
+        """
+        Snapshot in milliseconds.
+        """
+        to_ms = 1000.0
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * to_ms, 4) if self.count else 0.0,
+            "p50_ms": round(self.percentile(50) * to_ms, 4),
+            "p95_ms": round(self.percentile(95) * to_ms, 4),
+            "p99_ms": round(self.percentile(99) * to_ms, 4),
+            "max_ms": round(self.max * to_ms, 4),
+        }
+
+
+_lock = threading.Lock()
+_histograms = {}
+
+
+def record(name, seconds):
+    with _lock:
+        hist = _histograms.get(name)
+        if hist is None:
+            hist = _histograms[name] = LatencyHistogram()
+        hist.record(seconds)
+
+
+def snapshot():
+    with _lock:
+        return {name: hist.summary() for name, hist in sorted(_histograms.items())}
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
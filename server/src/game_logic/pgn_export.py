@@ -0,0 +1,174 @@
+"""
+Bulk PGN export: all finished games of a player and/or an end_time range.
+
+Games are read in fixed-size batches with keyset pagination (see
+db_handler.get_export_batch), turned into PGN text by a process pool (replaying
+moves is CPU-bound) and written out batch by batch, in order, as they come back.
+Games already rendered into GamePgn (see logic_wrapper pre_export_pgn) are copied
+as they are unless verify is set.
+Only a few batches are ever in flight, so memory stays flat however many games
+match. The output is any binary stream (a file, sys.stdout.buffer, or
+socket.makefile("wb")), optionally gzip-compressed.
+
+Usage:
+    python3 pgn_export.py --player alice -o alice.pgn
+    python3 pgn_export.py --since 2024-01-01 --until 2024-02-01 -o jan.pgn.gz --gzip
+    python3 pgn_export.py --player alice -o - | nc host 9000
+    python3 pgn_export.py --player alice --verify -o alice.pgn
+"""
+import argparse
+import gzip
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# Ensure we can import from the same directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db_handler import get_export_batch, get_move_list, get_player_id
+from game_logic import export_pgn
+from move_codec import unpack_moves, unpack_archive
+
+EXPORT_BATCH_SIZE = 500
+IN_FLIGHT_PER_WORKER = 2
+
+
+def pgn_result(winner_id, white_id):
+    if winner_id is None:
+        return "1/2-1/2"
+    return "1-0" if winner_id == white_id else "0-1"
+
+
+def pgn_date(start_time):
+    if start_time and isinstance(start_time, str):
+        return start_time.split('T')[0]
+    return "????.??.??"
+
+
+def game_pgn(row, verify=False):
+    """
+    PGN text of one get_export_batch row (with legacy moves appended, or None).
+    Same headers and result rules as the get_pgn action. verify: re-check every
+    move's legality instead of trusting the stored history (and GamePgn).
+    """
+    _, white_id, winner_id, start_time, _, white, black, blob, archived, cached, legacy = row
+    if cached is not None and not verify:
+        return cached
+    if blob is not None:
+        moves = unpack_moves(blob)
+    elif archived is not None:
+        moves = unpack_moves(unpack_archive(archived)[1])
+    else:
+        moves = legacy or []
+    return export_pgn(moves, white, black, pgn_result(winner_id, white_id),
+                      pgn_date(start_time), verify=verify)
+
+
+def batch_pgn(rows, verify=False):
+    """
+    One batch of games as PGN text (runs in the worker processes).
+    """
+    return "".join(game_pgn(row, verify) + "\n\n" for row in rows)
+
+
+def iter_batches(player_id=None, since=None, until=None, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Yield lists of export rows until the range is exhausted.
+    """
+    after = None
+    while True:
+        rows = get_export_batch(after, batch_size, player_id, since, until)
+        if not rows:
+            return
+        # Games with neither GameMoves nor an archive still have legacy Move rows
+        yield [row + ((get_move_list(row[0]) if row[7] is None and row[8] is None else None),)
+               for row in rows]
+        last = rows[-1]
+        after = last[0] if player_id is not None else (last[4], last[0])
+        if len(rows) < batch_size:
+            return
+
+
+def iter_pgn(player_id=None, since=None, until=None, batch_size=EXPORT_BATCH_SIZE,
+             executor=None, workers=1, verify=False):
+    """
+    Yield (games, pgn_text) per batch, in export order. With an executor, up to
+    IN_FLIGHT_PER_WORKER batches per worker are converted while the next ones are read.
+    """
+    batches = iter_batches(player_id, since, until, batch_size)
+    if executor is None:
+        for rows in batches:
+            yield len(rows), batch_pgn(rows, verify)
+        return
+    pending = deque()
+    for rows in batches:
+        pending.append((len(rows), executor.submit(batch_pgn, rows, verify)))
+        if len(pending) >= IN_FLIGHT_PER_WORKER * max(workers, 1):
+            games, future = pending.popleft()
+            yield games, future.result()
+    while pending:
+        games, future = pending.popleft()
+        yield games, future.result()
+
+
+def write_pgn(out, player_id=None, since=None, until=None, compress=False,
+              batch_size=EXPORT_BATCH_SIZE, executor=None, workers=1, verify=False):
+    """
+    Stream the export to a binary file-like object. Returns (games, bytes written
+    before compression).
+    """
+    stream = gzip.GzipFile(fileobj=out, mode="wb") if compress else out
+    games = written = 0
+    try:
+        for n, text in iter_pgn(player_id, since, until, batch_size, executor, workers,
+                                verify):
+            data = text.encode("utf-8")
+            stream.write(data)
+            games += n
+            written += len(data)
+    finally:
+        if compress:
+            stream.close()  # Writes the gzip trailer; `out` itself stays open
+    return games, written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export finished games as PGN")
+    parser.add_argument("--player", help="username (or numeric player id)")
+    parser.add_argument("--since", help="end_time lower bound, e.g. 2024-01-01")
+    parser.add_argument("--until", help="end_time upper bound (exclusive)")
+    parser.add_argument("-o", "--output", default="-", help="file path, or - for stdout")
+    parser.add_argument("--gzip", action="store_true", help="gzip the output")
+    parser.add_argument("--batch", type=int, default=EXPORT_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--verify", action="store_true",
+                        help="re-check move legality instead of trusting stored games")
+    args = parser.parse_args()
+
+    player_id = None
+    if args.player:
+        player_id = get_player_id(args.player)
+        if player_id is None and args.player.isdigit():
+            player_id = int(args.player)
+        if player_id is None:
+            parser.error(f"Unknown player: {args.player}")
+
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    start = time.perf_counter()
+    try:
+        games, written = write_pgn(out, player_id, args.since, args.until, args.gzip,
+                                   args.batch, executor, args.workers, args.verify)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        if out is not sys.stdout.buffer:
+            out.close()
+    print(f"Exported {games} games ({written} bytes of PGN) in "
+          f"{time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
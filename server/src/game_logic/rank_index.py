@@ -0,0 +1,156 @@
+"""
+In-memory global rank index over Player.elo.
+
+A Fenwick (binary indexed) tree counts players per ELO point, so "how many players
+are rated above X" is O(log range) instead of a COUNT(*) over Player. Ranks use
+competition ranking: players with equal ELO share a rank ("1224").
+
+The index is per process. update_player_elo / update_both_players_elo keep it in
+sync for writes made by this process. Triggers on Player bump RatingVersion in the
+same transaction as any rating change (see init_db), so writes from other processes
+are picked up by a rebuild once that version moves (checked at most every
+REFRESH_SECONDS); moves, lobby and other writes never cause one.
+"""
+import threading
+import time
+
+import database
+
+MAX_ELO = 4000          # ratings are clamped into [0, MAX_ELO] for bucketing
+REFRESH_SECONDS = 5.0
+RATING_VERSION = "SELECT version FROM RatingVersion WHERE id = 0"
+
+
+class RankIndex:
+    def __init__(self, max_elo=MAX_ELO):
+        self.size = max_elo + 1
+        self.tree = [0] * (self.size + 1)   # 1-based Fenwick tree over ELO points
+        self.ratings = {}                   # player_id -> bucketed elo
+        self.lock = threading.Lock()
+
+    def _bucket(self, elo):
+        return min(max(int(round(elo)), 0), self.size - 1)
+
+    def _add(self, elo, delta):
+        i = elo + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def _count_at_most(self, elo):
+        i, total = elo + 1, 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def build(self, rows):
+        """
+        Replace the contents with (player_id, elo) rows in one O(players + range) pass.
+        """
+        counts = [0] * (self.size + 1)
+        ratings = {}
+        for player_id, elo in rows:
+            bucket = self._bucket(elo if elo is not None else 0)
+            ratings[player_id] = bucket
+            counts[bucket + 1] += 1
+        # Turn per-point counts into a Fenwick tree in place
+        for i in range(1, self.size + 1):
+            parent = i + (i & -i)
+            if parent <= self.size:
+                counts[parent] += counts[i]
+        with self.lock:
+            self.tree = counts
+            self.ratings = ratings
+
+    def set(self, player_id, elo):
+        bucket = self._bucket(elo)
+        with self.lock:
+            old = self.ratings.get(player_id)
+            if old == bucket:
+                return
+            if old is not None:
+                self._add(old, -1)
+            self._add(bucket, 1)
+            self.ratings[player_id] = bucket
+
+    def rank_of_elo(self, elo):
+        """
+        Rank a player with this ELO has: 1 + number of players rated strictly higher.
+        """
+        bucket = self._bucket(elo)
+        with self.lock:
+            return 1 + len(self.ratings) - self._count_at_most(bucket)
+
+    def rank(self, player_id):
+        """
+        Rank of a player, or None if the player is not indexed.
+        """
+        with self.lock:
+            bucket = self.ratings.get(player_id)
+            if bucket is None:
+                return None
+            return 1 + len(self.ratings) - self._count_at_most(bucket)
+
+    def __len__(self):
+        return len(self.ratings)
+
+
+_index = None
+_index_db = None
+_rating_version = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    The process-wide index, built (or rebuilt) from Player when needed.
+    """
+    global _index, _index_db, _rating_version, _checked_at
+    with _lock:
+        conn = database.get_connection()
+        now = time.monotonic()
+        if _index is not None and _index_db == database.DB_NAME:
+            if now - _checked_at < REFRESH_SECONDS:
+                return _index
+            _checked_at = now
+            if rating_version(conn) == _rating_version:
+                return _index
+
+        with database.transaction(conn):   # Ratings and version from one snapshot
+            version = rating_version(conn)
+            rows = conn.execute("SELECT player_id, elo FROM Player").fetchall()
+        index = RankIndex()
+        index.build(rows)
+        _index, _index_db, _rating_version = index, database.DB_NAME, version
+        _checked_at = now
+        return _index
+
+
+def rating_version(conn):
+    return conn.execute(RATING_VERSION).fetchone()[0]
+
+
+def on_elo_changed(changes, before, after):
+    """
+    Called after an ELO update commits, with its (player_id, elo) changes and the
+    rating version read before and after them inside its transaction. If the index
+    was current at `before`, it is current at `after` too: no rebuild needed.
+    No-op until something has asked for a rank.
+    """
+    global _rating_version
+    with _lock:
+        index = _index
+        if index is None or _index_db != database.DB_NAME:
+            return
+        for player_id, elo in changes:
+            index.set(player_id, elo)
+        if _rating_version == before:
+            _rating_version = after
+
+
+def reset():
+    global _index, _index_db
+    with _lock:
+        _index, _index_db = None, None
@@ -0,0 +1,115 @@
+"""
+Scheduled Glicko-2 batch job: closes one rating period and rates it.
+
+Each run takes every game that finished since the last period ended, rates all
+players at once with glicko2.rate_period, writes Player.glicko_* with one
+executemany and records the period in RatingPeriod, all in one transaction.
+Nothing here runs on the move path; run it from cron, or with --every.
+
+Usage:
+    python3 rating_period.py                 # close one period now
+    python3 rating_period.py --every 86400   # one period per day, forever
+"""
+import argparse
+import datetime
+import os
+import sys
+import time
+
+import numpy as np
+
+# Ensure we can import from the same directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import glicko2
+from database import get_connection, transaction
+
+# Games are only picked up once they are this old, so a game whose end_time was
+# stamped just before the period closed but committed just after is not skipped
+SETTLE_SECONDS = 60
+
+
+def last_period_end(conn):
+    row = conn.execute("SELECT MAX(period_end) FROM RatingPeriod").fetchone()
+    return row[0] if row and row[0] else ""
+
+
+def run_period(period_end=None):
+    """
+    Rate all games that finished after the previous period and up to period_end
+    (an ISO timestamp like Game.end_time; default: now minus SETTLE_SECONDS).
+    Returns (games, players rated), or None if the period would be empty in time.
+    """
+    if period_end is None:
+        period_end = (datetime.datetime.utcnow()
+                      - datetime.timedelta(seconds=SETTLE_SECONDS)).isoformat()
+
+    with transaction(get_connection(), immediate=True) as conn:
+        period_start = last_period_end(conn)
+        if period_end <= period_start:
+            return None
+
+        players = conn.execute(
+            "SELECT player_id, glicko_rating, glicko_rd, glicko_vol FROM Player").fetchall()
+        index = {row[0]: i for i, row in enumerate(players)}
+        ratings = np.array([row[1] for row in players], dtype=np.float64)
+        rds = np.array([row[2] for row in players], dtype=np.float64)
+        vols = np.array([row[3] for row in players], dtype=np.float64)
+
+        white, black, results = [], [], []
+        for white_id, black_id, winner_id in conn.execute(
+            """
+            SELECT white_id, black_id, winner_id FROM Game
+            WHERE status = 'FINISHED' AND end_time > ? AND end_time <= ?
+            """,
+            (period_start, period_end)
+        ):
+            if winner_id is None:
+                result = 0.5
+            elif winner_id == white_id:
+                result = 1.0
+            elif winner_id == black_id:
+                result = 0.0
+            else:
+                continue
+            if white_id in index and black_id in index:
+                white.append(index[white_id])
+                black.append(index[black_id])
+                results.append(result)
+
+        ratings, rds, vols = glicko2.rate_period(
+            ratings, rds, vols, np.array(white, dtype=np.int64),
+            np.array(black, dtype=np.int64), np.array(results, dtype=np.float64))
+
+        conn.executemany(
+            "UPDATE Player SET glicko_rating = ?, glicko_rd = ?, glicko_vol = ? WHERE player_id = ?",
+            zip(ratings.tolist(), rds.tolist(), vols.tolist(), (row[0] for row in players))
+        )
+        conn.execute(
+            "INSERT INTO RatingPeriod (period_start, period_end, games) VALUES (?, ?, ?)",
+            (period_start or None, period_end, len(white))
+        )
+        rated = len(set(white) | set(black))
+    return len(white), rated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Close a Glicko-2 rating period")
+    parser.add_argument("--every", type=float, default=None,
+                        help="keep running, closing a period every N seconds")
+    args = parser.parse_args()
+
+    while True:
+        start = time.perf_counter()
+        outcome = run_period()
+        if outcome is not None:
+            games, rated = outcome
+            print(f"Rating period closed: {games} games, {rated} players rated "
+                  f"in {time.perf_counter() - start:.2f}s")
+        if args.every is None:
+            break
+        time.sleep(args.every)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,6 +16,11 @@ def reset_database():
         print(f"✅ Đã xóa database cũ: {DB_NAME}")
     else:
         print(f"ℹ️  Không tìm thấy database cũ: {DB_NAME}")
+
+    # Xóa luôn file WAL/SHM (journal_mode=WAL) để DB mới không đọc lại dữ liệu cũ
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(DB_NAME + suffix):
+            os.remove(DB_NAME + suffix)
     
     # Khởi tạo database mới
     print("\n🔄 Đang khởi tạo database mới...")
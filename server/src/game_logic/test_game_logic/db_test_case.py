@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import init_db
+
+
+class DatabaseTestCase(unittest.TestCase):
+    """
+    Base class for tests that need a database: each test gets a fresh one in a temp
+    directory (database.DB_NAME patched to it, schema from init_db).
+    """
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.patcher = patch('database.DB_NAME', os.path.join(self.tmpdir.name, "test.db"))
+        self.patcher.start()
+        init_db.init_db()
+
+    def tearDown(self):
+        database.close_all_connections()
+        self.patcher.stop()
+        self.tmpdir.cleanup()
+
+    def add_players(self, *names, elo=None):
+        """
+        Insert players (password 'x') and return their ids in order. elo: one rating
+        for all of them, or a list with one per name (default: the column default).
+        """
+        if elo is None or isinstance(elo, (int, float)):
+            elo = [elo] * len(names)
+        with database.transaction() as conn:
+            return [conn.execute("INSERT INTO Player (username, password, elo) "
+                                 "VALUES (?, 'x', COALESCE(?, 1000))", (name, rating)).lastrowid
+                    for name, rating in zip(names, elo)]
@@ -0,0 +1,61 @@
+import os
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import db_handler
+import logic_wrapper
+from db_test_case import DatabaseTestCase
+
+
+class TestApplyMove(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.white_id, self.black_id = self.add_players("Alice", "Bob")
+        self.game_id = db_handler.create_game(self.white_id, self.black_id, 'BLITZ', 300.0)
+
+    def move(self, frm, to):
+        return logic_wrapper.handle_request(
+            {"type": "MOVE", "game_id": str(self.game_id), "from": frm, "to": to})
+
+    def test_moves_are_written_together(self):
+        for frm, to in [("f2", "f3"), ("e7", "e5"), ("g2", "g4"), ("d8", "h4")]:
+            res = self.move(frm, to)
+            self.assertTrue(res["is_valid"], res)
+        self.assertEqual(res["game_result"], "checkmate")
+
+        game = db_handler.get_game_info(self.game_id)
+        self.assertEqual(game[6], self.black_id)  # winner_id
+        self.assertEqual(game[7], 'FINISHED')
+        self.assertEqual(game[8], res["next_fen"])
+        self.assertEqual([m[1] for m in db_handler.get_moves(self.game_id)],
+                         ["f2f3", "e7e5", "g2g4", "d8h4"])
+
+    def test_invalid_move_only_punches_clock(self):
+        res = self.move("e2", "e5")
+        self.assertFalse(res["is_valid"])
+        self.assertEqual(db_handler.get_moves(self.game_id), [])
+        self.assertIsNotNone(db_handler.get_game_time(self.game_id)[2])
+
+    def test_failure_midway_writes_nothing(self):
+        def resolve(game):
+            raise RuntimeError("crash after reading state")
+
+        before = db_handler.get_game_time(self.game_id)
+        with self.assertRaises(RuntimeError):
+            db_handler.apply_move(self.game_id, resolve)
+        self.assertEqual(db_handler.get_game_time(self.game_id), before)
+        self.assertFalse(database.get_connection().in_transaction)
+
+    def test_unknown_game(self):
+        res = logic_wrapper.handle_request({"type": "MOVE", "game_id": "999", "from": "e2", "to": "e4"})
+        self.assertEqual(res["status"], "error")
+        self.assertIn("does not exist", res["message"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import datetime
+import os
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import db_handler
+import logic_wrapper
+from archive import run_archive
+from db_test_case import DatabaseTestCase
+
+FOOLS_MATE = [("f2", "f3"), ("e7", "e5"), ("g2", "g4"), ("d8", "h4")]
+
+
+class TestArchive(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.white, self.black = self.add_players("alice", "bob")
+
+    def play(self, moves):
+        game_id = db_handler.create_game(self.white, self.black, "BLITZ", 300.0)
+        for frm, to in moves:
+            res = logic_wrapper.handle_request(
+                {"type": "MOVE", "game_id": game_id, "from": frm, "to": to})
+            self.assertTrue(res["is_valid"], res)
+        return game_id
+
+    def reads(self, game_id):
+        return [logic_wrapper.handle_request({"action": action, "game_id": game_id})
+                for action in ("get_replay", "get_game_log", "get_pgn")]
+
+    def hot_rows(self, game_id):
+        conn = database.get_connection()
+        return [conn.execute(f"SELECT COUNT(*) FROM {table} WHERE game_id = ?", (game_id,)).fetchone()[0]
+                for table in ("GameMoves", "GamePosition", "Move")]
+
+    def test_finished_games_move_to_the_archive(self):
+        finished = [self.play(FOOLS_MATE) for _ in range(3)]
+        ongoing = self.play(FOOLS_MATE[:2])
+        before = {g: self.reads(g) for g in finished + [ongoing]}
+        self.assertIn("1. f3 e5 2. g4 Qh4# 0-1", before[finished[0]][2]["pgn"])
+
+        # Not old enough yet
+        self.assertEqual(run_archive(days=7), 0)
+        later = datetime.datetime.utcnow() + datetime.timedelta(days=8)
+        self.assertEqual(run_archive(days=7, batch_size=2, now=later), 3)
+        self.assertEqual(run_archive(days=7, now=later), 0)
+
+        for game_id in finished:
+            self.assertEqual(self.hot_rows(game_id), [0, 0, 0])
+            self.assertEqual(self.reads(game_id), before[game_id])
+            self.assertEqual(db_handler.get_game_info(game_id)[7], "FINISHED")  # Game row stays
+        self.assertNotEqual(self.hot_rows(ongoing)[:2], [0, 0])
+        self.assertEqual(self.reads(ongoing), before[ongoing])
+
+        # Games finishing later are picked up by the next run
+        newer = self.play(FOOLS_MATE)
+        self.assertEqual(run_archive(days=7, now=later), 1)
+        self.assertEqual(self.hot_rows(newer), [0, 0, 0])
+        headers, moves = db_handler.get_archived_game(newer)
+        self.assertEqual(moves, ["f2f3", "e7e5", "g2g4", "d8h4"])
+        self.assertEqual((headers["white_player"]["username"], headers["winner_id"]),
+                         ("alice", self.black))
+
+    def test_end_time_does_not_hide_games(self):
+        late, early, unknown = [self.play(FOOLS_MATE[:2]) for _ in range(3)]
+        db_handler.update_game_result(late, None, "FINISHED", "2024-03-01T00:00:00")
+        self.assertEqual(run_archive(), 1)
+        # end_time comes from the request: earlier than an archived game, or missing
+        db_handler.update_game_result(early, None, "FINISHED", "2024-02-01T00:00:00")
+        db_handler.update_game_result(unknown, None, "FINISHED", None)
+        self.assertEqual(run_archive(batch_size=1), 2)
+        for game_id in (late, early, unknown):
+            self.assertIsNotNone(db_handler.get_archived_game(game_id))
+
+    def test_no_moves_after_the_game_is_over(self):
+        game_id = self.play([("e2", "e4"), ("e7", "e5")])
+        db_handler.update_game_result(game_id, None, "FINISHED", "2024-01-01T00:00:00")
+        self.assertEqual(run_archive(), 1)
+
+        res = logic_wrapper.handle_request({"type": "MOVE", "game_id": game_id, "from": "g1", "to": "f3"})
+        self.assertEqual(res["status"], "error")
+        res = logic_wrapper.handle_request(
+            {"action": "log_move", "game_id": game_id, "player_id": self.white, "move": "g1f3"})
+        self.assertEqual(res["status"], "error")
+        self.assertRaises(ValueError, db_handler.insert_move, game_id, self.white, "g1f3")
+        self.assertEqual(self.hot_rows(game_id), [0, 0, 0])
+        self.assertEqual(db_handler.get_move_list(game_id), ["e2e4", "e7e5"])
+
+
+if __name__ == '__main__':
+    unittest.main()
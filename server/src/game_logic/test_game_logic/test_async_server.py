@@ -0,0 +1,161 @@
+import asyncio
+import json
+import os
+import sys
+import threading
+import unittest
+from unittest.mock import patch
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_handler
+import logic_wrapper
+from async_server import GameServer
+from db_test_case import DatabaseTestCase
+
+INITIAL_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class TestAsyncServer(DatabaseTestCase):
+
+    async def _request(self, reader, writer, req):
+        writer.write((json.dumps(req) + "\n").encode("utf-8"))
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    def test_many_connections_and_lobby_sessions(self):
+        async def scenario():
+            server = GameServer("127.0.0.1", 0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+
+            clients = [await asyncio.open_connection("127.0.0.1", port) for _ in range(50)]
+            results = await asyncio.gather(*[
+                self._request(r, w, {"action": "validate_move", "fen": INITIAL_FEN, "move": "e2e4"})
+                for r, w in clients
+            ])
+            self.assertTrue(all(res["is_valid"] for res in results))
+
+            # Bad JSON gets an error line, connection stays usable
+            r, w = clients[0]
+            w.write(b"not json\r\n")
+            self.assertEqual(json.loads(await r.readline())["status"], "error")
+
+            # Lobby tracking: join, then disconnect removes the player
+            res = await self._request(r, w, {"action": "join_lobby", "player_id": 7})
+            self.assertEqual(res["status"], "success")
+            self.assertEqual(server.ready_players, [7])
+            w.close()
+            await w.wait_closed()
+            for _ in range(50):
+                if not server.ready_players:
+                    break
+                await asyncio.sleep(0.02)
+            self.assertEqual(server.ready_players, [])
+            self.assertEqual(server.client_sessions, {})
+
+            await server.stop()
+            self.assertEqual(server.connections, set())
+            for r, w in clients[1:]:
+                self.assertEqual(await r.read(), b"")  # Closed by the server
+
+        asyncio.run(scenario())
+
+    def test_moves_are_pushed_to_the_other_subscribers(self):
+        async def scenario():
+            white, black = self.add_players("w", "b")
+            game_id = db_handler.create_game(white, black, "RAPID", 600.0)
+
+            server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            (rw, ww), (rb, wb) = [await asyncio.open_connection("127.0.0.1", port) for _ in range(2)]
+
+            res = await self._request(rw, ww, {"type": "GET_LEGAL_MOVES", "game_id": game_id})
+            self.assertIn("e2e4", res["legal_moves"])
+            res = await self._request(rb, wb, {"type": "SUBSCRIBE_GAME", "game_id": game_id})
+            self.assertEqual(res["status"], "success")
+
+            res = await self._request(rw, ww, {"type": "MOVE", "game_id": game_id, "from": "e2", "to": "e4"})
+            self.assertTrue(res["is_valid"])
+            update = json.loads(await rb.readline())
+            self.assertEqual(update["type"], "GAME_UPDATE")
+            self.assertEqual(update["last_move"], {"from": "e2", "to": "e4"})
+            self.assertEqual(update["fen"], res["next_fen"])
+            self.assertIn("e7e5", update["legal_moves"])
+
+            # An invalid move is not pushed; the mover never gets its own update
+            res = await self._request(rb, wb, {"type": "MOVE", "game_id": game_id, "from": "e7", "to": "e3"})
+            self.assertFalse(res["is_valid"])
+            res = await self._request(rb, wb, {"type": "MOVE", "game_id": game_id, "from": "e7", "to": "e5"})
+            self.assertTrue(res["is_valid"])
+            update = json.loads(await rw.readline())
+            self.assertEqual((update["type"], update["last_move"]["to"]), ("GAME_UPDATE", "e5"))
+
+            wb.close()
+            await wb.wait_closed()
+            for _ in range(50):
+                if len(server.game_subscribers[game_id]) == 1:
+                    break
+                await asyncio.sleep(0.02)
+            self.assertEqual(len(server.game_subscribers[game_id]), 1)
+            ww.close()
+            await server.stop()
+
+        asyncio.run(scenario())
+
+    def test_bulk_requests_do_not_hold_up_moves(self):
+        async def scenario():
+            release = threading.Event()
+            def slow_export(req):
+                release.wait(5)
+                return {"status": "success", "games": 0}
+
+            server = GameServer("127.0.0.1", 0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            (r1, w1), (r2, w2) = [await asyncio.open_connection("127.0.0.1", port) for _ in range(2)]
+            with patch.dict(logic_wrapper.ACTIONS, {"export_games": slow_export}):
+                w1.write(b'{"action": "export_games"}\n')
+                await w1.drain()
+                res = await asyncio.wait_for(self._request(
+                    r2, w2, {"action": "validate_move", "fen": INITIAL_FEN, "move": "e2e4"}), 2)
+                self.assertTrue(res["is_valid"])
+                release.set()
+                self.assertEqual(json.loads(await r1.readline())["status"], "success")
+            w1.close()
+            w2.close()
+            await server.stop()
+
+        asyncio.run(scenario())
+
+    def test_finished_game_pgn_is_rendered_in_the_background(self):
+        threads = {}
+        def pre_export(req, handler=logic_wrapper.ACTIONS["pre_export_pgn"]):
+            threads[req["action"]] = threading.current_thread().name.split("_")[0]
+            return handler(req)
+
+        async def scenario():
+            white, black = self.add_players("w", "b")
+            game_id = db_handler.create_game(white, black, "RAPID", 600.0)
+
+            server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            r, w = await asyncio.open_connection("127.0.0.1", port)
+            for frm, to in [("f2", "f3"), ("e7", "e5"), ("g2", "g4"), ("d8", "h4")]:
+                res = await self._request(r, w, {"type": "MOVE", "game_id": game_id, "from": frm, "to": to})
+            self.assertEqual(res["game_result"], "checkmate")
+            w.close()
+            await server.stop()  # Waits for the background pre-export
+            self.assertIn("2. g4 Qh4# 0-1", db_handler.get_cached_pgn(game_id))
+
+        with patch.dict(logic_wrapper.ACTIONS, {"pre_export_pgn": pre_export}):
+            asyncio.run(scenario())
+        # Rendered on the bulk thread, not in front of live moves
+        self.assertEqual(threads, {"pre_export_pgn": "bulk"})
+
+
+if __name__ == '__main__':
+    unittest.main()
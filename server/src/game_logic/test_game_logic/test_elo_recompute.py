@@ -0,0 +1,100 @@
+import os
+import random
+import sys
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import elo_recompute
+from db_test_case import DatabaseTestCase
+from elo_system import calculate_elo
+
+
+def scalar_replay(games, initial):
+    ratings = {}
+    for white, black, winner in games:
+        if winner is None:
+            result = 0.5
+        elif winner == white:
+            result = 1.0
+        elif winner == black:
+            result = 0.0
+        else:
+            continue
+        rw, rb = ratings.get(white, initial), ratings.get(black, initial)
+        ratings[white], ratings[black] = calculate_elo(rw, rb, result)
+    return ratings
+
+
+class TestEloArrays(unittest.TestCase):
+
+    def check_matches_calculate_elo(self):
+        rng = random.Random(11)
+        games = [(rng.randint(900, 2000), rng.randint(900, 2000), rng.choice([0.0, 0.5, 1.0]))
+                 for _ in range(2000)]
+        new_a, new_b = elo_recompute.calculate_elo_arrays(
+            *[np.array(column, dtype=np.float64) for column in zip(*games)])
+        self.assertEqual(list(zip(new_a.tolist(), new_b.tolist())),
+                         [calculate_elo(a, b, result) for a, b, result in games])
+
+    def test_same_k_factor_rule_as_live_ratings(self):
+        self.check_matches_calculate_elo()
+        # A retuned rule applies to both paths
+        tiers = lambda rating: 40 if rating < 1200 else 20 if rating < 1800 else 10
+        with patch('elo_system.get_k_factor', tiers):
+            self.check_matches_calculate_elo()
+
+
+class TestEloRecompute(DatabaseTestCase):
+
+    def insert_games(self, players, count, seed):
+        rng = random.Random(seed)
+        ids = self.add_players(*(f"p{i}" for i in range(players)), elo=1500)
+        with database.transaction() as conn:
+            games = []
+            for i in range(count):
+                white, black = rng.sample(ids, 2)
+                winner = rng.choice([white, black, None])
+                # Insert out of order: the replay must follow end_time, not game_id
+                end_time = f"2024-01-01 00:{rng.randrange(60):02d}:{rng.randrange(60):02d}"
+                game_id = conn.execute(
+                    "INSERT INTO Game (white_id, black_id, mode, status, winner_id, end_time) "
+                    "VALUES (?, ?, 'RAPID', 'FINISHED', ?, ?)",
+                    (white, black, winner, end_time)).lastrowid
+                games.append((end_time, game_id, white, black, winner))
+            conn.execute("INSERT INTO Game (white_id, black_id, mode, status) "
+                         "VALUES (?, ?, 'RAPID', 'ONGOING')", (ids[0], ids[1]))
+        games.sort()
+        return ids, [(w, b, winner) for _, _, w, b, winner in games]
+
+    def test_matches_scalar_replay(self):
+        ids, games = self.insert_games(players=25, count=1500, seed=11)
+        # Small chunks so waves are also cut at chunk boundaries
+        new_elos, replayed = elo_recompute.recompute(initial=1000, chunk_size=97)
+        expected = scalar_replay(games, 1000)
+        self.assertEqual(replayed, len(games))
+        self.assertEqual(new_elos, {pid: expected.get(pid, 1000) for pid in ids})
+
+        stored = dict(database.get_connection().execute("SELECT player_id, elo FROM Player"))
+        self.assertEqual(stored, new_elos)
+
+    def test_dry_run_does_not_write(self):
+        ids, _ = self.insert_games(players=4, count=20, seed=3)
+        new_elos, _ = elo_recompute.recompute(dry_run=True)
+        self.assertNotEqual(set(new_elos.values()), {1500})
+        stored = dict(database.get_connection().execute("SELECT player_id, elo FROM Player"))
+        self.assertEqual(set(stored.values()), {1500})
+
+    def test_waves_are_player_disjoint(self):
+        white = np.array([0, 2, 0, 1, 3])
+        black = np.array([1, 3, 2, 3, 0])
+        self.assertEqual(elo_recompute.assign_waves(white, black, 4).tolist(), [1, 1, 2, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import random
+import sys
+import unittest
+
+import chess
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_handler
+import logic_wrapper
+from db_test_case import DatabaseTestCase
+from game_logic import export_pgn
+
+FOOLS_MATE = [("f2", "f3"), ("e7", "e5"), ("g2", "g4"), ("d8", "h4")]
+
+
+def random_game(rng, plies):
+    board = chess.Board()
+    moves = []
+    while len(moves) < plies and not board.is_game_over():
+        move = rng.choice(list(board.legal_moves))
+        moves.append(move.uci())
+        board.push(move)
+    return moves
+
+
+class TestExportPgn(unittest.TestCase):
+
+    def test_trusted_replay_matches_verified(self):
+        rng = random.Random(7)
+        games = [random_game(rng, rng.randint(0, 300)) for _ in range(40)]
+        # Promotions, castling, en passant and mate
+        games.append(["e2e4", "d7d5", "e4d5", "c7c6", "d5c6", "g8f6", "c6b7", "e8d7", "b7a8q"])
+        games.append(["e2e4", "a7a6", "e4e5", "d7d5", "e5d6", "e8d7", "g1f3", "a6a5",
+                      "f1e2", "a5a4", "e1g1"])
+        games.append(["f2f3", "e7e5", "g2g4", "d8h4"])
+        for moves in games:
+            for result in ("1-0", "0-1", "1/2-1/2", "*"):
+                self.assertEqual(export_pgn(moves, "w", "b", result, "2024.01.01"),
+                                 export_pgn(moves, "w", "b", result, "2024.01.01", verify=True))
+        self.assertIn("1. f3 e5 2. g4 Qh4# 0-1", export_pgn(games[-1], "w", "b", "0-1", "?"))
+
+    def test_illegal_history_falls_back_to_verified(self):
+        for moves in (["e2e4", "e2e4"], ["e2e4", "e7e5", "e2e3", "d7d5"],
+                      ["e2e4", "e7e5", "g1g4", "b8c6"], ["e2e4", "e7e5", "e1e2", "e8e7", "e2e4"],
+                      ["e2e5", "e7e5"]):
+            self.assertEqual(export_pgn(moves, "w", "b", "*", "?", verify=True),
+                             export_pgn(moves, "w", "b", "*", "?"))
+        self.assertIn("1. e4 e5 *", export_pgn(["e2e4", "e7e5", "g1g4", "b8c6"], "w", "b", "*", "?"))
+
+
+class TestPreExport(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.white, self.black = self.add_players("alice", "bob")
+        self.game_id = db_handler.create_game(self.white, self.black, "BLITZ", 300.0)
+
+    def get_pgn(self, **extra):
+        return logic_wrapper.handle_request({"action": "get_pgn", "game_id": self.game_id, **extra})
+
+    def test_finished_game_is_rendered_once(self):
+        res = logic_wrapper.handle_request({"action": "pre_export_pgn", "game_id": self.game_id})
+        self.assertEqual(res["status"], "error")  # Still running
+
+        for frm, to in FOOLS_MATE:
+            logic_wrapper.handle_request({"type": "MOVE", "game_id": self.game_id, "from": frm, "to": to})
+        pgn = self.get_pgn()["pgn"]
+        self.assertIsNone(db_handler.get_cached_pgn(self.game_id))
+        res = logic_wrapper.handle_request({"action": "pre_export_pgn", "game_id": self.game_id})
+        self.assertEqual(res["status"], "success")
+        self.assertEqual(db_handler.get_cached_pgn(self.game_id), pgn)
+        self.assertEqual(self.get_pgn()["pgn"], pgn)
+        self.assertEqual(self.get_pgn(verify=True)["pgn"], pgn)
+
+        # A changed result drops the stale copy
+        logic_wrapper.handle_request({"action": "update_game_result", "game_id": self.game_id,
+                                      "winner_id": None, "status": "FINISHED",
+                                      "end_time": "2024-01-01T00:00:00"})
+        self.assertIsNone(db_handler.get_cached_pgn(self.game_id))
+        self.assertIn("1/2-1/2", self.get_pgn()["pgn"])
+
+    def test_log_move_only_accepts_legal_moves(self):
+        for move, status in (("e2e4", "success"), ("e2e4", "error"), ("e7e5", "success"),
+                             ("a1a8", "error"), ("g1f3", "success")):
+            res = logic_wrapper.handle_request(
+                {"action": "log_move", "game_id": self.game_id, "player_id": self.white, "move": move})
+            self.assertEqual(res["status"], status, move)
+        self.assertEqual(db_handler.get_move_list(self.game_id), ["e2e4", "e7e5", "g1f3"])
+        # Checked against the current position, not a replay of the stored moves
+        self.assertEqual(db_handler.get_game_fen(self.game_id),
+                         "rnbqkbnr/pppp1ppp/8/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R b KQkq - 1 2")
+        res = logic_wrapper.handle_request(
+            {"action": "log_move", "game_id": 999, "player_id": self.white, "move": "e2e4"})
+        self.assertEqual(res["status"], "error")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import db_handler
+import logic_wrapper
+from async_server import GameServer
+from db_test_case import DatabaseTestCase
+from flag_scheduler import FlagScheduler, flag_deadline
+from lag_compensation import MAX_LAG_PER_MOVE
+
+INITIAL_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+
+
+class TestFlagScheduler(unittest.TestCase):
+
+    def test_reschedule_and_cancel(self):
+        flags = FlagScheduler()
+        self.assertTrue(flags.schedule(1, 30.0))
+        self.assertTrue(flags.schedule(2, 10.0))
+        self.assertFalse(flags.schedule(3, 20.0))
+        flags.schedule(2, 40.0)   # a move pushed game 2's deadline back
+        flags.cancel(3)           # game 3 ended
+        self.assertEqual(flags.next_deadline(), 30.0)
+        self.assertEqual(flags.pop_due(35.0), [1])
+        self.assertEqual(flags.pop_due(100.0), [2])
+        self.assertEqual(len(flags), 0)
+
+    def test_many_games_stay_compact(self):
+        flags = FlagScheduler()
+        for move in range(200):
+            for game_id in range(100):
+                flags.schedule(game_id, move * 10.0 + game_id)
+        self.assertLessEqual(len(flags.heap), 2 * len(flags) + 64)
+        self.assertEqual(flags.pop_due(1990.0 + 4), [0, 1, 2, 3, 4])
+
+    def test_deadline_is_side_to_move(self):
+        self.assertEqual(flag_deadline(INITIAL_FEN, 100.0, 50.0, "1000.0"), 1100.0)
+        self.assertEqual(flag_deadline(AFTER_E4, 100.0, 50.0, "1000.0"), 1050.0)
+        self.assertIsNone(flag_deadline(INITIAL_FEN, 100.0, 50.0, None))
+
+
+class TestFlagFall(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.white, self.black = self.add_players("w", "b")
+        self.game_id = db_handler.create_game(self.white, self.black, "BLITZ", 300.0)
+
+    def set_clock(self, fen, white_time, black_time, last_move_time):
+        db_handler.update_game_fen(self.game_id, fen)
+        db_handler.update_game_time(self.game_id, white_time, black_time, str(last_move_time))
+
+    def test_check_flag_ends_game_only_when_due(self):
+        now = time.time()
+        self.set_clock(AFTER_E4, 250.0, 30.0, now - 10)
+        res = logic_wrapper.handle_request({"action": "check_flag", "game_id": self.game_id})
+        self.assertFalse(res["flagged"])
+        self.assertAlmostEqual(res["deadline"], now + 20 + MAX_LAG_PER_MOVE, places=3)
+
+        # Out of time, but a move could still be in transit
+        self.set_clock(AFTER_E4, 250.0, 30.0, now - 30.5)
+        res = logic_wrapper.handle_request({"action": "check_flag", "game_id": self.game_id})
+        self.assertFalse(res["flagged"])
+
+        self.set_clock(AFTER_E4, 250.0, 30.0, now - 30 - MAX_LAG_PER_MOVE - 0.1)
+        res = logic_wrapper.handle_request({"action": "check_flag", "game_id": self.game_id})
+        self.assertTrue(res["flagged"])
+        self.assertEqual(res["winner_id"], self.white)
+        status, winner = database.get_connection().execute(
+            "SELECT status, winner_id FROM Game WHERE game_id = ?", (self.game_id,)).fetchone()
+        self.assertEqual((status, winner), ("FINISHED", self.white))
+
+        # Already finished: nothing more to do
+        res = logic_wrapper.handle_request({"action": "check_flag", "game_id": self.game_id})
+        self.assertEqual((res["flagged"], res["deadline"]), (False, None))
+
+    def test_server_flags_an_abandoned_game(self):
+        async def scenario():
+            # Black's clock ran out while no server was running
+            self.set_clock(AFTER_E4, 250.0, 30.0, time.time() - 60)
+            server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+            await server.start()
+            for _ in range(100):
+                row = database.get_connection().execute(
+                    "SELECT status, winner_id FROM Game WHERE game_id = ?", (self.game_id,)).fetchone()
+                if row[0] == "FINISHED":
+                    break
+                await asyncio.sleep(0.01)
+            self.assertEqual(row, ("FINISHED", self.white))
+            await server.stop()
+
+        asyncio.run(scenario())
+
+    def test_white_flags_without_a_first_move(self):
+        async def scenario():
+            server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write((json.dumps({"action": "create_game", "white_id": self.white,
+                                      "black_id": self.black, "mode": "BLITZ"}) + "\n").encode())
+            await writer.drain()
+            game_id = json.loads(await reader.readline())["game_id"]
+            # White's clock runs from creation
+            self.assertAlmostEqual(server.flags.deadlines[game_id][0],
+                                   time.time() + 300.0 + MAX_LAG_PER_MOVE, delta=2)
+            writer.close()
+            await server.stop()
+
+            # A restarted server reschedules it, and it ends once White's time is up
+            deadlines = dict(logic_wrapper.handle_request({"action": "get_running_clocks"})["deadlines"])
+            self.assertIn(game_id, deadlines)
+            res = logic_wrapper.flag_game(game_id, deadlines[game_id] + 0.1)
+            self.assertEqual((res["flagged"], res["winner_id"]), (True, self.black))
+
+        asyncio.run(scenario())
+
+    def test_first_move_is_charged(self):
+        res = logic_wrapper.handle_request(
+            {"type": "MOVE", "game_id": self.game_id, "from": "e2", "to": "e4"}, elapsed=12.0)
+        self.assertAlmostEqual(res["white_time"], 288.0)
+
+    def test_move_schedules_the_opponents_flag(self):
+        async def scenario():
+            server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+            async def move(frm, to):
+                writer.write((json.dumps({"type": "MOVE", "game_id": self.game_id,
+                                          "from": frm, "to": to}) + "\n").encode())
+                await writer.drain()
+                return json.loads(await reader.readline())
+
+            await move("e2", "e4")
+            self.assertIn(self.game_id, server.flags)
+            self.assertAlmostEqual(server.flags.next_deadline(), time.time() + 300.0, delta=2)
+            await move("e7", "e5")
+            self.assertAlmostEqual(server.flags.next_deadline(), time.time() + 300.0, delta=2)
+            self.assertEqual(len(server.flags), 1)
+            writer.close()
+            await server.stop()
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
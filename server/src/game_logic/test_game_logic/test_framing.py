@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import socket
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# The UI client lives in <repo>/ui
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', '..', 'ui'))
+
+import framing
+from async_server import GameServer
+from db_test_case import DatabaseTestCase
+from framing import FrameReader, FramingError, LENGTH, LINE
+from network_client import ChessClient
+
+INITIAL_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class TestFraming(unittest.TestCase):
+
+    def setUp(self):
+        self.left, self.right = socket.socketpair()
+
+    def tearDown(self):
+        self.left.close()
+        self.right.close()
+
+    def test_encode_and_negotiate(self):
+        self.assertEqual(framing.encode({"a": 1}), b'{"a": 1}\n')
+        self.assertEqual(framing.encode({"a": 1}, LENGTH), b'\x00\x00\x00\x08{"a": 1}')
+        self.assertEqual(framing.negotiate(["line", "length"]), LENGTH)
+        self.assertEqual(framing.negotiate(["line"]), LINE)
+        self.assertEqual(framing.negotiate(["carrier-pigeon"]), LINE)
+        self.assertEqual(framing.negotiate(None), LINE)
+
+    def test_line_frames_across_reads_and_buffer_growth(self):
+        reader = FrameReader(self.right, size=16)
+        big = {"fen": INITIAL_FEN, "moves": ["e2e4"] * 20}
+        self.left.sendall(b'{"a": 1}\r\n\n' + framing.encode(big)[:30])
+        self.assertEqual(reader.read(), {"a": 1})      # CRLF and blank line skipped
+        self.left.sendall(framing.encode(big)[30:] + b'{"b": ')
+        self.assertEqual(reader.read(), big)           # grew past 16 bytes
+        self.left.sendall(b'2}\n')
+        self.assertEqual(reader.read(), {"b": 2})
+        self.left.close()
+        self.assertIsNone(reader.read())
+
+    def test_length_frames_and_limits(self):
+        reader = FrameReader(self.right, mode=LENGTH, size=8)
+        frames = framing.encode({"x": "é"}, LENGTH) + framing.encode({"y": [1, 2, 3]}, LENGTH)
+        self.left.sendall(frames[:3])
+        self.left.sendall(frames[3:])
+        self.assertEqual(reader.read(), {"x": "é"})
+        self.assertEqual(reader.read(), {"y": [1, 2, 3]})
+        self.left.sendall(framing.HEADER.pack(framing.MAX_MESSAGE_BYTES + 1))
+        with self.assertRaises(FramingError):
+            reader.read()
+
+
+    def test_client_skips_pings_while_negotiating(self):
+        async def scenario():
+            async def handle(reader, writer):
+                hello = json.loads(await reader.readline())
+                self.assertTrue(hello["ping"])
+                writer.write(b'{"type": "PING", "id": 1}\n{"type": "HELLO", "framing": "length"}\n')
+                await writer.drain()
+                await reader.read()
+
+            server = await asyncio.start_server(handle, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            client = ChessClient("127.0.0.1", port)
+            self.assertTrue(await asyncio.get_running_loop().run_in_executor(None, client.connect))
+            self.assertEqual(client.framing, LENGTH)
+            client.disconnect()
+            server.close()
+            await server.wait_closed()
+
+        asyncio.run(scenario())
+
+class TestNegotiatedFraming(DatabaseTestCase):
+
+    def test_client_switches_to_length_prefix_with_async_server(self):
+        async def scenario():
+            server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            loop = asyncio.get_running_loop()
+
+            client = ChessClient("127.0.0.1", port)
+            self.assertTrue(await loop.run_in_executor(None, client.connect))
+            self.assertEqual(client.framing, LENGTH)
+            self.assertEqual(client.socket.getsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY), 1)
+            conn = next(iter(server.connections))
+            self.assertEqual(conn.framing, LENGTH)
+
+            for move, valid in (("e2e4", True), ("e2e5", False)):
+                client.send_message({"action": "validate_move", "fen": INITIAL_FEN, "move": move})
+                res = await loop.run_in_executor(None, client.receive_message)
+                self.assertEqual(res["is_valid"], valid)
+
+            # A plain newline client on the same server is unaffected
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.write(b'{"action": "validate_move", "fen": "%s", "move": "e2e4"}\n' % INITIAL_FEN.encode())
+            self.assertTrue(json.loads(await reader.readline())["is_valid"])
+
+            client.disconnect()
+            writer.close()
+            await server.stop()
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import os
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_handler
+import logic_wrapper
+from db_test_case import DatabaseTestCase
+from game_cache import GameCache, ENTRY_BYTES
+
+FOOLS_MATE = [("f2", "f3"), ("e7", "e5"), ("e2", "e5"), ("g2", "g4"), ("d8", "h4")]
+
+
+class TestGameCache(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.white_id, self.black_id = self.add_players("Alice", "Bob")
+        self.cache = logic_wrapper.enable_board_cache()
+
+    def tearDown(self):
+        logic_wrapper.disable_board_cache()
+        super().tearDown()
+
+    def new_game(self):
+        return db_handler.create_game(self.white_id, self.black_id, 'BLITZ', 300.0)
+
+    def move(self, game_id, frm, to):
+        return logic_wrapper.handle_request(
+            {"type": "MOVE", "game_id": str(game_id), "from": frm, "to": to})
+
+    def test_cached_moves_match_uncached(self):
+        cached_game = self.new_game()
+        cached = [self.move(cached_game, frm, to) for frm, to in FOOLS_MATE]
+
+        logic_wrapper.disable_board_cache()
+        plain_game = self.new_game()
+        plain = [self.move(plain_game, frm, to) for frm, to in FOOLS_MATE]
+
+        for a, b in zip(cached, plain):
+            self.assertEqual((a["status"], a["is_valid"], a.get("next_fen"), a.get("game_result")),
+                             (b["status"], b["is_valid"], b.get("next_fen"), b.get("game_result")))
+        self.assertEqual(cached[-1]["game_result"], "checkmate")
+        self.assertEqual(db_handler.get_game_info(cached_game)[6:9],
+                         db_handler.get_game_info(plain_game)[6:9])
+        self.assertEqual([m[1] for m in db_handler.get_moves(cached_game)],
+                         [m[1] for m in db_handler.get_moves(plain_game)])
+
+    def test_hit_writes_through(self):
+        game_id = self.new_game()
+        self.move(game_id, "e2", "e4")
+        res = self.move(game_id, "e7", "e5")
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(db_handler.get_game_fen(game_id), res["next_fen"])
+        self.assertEqual(db_handler.get_move_state(game_id)["black_time"], res["black_time"])
+
+    def test_finished_game_is_dropped(self):
+        game_id = self.new_game()
+        for frm, to in FOOLS_MATE:
+            self.move(game_id, frm, to)
+        self.assertNotIn(game_id, self.cache.games)
+
+    def test_miss_after_external_write_rebuilds(self):
+        game_id = self.new_game()
+        self.move(game_id, "e2", "e4")
+        logic_wrapper.handle_request({"action": "update_game_result", "game_id": game_id,
+                                      "winner_id": None, "status": "CANCELLED", "end_time": None})
+        self.assertNotIn(game_id, self.cache.games)
+        self.move(game_id, "e7", "e5")
+        self.assertEqual(self.cache.stats()["hits"], 0)
+        self.assertNotIn(game_id, self.cache.games)  # read back as CANCELLED, not re-cached
+
+    def test_memory_cap_evicts_least_recent(self):
+        cache = GameCache(max_bytes=2 * ENTRY_BYTES)
+        resolve = lambda game: ({}, None, None)
+        games = [self.new_game() for _ in range(3)]
+        for game_id in games:
+            cache.apply_move(game_id, resolve)
+        self.assertEqual(len(cache.games), 2)
+        self.assertNotIn(games[0], cache.games)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_failed_move_drops_entry(self):
+        game_id = self.new_game()
+        self.move(game_id, "e2", "e4")
+        before = db_handler.get_move_state(game_id)
+
+        def resolve(game):
+            game["board"].push_uci("e7e5")
+            raise RuntimeError("crash after touching the board")
+
+        with self.assertRaises(RuntimeError):
+            self.cache.apply_move(game_id, resolve)
+        self.assertNotIn(game_id, self.cache.games)
+        self.assertEqual(db_handler.get_move_state(game_id), before)
+        self.assertTrue(self.move(game_id, "e7", "e5")["is_valid"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import datetime
+import os
+import sys
+import unittest
+
+import numpy as np
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import glicko2
+import logic_wrapper
+import rating_period
+from db_test_case import DatabaseTestCase
+
+
+class TestGlicko2(unittest.TestCase):
+
+    def test_glickman_example(self):
+        # Player 0 (1500, RD 200) beats 1400/30, loses to 1550/100 and 1700/300
+        ratings, rds, vols = glicko2.rate_period(
+            np.array([1500.0, 1400.0, 1550.0, 1700.0]), np.array([200.0, 30.0, 100.0, 300.0]),
+            np.full(4, 0.06), np.array([0, 2, 3]), np.array([1, 0, 0]), np.array([1.0, 1.0, 1.0]))
+        self.assertAlmostEqual(ratings[0], 1464.06, places=1)
+        self.assertAlmostEqual(rds[0], 151.52, places=1)
+        self.assertAlmostEqual(vols[0], 0.05999, delta=1e-5)
+
+    def test_inactive_players_only_gain_deviation(self):
+        ratings, rds, vols = glicko2.rate_period(
+            np.array([1500.0, 1600.0, 1700.0]), np.array([50.0, 80.0, 349.9]), np.full(3, 0.06),
+            np.array([0]), np.array([1]), np.array([0.5]))
+        self.assertEqual(ratings[2], 1700.0)
+        self.assertEqual(vols[2], 0.06)
+        self.assertEqual(rds[2], glicko2.DEFAULT_RD)  # capped
+        self.assertGreater(ratings[0], 1500.0)
+        self.assertLess(ratings[1], 1600.0)
+
+
+class TestRatingPeriod(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ids = self.add_players("p0", "p1", "p2")
+
+    def finish_game(self, white, black, winner, end_time):
+        with database.transaction() as conn:
+            conn.execute("INSERT INTO Game (white_id, black_id, mode, status, winner_id, end_time) "
+                         "VALUES (?, ?, 'RAPID', 'FINISHED', ?, ?)", (white, black, winner, end_time))
+
+    def glicko(self):
+        return {row[0]: row[1:] for row in database.get_connection().execute(
+            "SELECT player_id, glicko_rating, glicko_rd FROM Player")}
+
+    def test_each_game_is_rated_in_exactly_one_period(self):
+        a, b, c = self.ids
+        self.finish_game(a, b, a, "2024-01-01T10:00:00")
+        self.finish_game(a, b, None, "2024-01-01T11:00:00")
+        self.assertEqual(rating_period.run_period("2024-01-01T12:00:00"), (2, 2))
+        after_first = self.glicko()
+        self.assertGreater(after_first[a][0], 1500)
+        self.assertLess(after_first[b][0], 1500)
+        self.assertEqual(after_first[c], (1500.0, 350.0))
+
+        # Next period: only the new game counts
+        self.finish_game(b, c, b, "2024-01-01T13:00:00")
+        self.assertEqual(rating_period.run_period("2024-01-02T00:00:00"), (1, 2))
+        after_second = self.glicko()
+        self.assertEqual(after_second[a][0], after_first[a][0])
+        self.assertGreater(after_second[a][1], after_first[a][1])
+
+        # Closing a period that ended before the last one is a no-op
+        self.assertIsNone(rating_period.run_period("2024-01-01T23:00:00"))
+
+    def test_player_stats_report_glicko(self):
+        res = logic_wrapper.handle_request({"type": "GET_STATS", "username": "p0"})
+        self.assertEqual((res["glicko_rating"], res["glicko_rd"]), (1500, 350))
+
+    def test_default_period_end_is_now(self):
+        a, b, _ = self.ids
+        now = datetime.datetime.utcnow()
+        self.finish_game(a, b, a, (now - datetime.timedelta(hours=1)).isoformat())
+        self.finish_game(a, b, b, now.isoformat())  # too recent: left for the next period
+        self.assertEqual(rating_period.run_period(), (1, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
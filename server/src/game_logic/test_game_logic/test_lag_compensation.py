@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_handler
+import logic_wrapper
+from async_server import GameServer
+from db_test_case import DatabaseTestCase
+from lag_compensation import LagBudget, LagTracker, LAG_BUDGET_PER_GAME, MAX_LAG_PER_MOVE
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestLagTracker(unittest.TestCase):
+
+    def test_allowance_is_half_rtt_within_caps(self):
+        clock = FakeClock()
+        lag = LagTracker(clock)
+        self.assertEqual(lag.allowance(), 0.0)  # nothing measured yet
+
+        ping_id = lag.ping()
+        clock.now += 0.2
+        self.assertAlmostEqual(lag.pong(ping_id), 0.2)
+        self.assertIsNone(lag.pong(ping_id))      # answered once only
+        self.assertAlmostEqual(lag.allowance(), 0.1)
+
+        lag.rtt = 10.0
+        self.assertEqual(lag.allowance(), MAX_LAG_PER_MOVE)
+
+    def test_budget_is_per_game_and_player(self):
+        budget = LagBudget()
+        budget.charge(1, 7, 2.5)
+        budget.charge(1, 7, 0.5)
+        budget.charge(1, 8, 1.0)
+        budget.charge(1, None, 1.0)
+        self.assertEqual(budget.used(1), {7: 3.0, 8: 1.0})
+        self.assertEqual(budget.used(2), {})
+        budget.forget(1)
+        self.assertEqual(budget.used(1), {})
+
+
+class TestMoveLagCredit(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        white, black = self.add_players("w", "b")
+        self.game_id = db_handler.create_game(white, black, "BLITZ", 300.0)
+        # Black's clock starts with white's first move
+        logic_wrapper.handle_request({"type": "MOVE", "game_id": self.game_id, "from": "e2", "to": "e4"})
+
+    def test_server_measured_elapsed_and_credit(self):
+        res = logic_wrapper.handle_request(
+            {"type": "MOVE", "game_id": self.game_id, "from": "e7", "to": "e5"},
+            elapsed=5.0, lag_allowance=0.3)
+        self.assertTrue(res["is_valid"])
+        self.assertAlmostEqual(res["lag_credit"], 0.3)
+        self.assertAlmostEqual(res["elapsed"], 4.7)
+        self.assertAlmostEqual(res["black_time"], 300.0 - 4.7)
+
+    def test_credit_stops_at_the_movers_budget(self):
+        black = db_handler.get_game_info(self.game_id)[2]
+        res = logic_wrapper.handle_request(
+            {"type": "MOVE", "game_id": self.game_id, "from": "e7", "to": "e5"},
+            elapsed=5.0, lag_allowance=0.5, lag_used={black: LAG_BUDGET_PER_GAME - 0.2})
+        self.assertAlmostEqual(res["lag_credit"], 0.2)
+        self.assertEqual(res["player_id"], black)
+
+    def test_credit_never_exceeds_elapsed(self):
+        res = logic_wrapper.handle_request(
+            {"type": "MOVE", "game_id": self.game_id, "from": "e7", "to": "e5"},
+            elapsed=0.1, lag_allowance=0.5)
+        self.assertAlmostEqual(res["lag_credit"], 0.1)
+        self.assertEqual(res["black_time"], 300.0)
+
+    def test_request_cannot_claim_lag(self):
+        res = logic_wrapper.handle_request(
+            {"type": "MOVE", "game_id": self.game_id, "from": "e7", "to": "e5",
+             "lag_allowance": 60, "elapsed": 0})
+        self.assertEqual(res["lag_credit"], 0.0)
+        self.assertLess(res["black_time"], 300.0)
+
+    def test_only_clients_that_asked_are_pinged(self):
+        async def scenario():
+            with patch('async_server.PING_SECONDS', 0.05):
+                server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+                await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            (r1, w1), (r2, w2) = [await asyncio.open_connection("127.0.0.1", port) for _ in range(2)]
+            w2.write(b'{"type": "HELLO", "framing": ["line"], "ping": true}\n')
+            self.assertEqual(json.loads(await r2.readline())["type"], "HELLO")
+            ping = json.loads(await r2.readline())
+            self.assertEqual(ping["type"], "PING")
+
+            # A plain request/response client gets just its reply
+            await asyncio.sleep(0.2)
+            w1.write(b'{"action": "calculate_elo", "player_a_elo": 1000, "player_b_elo": 1000, "result_a": 1}\n')
+            self.assertEqual(json.loads(await r1.readline())["status"], "success")
+            w1.close()
+            w2.close()
+            await server.stop()
+
+        asyncio.run(scenario())
+
+    def test_async_server_credits_measured_lag(self):
+        async def scenario():
+            server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+
+            async def send(msg):
+                writer.write((json.dumps(msg) + "\n").encode())
+                await writer.drain()
+
+            await send({"type": "PONG", "id": 99})  # unknown ping: no reply, no effect
+            conn = next(iter(server.connections))
+            ping_id = conn.lag.ping()
+            conn.lag.pending[ping_id] -= 0.4       # as if the ping went out 400 ms ago
+            await send({"type": "PONG", "id": ping_id})
+            server.move_clocks[self.game_id] = time.monotonic() - 2.0
+
+            await send({"type": "MOVE", "game_id": self.game_id, "from": "e7", "to": "e5"})
+            res = json.loads(await reader.readline())
+            self.assertEqual(res["type"], "MOVE_RESULT")
+            self.assertAlmostEqual(res["lag_credit"], 0.2, delta=0.05)
+            self.assertAlmostEqual(res["elapsed"], 1.8, delta=0.1)
+            black = res["player_id"]
+            self.assertAlmostEqual(server.lag_budget.used(self.game_id)[black], res["lag_credit"])
+
+            # The budget stays with the game when the player reconnects
+            writer.close()
+            server.lag_budget.charge(self.game_id, black, LAG_BUDGET_PER_GAME)
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            await send({"type": "MOVE", "game_id": self.game_id, "from": "g1", "to": "f3"})
+            self.assertTrue(json.loads(await reader.readline())["is_valid"])
+            for conn in server.connections:
+                conn.lag.rtt = 0.8
+            server.move_clocks[self.game_id] = time.monotonic() - 2.0
+            await send({"type": "MOVE", "game_id": self.game_id, "from": "b8", "to": "c6"})
+            res = json.loads(await reader.readline())
+            self.assertEqual((res["player_id"], res["lag_credit"]), (black, 0.0))
+            writer.close()
+            await server.stop()
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import db_handler
+import init_db
+import logic_wrapper
+from db_test_case import DatabaseTestCase
+
+
+class TestLeaderboard(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ids = self.add_players(*(f"p{i}" for i in range(25)),
+                                    elo=[1000 + (i % 7) * 25 for i in range(25)])
+
+    def stats(self, player_id):
+        row = database.get_connection().execute(
+            "SELECT wins, losses, draws FROM PlayerStats WHERE player_id = ?", (player_id,)).fetchone()
+        return row or (0, 0, 0)
+
+    def finish(self, white, black, winner):
+        game_id = db_handler.create_game(white, black, 'BLITZ', 300.0)
+        logic_wrapper.handle_request({"action": "update_game_result", "game_id": game_id,
+                                      "winner_id": winner, "status": "FINISHED", "end_time": "now"})
+        return game_id
+
+    def test_keyset_pages_cover_everyone_once(self):
+        pages, req = [], {"type": "GET_LEADERBOARD", "limit": 7}
+        while True:
+            res = logic_wrapper.handle_request(req)
+            self.assertEqual(res["type"], "LEADERBOARD")
+            pages.append(res["leaderboard"])
+            if res["next"] is None:
+                break
+            req = dict(req, **res["next"])
+
+        rows = [(p["elo"], p["player_id"]) for page in pages for p in page]
+        self.assertEqual(len(pages), 4)
+        self.assertEqual(rows, sorted(rows, reverse=True))
+        self.assertEqual(sorted(pid for _, pid in rows), sorted(self.ids))
+
+    def test_finishing_a_game_updates_stats_once(self):
+        a, b = self.ids[:2]
+        game_id = self.finish(a, b, a)
+        # Re-sending the result must not count the game again
+        db_handler.update_game_result(game_id, a, "FINISHED", "later")
+        self.finish(a, b, None)
+        self.assertEqual(self.stats(a), (1, 0, 1))
+        self.assertEqual(self.stats(b), (0, 1, 1))
+
+        top = {p["player_id"]: p for p in
+               logic_wrapper.handle_request({"action": "get_leaderboard"})["leaderboard"]}
+        self.assertEqual((top[a]["wins"], top[a]["losses"], top[a]["draws"]), (1, 0, 1))
+
+    def test_checkmate_by_move_updates_stats(self):
+        white, black = self.ids[2:4]
+        game_id = db_handler.create_game(white, black, 'BLITZ', 300.0)
+        for frm, to in [("f2", "f3"), ("e7", "e5"), ("g2", "g4"), ("d8", "h4")]:
+            logic_wrapper.handle_request({"type": "MOVE", "game_id": game_id, "from": frm, "to": to})
+        self.assertEqual(self.stats(black), (1, 0, 0))
+        self.assertEqual(self.stats(white), (0, 1, 0))
+
+    def test_backfill_from_existing_games(self):
+        a, b, c = self.ids[4:7]
+        self.finish(a, b, b)
+        self.finish(c, a, None)
+        conn = database.get_connection()
+        conn.execute("DROP TABLE PlayerStats")
+        init_db.init_db()
+        self.assertEqual(self.stats(a), (0, 1, 1))
+        self.assertEqual(self.stats(b), (1, 0, 0))
+        self.assertEqual(self.stats(c), (0, 0, 1))
+
+    def test_bad_pagination(self):
+        res = logic_wrapper.handle_request({"action": "get_leaderboard", "after_elo": "x", "after_id": 1})
+        self.assertEqual(res["status"], "error")
+
+
+if __name__ == '__main__':
+    unittest.main()
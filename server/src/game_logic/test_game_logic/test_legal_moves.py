@@ -0,0 +1,72 @@
+import os
+import sys
+import unittest
+
+import chess
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_handler
+import game_logic
+import logic_wrapper
+from db_test_case import DatabaseTestCase
+from init_db import INITIAL_FEN
+
+
+def legal_set(fen):
+    return {move.uci() for move in chess.Board(fen).legal_moves}
+
+
+class TestLegalMoves(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        white_id, black_id = self.add_players("Alice", "Bob")
+        self.game_id = db_handler.create_game(white_id, black_id, 'BLITZ', 300.0)
+        game_logic.legal_moves_cache.clear()
+
+    def move(self, frm, to):
+        return logic_wrapper.handle_request(
+            {"type": "MOVE", "game_id": str(self.game_id), "from": frm, "to": to})
+
+    def test_move_result_lists_next_position_moves(self):
+        res = self.move("e2", "e4")
+        self.assertEqual(set(res["legal_moves"]), legal_set(res["next_fen"]))
+
+    def test_invalid_move_lists_current_position_moves(self):
+        res = self.move("e2", "e5")
+        self.assertFalse(res["is_valid"])
+        self.assertEqual(set(res["legal_moves"]), legal_set(INITIAL_FEN))
+
+    def test_no_moves_after_mate(self):
+        for frm, to in [("f2", "f3"), ("e7", "e5"), ("g2", "g4"), ("d8", "h4")]:
+            res = self.move(frm, to)
+        self.assertEqual(res["game_result"], "checkmate")
+        self.assertEqual(res["legal_moves"], [])
+
+    def test_get_legal_moves_by_fen_and_game(self):
+        by_fen = logic_wrapper.handle_request({"action": "get_legal_moves", "fen": INITIAL_FEN})
+        self.assertEqual(set(by_fen["legal_moves"]), legal_set(INITIAL_FEN))
+
+        fen = self.move("g1", "f3")["next_fen"]
+        by_game = logic_wrapper.handle_request({"type": "GET_LEGAL_MOVES", "game_id": self.game_id})
+        self.assertEqual(by_game["type"], "LEGAL_MOVES")
+        self.assertEqual(set(by_game["legal_moves"]), legal_set(fen))
+
+        missing = logic_wrapper.handle_request({"action": "get_legal_moves", "game_id": 999})
+        self.assertEqual(missing["status"], "error")
+
+    def test_cache_shared_across_move_orders(self):
+        # Same position, different halfmove/fullmove counters
+        a = chess.Board()
+        for uci in ["g1f3", "g8f6", "f3g1", "f6g8"]:
+            a.push_uci(uci)
+        game_logic.legal_moves(INITIAL_FEN)
+        hits = game_logic.legal_moves_cache.stats()["hits"]
+        self.assertEqual(set(game_logic.legal_moves(a.fen())), legal_set(INITIAL_FEN))
+        self.assertEqual(game_logic.legal_moves_cache.stats()["hits"], hits + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_handler
+from async_server import GameServer
+from db_test_case import DatabaseTestCase
+from lobby_feed import LobbyFeed
+
+
+class TestLobbyFeed(unittest.TestCase):
+
+    def test_versions_and_catch_up(self):
+        feed = LobbyFeed(history=3)
+        feed.join({"player_id": 1, "username": "a", "elo": 1000})
+        feed.join({"player_id": 2, "username": "b", "elo": 1100})
+        self.assertIsNone(feed.join({"player_id": 1}))  # already ready: no delta
+        feed.elo_changed(1, 1016)
+        self.assertIsNone(feed.elo_changed(3, 1200))    # not in the lobby
+        feed.leave(2)
+        self.assertEqual(feed.version, 4)
+        self.assertEqual(feed.snapshot()["players"], [{"player_id": 1, "username": "a", "elo": 1016}])
+
+        self.assertEqual([d["op"] for d in feed.since(1)], ["joined", "elo", "left"])
+        self.assertEqual(feed.since(4), [])
+        self.assertIsNone(feed.since(0))   # older than the log
+        self.assertIsNone(feed.since(9))   # newer than the server (restart)
+        self.assertEqual(len(feed.since(1, feed.epoch)), 3)
+        self.assertIsNone(feed.since(1, "previous server"))
+        self.assertNotEqual(LobbyFeed().epoch, feed.epoch)
+
+
+class TestLobbyDeltas(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ids = self.add_players("alice", "bob", elo=[1200, 1300])
+
+    async def _request(self, reader, writer, req):
+        writer.write((json.dumps(req) + "\n").encode("utf-8"))
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    def test_subscribers_get_deltas(self):
+        async def scenario():
+            server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            (r1, w1), (r2, w2) = [await asyncio.open_connection("127.0.0.1", port) for _ in range(2)]
+            alice, bob = self.ids
+
+            listing = await self._request(r1, w1, {"type": "GET_PLAYERS"})
+            self.assertEqual((listing["version"], listing["players"]), (0, []))
+
+            await self._request(r2, w2, {"action": "join_lobby", "player_id": bob})
+            delta = json.loads(await r1.readline())
+            self.assertEqual((delta["type"], delta["op"], delta["version"]), ("LOBBY_DELTA", "joined", 1))
+            self.assertEqual(delta["player"], {"player_id": bob, "username": "bob", "elo": 1300})
+
+            await self._request(r2, w2, {"action": "process_match_elo", "player_a_id": bob,
+                                         "player_b_id": alice, "result_a": 0})
+            delta = json.loads(await r1.readline())
+            self.assertEqual((delta["op"], delta["player_id"], delta["version"]), ("elo", bob, 2))
+
+            # Catch-up returns only what happened after the given version
+            res = await self._request(r1, w1, {"type": "GET_PLAYERS", "since_version": 1})
+            self.assertEqual([d["op"] for d in res["deltas"]], ["elo"])
+            self.assertEqual(res["version"], 2)
+
+            w2.close()  # disconnect leaves the lobby
+            delta = json.loads(await r1.readline())
+            self.assertEqual((delta["op"], delta["player_id"]), ("left", bob))
+
+            w1.close()
+            await server.stop()
+
+        asyncio.run(scenario())
+
+    def test_lobby_survives_a_restart(self):
+        async def scenario():
+            alice, bob = self.ids
+            db_handler.add_to_lobby(alice)
+            db_handler.add_to_lobby(bob)
+            server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            (r1, w1), (r2, w2) = [await asyncio.open_connection("127.0.0.1", port) for _ in range(2)]
+
+            # A client of the previous server catching up gets the whole list
+            listing = await self._request(r1, w1, {"type": "GET_PLAYERS", "since_version": 0,
+                                                   "epoch": "previous server"})
+            self.assertEqual((listing["epoch"], listing["version"]), (server.lobby.epoch, 0))
+            self.assertEqual(listing["players"], [{"player_id": alice, "username": "alice", "elo": 1200},
+                                                  {"player_id": bob, "username": "bob", "elo": 1300}])
+
+            # Loaded players get deltas like any other
+            await self._request(r2, w2, {"action": "leave_lobby", "player_id": bob})
+            delta = json.loads(await r1.readline())
+            self.assertEqual((delta["op"], delta["player_id"], delta["version"]), ("left", bob, 1))
+            self.assertEqual(delta["epoch"], listing["epoch"])
+            self.assertEqual(server.ready_players, [alice])
+
+            w1.close()
+            w2.close()
+            await server.stop()
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import matchmaking
+from async_server import GameServer
+from db_test_case import DatabaseTestCase
+from matchmaking import MatchQueue, window
+
+
+class TestMatchQueue(unittest.TestCase):
+
+    def test_window_widens_with_waiting_time(self):
+        queue = MatchQueue()
+        queue.add(1, 1000, now=0.0)
+        queue.add(2, 1150, now=0.0)
+        # Gap 150 needs (150 - BASE_WINDOW) / WIDEN_PER_SECOND seconds of waiting
+        due = (150 - matchmaking.BASE_WINDOW) / matchmaking.WIDEN_PER_SECOND
+        self.assertEqual(queue.tick(now=due - 0.1), [])
+        self.assertEqual(queue.tick(now=due), [(1, 2)])
+        self.assertEqual(len(queue), 0)
+
+    def test_newcomer_must_also_accept(self):
+        queue = MatchQueue()
+        queue.add(1, 1000, now=0.0)
+        queue.add(2, 1200, now=100.0)  # 1 has a wide window, 2 just arrived
+        self.assertEqual(queue.tick(now=100.0), [])
+        self.assertEqual(queue.tick(now=115.0), [(1, 2)])
+
+    def test_gap_beyond_max_window_never_matches(self):
+        queue = MatchQueue()
+        queue.add(1, 1000, now=0.0)
+        queue.add(2, 1000 + matchmaking.MAX_WINDOW + 1, now=0.0)
+        self.assertEqual(queue.tick(now=10 ** 6), [])
+        self.assertEqual(len(queue), 2)
+
+    def test_leaving_makes_neighbours_adjacent(self):
+        queue = MatchQueue()
+        for pid, elo in ((1, 1000), (2, 1010), (3, 1020)):
+            queue.add(pid, elo, now=0.0)
+        queue.remove(2)
+        self.assertNotIn(2, queue)
+        self.assertEqual(queue.tick(now=0.0), [(1, 3)])
+
+    def test_random_lobby_pairs_are_valid(self):
+        rng = random.Random(4)
+        queue = MatchQueue()
+        joined = {}
+        elos = {}
+        for pid in range(10000):
+            elos[pid] = rng.randint(800, 2400)
+            joined[pid] = rng.uniform(0, 30)
+            queue.add(pid, elos[pid], now=joined[pid])
+        for pid in rng.sample(range(10000), 500):
+            queue.remove(pid)
+            del elos[pid]
+
+        matched = set()
+        for now in (30.0, 31.0, 40.0):
+            for a, b in queue.tick(now=now):
+                self.assertFalse({a, b} & matched)
+                matched.update((a, b))
+                gap = abs(elos[a] - elos[b])
+                self.assertLessEqual(gap, window(now - joined[a]))
+                self.assertLessEqual(gap, window(now - joined[b]))
+        self.assertGreater(len(matched), 9000)
+        self.assertEqual(len(queue) + len(matched), len(elos))
+
+
+class TestRandomMatch(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ids = self.add_players("alice", "bob", "carol", elo=[1200, 1220, 2000])
+
+    async def _request(self, reader, writer, req):
+        writer.write((json.dumps(req) + "\n").encode("utf-8"))
+        await writer.drain()
+        return json.loads(await reader.readline())
+
+    def test_close_ratings_get_a_game(self):
+        async def scenario():
+            server = GameServer("127.0.0.1", 0, board_cache_bytes=0)
+            await server.start()
+            port = server.server.sockets[0].getsockname()[1]
+            clients = [await asyncio.open_connection("127.0.0.1", port) for _ in self.ids]
+
+            for (r, w), pid in zip(clients, self.ids):
+                res = await self._request(r, w, {"type": "RANDOM_MATCH", "player_id": pid})
+                self.assertEqual(res["status"], "success")
+            await server.run_matchmaking()
+
+            starts = [json.loads(await r.readline()) for r, _ in clients[:2]]
+            self.assertEqual({s["type"] for s in starts}, {"GAME_START"})
+            self.assertEqual(starts[0]["game_id"], starts[1]["game_id"])
+            self.assertEqual({s["your_color"] for s in starts}, {"white", "black"})
+            self.assertEqual({s["opponent"] for s in starts}, {"alice", "bob"})
+
+            # carol is still waiting; asking again keeps her place, another mode moves her
+            r, w = clients[2]
+            carol = self.ids[2]
+            joined_at = server.match_queues["RAPID"].players[carol][1]
+            await self._request(r, w, {"type": "RANDOM_MATCH", "player_id": carol})
+            self.assertEqual(server.match_queues["RAPID"].players[carol][1], joined_at)
+            await self._request(r, w, {"type": "RANDOM_MATCH", "player_id": carol, "mode": "BLITZ"})
+            self.assertNotIn(carol, server.match_queues["RAPID"])
+            self.assertIn(carol, server.match_queues["BLITZ"])
+            res = await self._request(r, w, {"type": "CANCEL_MATCH"})
+            self.assertEqual(res["status"], "success")
+            self.assertEqual(len(server.match_queues["BLITZ"]), 0)
+
+            game = database.get_connection().execute(
+                "SELECT white_id, black_id, status FROM Game WHERE game_id = ?",
+                (starts[0]["game_id"],)).fetchone()
+            self.assertEqual(set(game[:2]), set(self.ids[:2]))
+            self.assertEqual(game[2], "ONGOING")
+            for _, w in clients:
+                w.close()
+            await server.stop()
+
+        asyncio.run(scenario())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import os
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chess
+from db_test_case import DatabaseTestCase
+
+import database
+import db_handler
+import init_db
+import logic_wrapper
+from move_codec import encode_move, decode_move, pack_moves, unpack_moves, SQUARE_NAMES
+
+
+class TestMoveCodec(unittest.TestCase):
+
+    def test_every_move_round_trips(self):
+        codes = set()
+        for frm in SQUARE_NAMES:
+            for to in SQUARE_NAMES:
+                for promo in ("", "n", "b", "r", "q"):
+                    uci = frm + to + promo
+                    code = encode_move(uci)
+                    self.assertLess(code, 1 << 15)
+                    self.assertEqual(decode_move(code), uci)
+                    codes.add(code)
+        self.assertEqual(len(codes), 64 * 64 * 5)
+        # Same square numbering as python-chess
+        move = chess.Move.from_uci("g7g8q")
+        code = encode_move("g7g8q")
+        self.assertEqual((code & 63, code >> 6 & 63, code >> 12), (move.from_square, move.to_square, 4))
+
+    def test_rejects_non_uci(self):
+        for bad in ("", "e4", "Nf3", "e2e4k", "i2i4", "0000", None, 1234):
+            with self.assertRaises(ValueError):
+                encode_move(bad)
+
+    def test_pack_is_two_bytes_per_ply(self):
+        moves = ["e2e4", "e7e5", "g1f3", "b8c6", "a7a8n"]
+        blob = pack_moves(moves)
+        self.assertEqual(len(blob), 2 * len(moves))
+        self.assertEqual(blob[:2], (12 | 28 << 6).to_bytes(2, "little"))  # e2=12, e4=28
+        self.assertEqual(unpack_moves(blob), moves)
+        self.assertEqual(unpack_moves(b""), [])
+
+
+class TestPackedGameMoves(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.white, self.black = self.add_players("w", "b")
+        self.game_id = db_handler.create_game(self.white, self.black, "RAPID", 600.0)
+
+    def test_moves_append_to_one_blob(self):
+        for frm, to in [("e2", "e4"), ("e7", "e5"), ("g1", "f3")]:
+            res = logic_wrapper.handle_request(
+                {"type": "MOVE", "game_id": self.game_id, "from": frm, "to": to})
+            self.assertTrue(res["is_valid"])
+        db_handler.insert_move(self.game_id, self.black, "b8c6")
+
+        conn = database.get_connection()
+        self.assertEqual(conn.execute("SELECT length(moves) FROM GameMoves WHERE game_id = ?",
+                                      (self.game_id,)).fetchone()[0], 8)
+        self.assertEqual(conn.execute("SELECT COUNT(*) FROM Move").fetchone()[0], 0)
+        self.assertEqual(db_handler.get_moves(self.game_id),
+                         [(1, "e2e4"), (2, "e7e5"), (3, "g1f3"), (4, "b8c6")])
+        res = logic_wrapper.handle_request({"action": "get_replay", "game_id": self.game_id})
+        self.assertEqual(res["moves"], ["e2e4", "e7e5", "g1f3", "b8c6"])
+
+        res = logic_wrapper.handle_request(
+            {"action": "log_move", "game_id": self.game_id, "player_id": self.white, "move": "Nf3"})
+        self.assertEqual(res["status"], "error")
+        self.assertEqual(len(db_handler.get_moves(self.game_id)), 4)
+
+    def test_legacy_rows_are_packed_on_init(self):
+        other = db_handler.create_game(self.white, self.black, "RAPID", 600.0)
+        with database.transaction() as conn:
+            conn.executemany(
+                "INSERT INTO Move (game_id, player_id, move_notation) VALUES (?, ?, ?)",
+                [(self.game_id, self.white, "d2d4"), (other, self.white, "Nf3"),
+                 (self.game_id, self.black, "d7d5")])
+        init_db.init_db()
+
+        conn = database.get_connection()
+        self.assertEqual(conn.execute("SELECT game_id, move_notation FROM Move").fetchall(),
+                         [(other, "Nf3")])  # not UCI: stays a row
+        self.assertEqual(db_handler.get_moves(self.game_id), [(1, "d2d4"), (2, "d7d5")])
+        self.assertEqual(db_handler.get_moves(other), [(1, "Nf3")])
+        self.assertEqual(db_handler.get_game_details(self.game_id)["moves"], ["d2d4", "d7d5"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import os
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import perf_stats
+import logic_wrapper
+
+
+class TestPerfStats(unittest.TestCase):
+
+    def setUp(self):
+        perf_stats.reset()
+
+    def test_histogram_percentiles(self):
+        hist = perf_stats.LatencyHistogram()
+        # 1..100 ms
+        for ms in range(1, 101):
+            hist.record(ms / 1000.0)
+        summary = hist.summary()
+        self.assertEqual(summary["count"], 100)
+        self.assertEqual(summary["max_ms"], 100.0)
+        # Buckets are ~9% wide
+        self.assertAlmostEqual(summary["p50_ms"], 50, delta=50 * 0.1)
+        self.assertAlmostEqual(summary["p95_ms"], 95, delta=95 * 0.1)
+        self.assertAlmostEqual(summary["p99_ms"], 99, delta=99 * 0.1)
+        self.assertLessEqual(summary["p99_ms"], summary["max_ms"])
+
+    def test_every_action_is_registered(self):
+        for name in ('validate_move', 'game_result', 'calculate_elo', 'process_match_elo',
+                     'update_elo', 'log_move', 'get_replay', 'get_game_log', 'get_pgn',
+                     'update_game_result', 'create_game', 'join_lobby', 'leave_lobby',
+                     'get_ready_players', 'MOVE', 'get_perf_stats'):
+            self.assertIn(name, logic_wrapper.ACTIONS)
+
+    def test_dispatch_records_latency(self):
+        req = {"action": "calculate_elo", "player_a_elo": 1200, "player_b_elo": 1200, "result_a": 1}
+        for _ in range(3):
+            logic_wrapper.handle_request(req)
+
+        stats = logic_wrapper.handle_request({"action": "get_perf_stats"})
+        self.assertEqual(stats["status"], "success")
+        self.assertEqual(stats["actions"]["calculate_elo"]["count"], 3)
+
+        unknown = logic_wrapper.handle_request({"action": "nope"})
+        self.assertEqual(unknown["status"], "error")
+        self.assertNotIn("nope", perf_stats.snapshot())
+
+    def test_failing_handler_is_still_timed(self):
+        with self.assertRaises(ValueError):
+            logic_wrapper.handle_request({"action": "validate_move", "fen": "not a fen", "move": "e2e4"})
+        self.assertEqual(perf_stats.snapshot()["validate_move"]["count"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import datetime
+import gzip
+import io
+import os
+import sys
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import db_handler
+import logic_wrapper
+import pgn_export
+from archive import run_archive
+from db_test_case import DatabaseTestCase
+
+FOOLS_MATE = [("f2", "f3"), ("e7", "e5"), ("g2", "g4"), ("d8", "h4")]
+
+
+class TestPgnExport(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.alice, self.bob, self.carol = self.add_players("alice", "bob", "carol")
+        # Finished games, one per day in January, with alternating players
+        pairs = [(self.alice, self.bob), (self.bob, self.carol), (self.carol, self.alice),
+                 (self.bob, self.alice), (self.alice, self.carol)]
+        self.games = []
+        for day, (white, black) in enumerate(pairs, 1):
+            game_id = db_handler.create_game(white, black, "BLITZ", 300.0)
+            for frm, to in FOOLS_MATE:
+                logic_wrapper.handle_request({"type": "MOVE", "game_id": game_id, "from": frm, "to": to})
+            with database.transaction() as conn:
+                conn.execute("UPDATE Game SET end_time = ? WHERE game_id = ?",
+                             (f"2024-01-{day:02d}T12:00:00", game_id))
+            self.games.append(game_id)
+        # Archived and live games export alike; ongoing games are left out
+        run_archive(days=0, now=datetime.datetime(2024, 1, 2, 13))
+        self.ongoing = db_handler.create_game(self.alice, self.bob, "BLITZ", 300.0)
+        logic_wrapper.handle_request({"type": "MOVE", "game_id": self.ongoing, "from": "e2", "to": "e4"})
+
+    def pgn_of(self, game_ids):
+        return "".join(logic_wrapper.handle_request({"action": "get_pgn", "game_id": g})["pgn"] + "\n\n"
+                       for g in game_ids)
+
+    def export(self, **kwargs):
+        out = io.BytesIO()
+        games, written = pgn_export.write_pgn(out, batch_size=2, **kwargs)
+        return games, out.getvalue()
+
+    def test_date_range_in_end_time_order(self):
+        self.assertIsNotNone(db_handler.get_archived_game(self.games[0]))
+        games, data = self.export()
+        self.assertEqual(games, 5)
+        self.assertEqual(data.decode(), self.pgn_of(self.games))
+
+        games, data = self.export(since="2024-01-02", until="2024-01-05")
+        self.assertEqual(games, 3)
+        self.assertEqual(data.decode(), self.pgn_of(self.games[1:4]))
+
+    def test_player_games_with_pool_and_gzip(self):
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            games, data = self.export(player_id=self.alice, compress=True, executor=pool, workers=2)
+        alice_games = [g for i, g in enumerate(self.games) if i != 1]
+        self.assertEqual(games, 4)
+        self.assertEqual(gzip.decompress(data).decode(), self.pgn_of(alice_games))
+
+        games, data = self.export(player_id=self.alice, since="2024-01-04")
+        self.assertEqual(data.decode(), self.pgn_of(self.games[3:]))
+
+    def test_export_action_writes_into_export_dir(self):
+        with patch('logic_wrapper.EXPORT_DIR', self.tmpdir.name):
+            res = logic_wrapper.handle_request(
+                {"action": "export_games", "username": "carol", "file": "../../carol.pgn"})
+            self.assertEqual(res["status"], "success")
+            self.assertEqual(res["games"], 3)
+            self.assertEqual(res["path"], os.path.join(self.tmpdir.name, "carol.pgn"))
+            with open(res["path"]) as f:
+                self.assertEqual(f.read(), self.pgn_of(self.games[1:3] + self.games[4:]))
+            res = logic_wrapper.handle_request({"action": "export_games", "username": "nobody"})
+            self.assertEqual(res["status"], "error")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+"""
+Every SQL statement in db_handler.py must be answerable without a full table scan.
+Statements are collected from the source, so new queries are checked automatically.
+"""
+import ast
+import os
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+PARENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(PARENT_DIR)
+
+import database
+import db_handler
+from db_test_case import DatabaseTestCase
+
+SQL_PREFIXES = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+
+def collect_queries(path):
+    """
+    Plain string literals that look like SQL, plus f-strings whose fields only use
+    module-level names of db_handler (those with locals are skipped).
+    """
+    tree = ast.parse(open(path, encoding="utf-8").read())
+    queries = []
+    # Literal pieces of an f-string are checked as part of the whole string
+    fragments = {id(v) for n in ast.walk(tree) if isinstance(n, ast.JoinedStr) for v in n.values}
+    for node in ast.walk(tree):
+        text = None
+        if id(node) in fragments:
+            continue
+        if isinstance(node, ast.Constant) and isinstance(node.value, str):
+            text = node.value
+        elif isinstance(node, ast.JoinedStr):
+            try:
+                code = compile(ast.Expression(node), path, "eval")
+                text = eval(code, vars(db_handler))
+            except NameError:
+                continue
+        if text and text.strip().startswith(SQL_PREFIXES):
+            queries.append((node.lineno, " ".join(text.split())))
+    return queries
+
+
+def full_scans(conn, sql):
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql, (None,) * sql.count("?")).fetchall()
+    details = [row[3] for row in plan]
+    # "SCAN t" reads the whole table; "SCAN t USING ... INDEX" walks an index in order
+    return [d for d in details
+            if d.startswith("SCAN ") and "USING" not in d and d != "SCAN CONSTANT ROW"]
+
+
+class TestQueryPlans(DatabaseTestCase):
+
+    def test_no_full_table_scans(self):
+        queries = collect_queries(os.path.join(PARENT_DIR, "db_handler.py"))
+        self.assertTrue(queries)
+        conn = database.get_connection()
+        for lineno, sql in queries:
+            with self.subTest(line=lineno, sql=sql):
+                self.assertEqual(full_scans(conn, sql), [])
+
+    def test_expected_indexes_exist(self):
+        names = {row[0] for row in database.get_connection().execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index'")}
+        for name in ("idx_move_game", "idx_game_white", "idx_game_black",
+                     "idx_game_status", "idx_lobby_joined_at"):
+            self.assertIn(name, names)
+
+
+if __name__ == '__main__':
+    unittest.main()
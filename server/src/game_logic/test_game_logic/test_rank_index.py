@@ -0,0 +1,107 @@
+import os
+import random
+import sqlite3
+import sys
+import unittest
+from unittest.mock import patch
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import db_handler
+import logic_wrapper
+import rank_index
+from db_test_case import DatabaseTestCase
+from rank_index import RankIndex
+
+
+def brute_rank(ratings, player_id):
+    return 1 + sum(1 for elo in ratings.values() if elo > ratings[player_id])
+
+
+class TestRankIndex(unittest.TestCase):
+
+    def test_matches_brute_force(self):
+        rng = random.Random(5)
+        ratings = {pid: rng.randint(800, 2400) for pid in range(300)}
+        index = RankIndex()
+        index.build(ratings.items())
+        for _ in range(500):
+            pid = rng.randrange(300)
+            ratings[pid] = rng.randint(800, 2400)
+            index.set(pid, ratings[pid])
+        for pid in ratings:
+            self.assertEqual(index.rank(pid), brute_rank(ratings, pid))
+        self.assertEqual(index.rank_of_elo(5000), 1)
+        self.assertIsNone(index.rank(999))
+
+    def test_ties_share_a_rank(self):
+        index = RankIndex()
+        index.build([(1, 1500), (2, 1400), (3, 1400), (4, 1300)])
+        self.assertEqual([index.rank(pid) for pid in (1, 2, 3, 4)], [1, 2, 2, 4])
+
+
+class TestRankActions(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.ids = self.add_players("p0", "p1", "p2", "p3", elo=[1200, 1100, 1300, 1000])
+        rank_index.reset()
+
+    def tearDown(self):
+        rank_index.reset()
+        super().tearDown()
+
+    def rank(self, player_id):
+        return logic_wrapper.handle_request({"action": "get_rank", "player_id": player_id})["rank"]
+
+    def test_elo_updates_keep_index_in_sync(self):
+        a, b, c, d = self.ids
+        self.assertEqual([self.rank(pid) for pid in self.ids], [2, 3, 1, 4])
+        db_handler.update_player_elo(d, 1400)
+        self.assertEqual(self.rank(d), 1)
+        db_handler.update_both_players_elo(a, 1050, b, 1350)
+        self.assertEqual([self.rank(pid) for pid in self.ids], [4, 2, 3, 1])
+
+    def test_player_stats_include_rank(self):
+        res = logic_wrapper.handle_request({"type": "GET_STATS", "username": "p2"})
+        self.assertEqual(res["type"], "PLAYER_STATS")
+        self.assertEqual((res["rank"], res["total_players"]), (1, 4))
+        self.assertEqual((res["wins"], res["losses"], res["draws"]), (0, 0, 0))
+
+        board = logic_wrapper.handle_request({"action": "get_leaderboard"})["leaderboard"]
+        self.assertEqual([p["rank"] for p in board], [1, 2, 3, 4])
+
+    def test_player_added_after_load(self):
+        self.rank(self.ids[0])  # loads the index
+        new_id, = self.add_players("late", elo=1250)
+        self.assertEqual(self.rank(new_id), 2)
+
+    def test_rebuilds_only_on_rating_changes(self):
+        with patch('rank_index.REFRESH_SECONDS', 0):
+            index = rank_index.get_index()
+            a, b, c, d = self.ids
+            db_handler.update_both_players_elo(a, 1050, b, 1350)
+            game_id = db_handler.create_game(a, b, "BLITZ", 300.0)
+            # Another process: moves and lobby changes leave the index alone...
+            other = sqlite3.connect(database.DB_NAME)
+            with other:
+                other.execute("UPDATE Game SET current_fen = 'x' WHERE game_id = ?", (game_id,))
+                other.execute("INSERT INTO Lobby (player_id) VALUES (?)", (c,))
+                other.execute("UPDATE Player SET elo = elo WHERE player_id = ?", (d,))
+            self.assertIs(rank_index.get_index(), index)
+            # ...its rating changes are picked up
+            with other:
+                other.execute("UPDATE Player SET elo = 1500 WHERE player_id = ?", (d,))
+            other.close()
+            self.assertIsNot(rank_index.get_index(), index)
+            self.assertEqual([self.rank(pid) for pid in self.ids], [4, 2, 3, 1])
+
+    def test_unknown_player(self):
+        res = logic_wrapper.handle_request({"action": "get_rank", "player_id": 999})
+        self.assertEqual(res["status"], "error")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database
+import db_handler
+import logic_wrapper
+from db_test_case import DatabaseTestCase
+from game_logic import determine_result
+
+# Knights out and back twice: the start position occurs for the third time on ply 8
+KNIGHT_SHUFFLE = [("g1", "f3"), ("g8", "f6"), ("f3", "g1"), ("f6", "g8")] * 2
+
+
+class TestRepetition(DatabaseTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.white_id, self.black_id = self.add_players("Alice", "Bob")
+        self.game_id = db_handler.create_game(self.white_id, self.black_id, 'BLITZ', 300.0)
+
+    def tearDown(self):
+        logic_wrapper.disable_board_cache()
+        super().tearDown()
+
+    def move(self, frm, to):
+        return logic_wrapper.handle_request(
+            {"type": "MOVE", "game_id": str(self.game_id), "from": frm, "to": to})
+
+    def position_rows(self):
+        return database.get_connection().execute(
+            "SELECT COUNT(*) FROM GamePosition WHERE game_id = ?", (self.game_id,)).fetchone()[0]
+
+    def check_threefold(self):
+        results = [self.move(frm, to)["game_result"] for frm, to in KNIGHT_SHUFFLE]
+        self.assertEqual(results, ["in_progress"] * 7 + ["draw"])
+        game = db_handler.get_game_info(self.game_id)
+        self.assertEqual(game[7], 'FINISHED')
+        self.assertIsNone(game[6])
+
+    def test_threefold_repetition_is_a_draw(self):
+        self.check_threefold()
+
+    def test_threefold_repetition_with_board_cache(self):
+        logic_wrapper.enable_board_cache()
+        self.check_threefold()
+
+    def test_pawn_move_prunes_positions(self):
+        self.move("g1", "f3")
+        self.assertEqual(self.position_rows(), 2)
+        self.move("e7", "e5")
+        self.assertEqual(self.position_rows(), 1)
+
+    def test_fifty_move_rule_is_a_draw(self):
+        db_handler.update_game_fen(self.game_id, "4k3/8/8/8/8/8/4P3/4K1N1 w - - 99 80")
+        res = self.move("g1", "f3")
+        self.assertEqual(res["game_result"], "draw")
+
+    def test_determine_result_repetitions(self):
+        fen = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 8 5"
+        self.assertEqual(determine_result(fen), "in_progress")
+        self.assertEqual(determine_result(fen, repetitions=3), "draw")
+
+
+if __name__ == '__main__':
+    unittest.main()
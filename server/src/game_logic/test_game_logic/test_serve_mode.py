@@ -0,0 +1,83 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+# Scripts are in parent directory of test_game_logic
+CURRENT_DIR = os.path.dirname(os.path.abspath(__file__))
+PARENT_DIR = os.path.dirname(CURRENT_DIR) # server/src/game_logic
+LOGIC_SCRIPT = os.path.join(PARENT_DIR, "logic_wrapper.py")
+
+INITIAL_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+REQUESTS = [
+    {"action": "validate_move", "fen": INITIAL_FEN, "move": "e2e4"},
+    {"action": "calculate_elo", "player_a_elo": 1200, "player_b_elo": 1200, "result_a": 1},
+    {"action": "no_such_action"},
+]
+
+
+def test_stdio_mode():
+    lines = "".join(json.dumps(r) + "\n" for r in REQUESTS) + "not json\n"
+    result = subprocess.run(
+        [sys.executable, LOGIC_SCRIPT, "--stdio"],
+        input=lines,
+        text=True,
+        capture_output=True,
+        cwd=PARENT_DIR,
+        timeout=30
+    )
+    responses = [json.loads(l) for l in result.stdout.splitlines()]
+    assert len(responses) == 4
+    assert responses[0]["is_valid"] is True
+    assert responses[1]["new_elo_a"] == 1212
+    assert responses[2]["status"] == "error"
+    assert responses[3]["status"] == "error"  # A bad line does not kill the loop
+
+
+def test_unix_socket_pool():
+    if not hasattr(socket, "AF_UNIX"):
+        return
+    sock_path = os.path.join(tempfile.mkdtemp(), "logic.sock")
+    proc = subprocess.Popen(
+        [sys.executable, LOGIC_SCRIPT, "--serve", "--socket", sock_path, "--workers", "2"],
+        cwd=PARENT_DIR,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        deadline = time.time() + 10
+        while not os.path.exists(sock_path) and time.time() < deadline:
+            time.sleep(0.05)
+
+        # Several clients at once, several requests per connection
+        clients = []
+        for _ in range(3):
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            s.connect(sock_path)
+            clients.append((s, s.makefile("r", encoding="utf-8")))
+
+        for s, f in clients:
+            for req in REQUESTS:
+                s.sendall((json.dumps(req) + "\n").encode("utf-8"))
+                resp = json.loads(f.readline())
+                if req["action"] == "validate_move":
+                    assert resp["is_valid"] is True
+                elif req["action"] == "calculate_elo":
+                    assert resp["new_elo_b"] == 1188
+                else:
+                    assert resp["status"] == "error"
+            f.close()
+            s.close()
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    assert not os.path.exists(sock_path)
+
+
+if __name__ == "__main__":
+    test_stdio_mode()
+    test_unix_socket_pool()
+    print("✅ Serve mode tests passed")
@@ -0,0 +1,152 @@
+"""
+Differential test: the cached move checks must answer exactly like plain python-chess.
+"""
+import os
+import random
+import sys
+import unittest
+from unittest.mock import patch
+
+import chess
+import chess.polyglot
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import game_logic
+from lru import LRUCache
+
+
+def reference_check(fen, move_uci):
+    """The uncached path as it was written before the cache existed."""
+    board = chess.Board(fen)
+    move = chess.Move.from_uci(move_uci)
+    if move not in board.legal_moves:
+        return False, fen, reference_result(board), None
+    board.push(move)
+    h = chess.polyglot.zobrist_hash(board)
+    h = h - (1 << 64) if h >= (1 << 63) else h
+    return True, board.fen(), reference_result(board), h
+
+
+def reference_result(board, repetitions=1):
+    if board.is_checkmate():
+        return "checkmate"
+    if board.is_stalemate() or board.is_insufficient_material():
+        return "draw"
+    if repetitions >= 3 or board.halfmove_clock >= 100:
+        return "draw"
+    return "in_progress"
+
+
+def outcome(fn, *args):
+    # Compare raised errors too: a bad move must fail the same way with or without the cache
+    try:
+        return fn(*args)
+    except ValueError as e:
+        return type(e)
+
+
+def fen_variants(board):
+    fen = board.fen()
+    parts = fen.split()
+    yield fen
+    yield " ".join(parts[:4] + ["99", parts[5]])   # next quiet move hits the fifty-move rule
+    yield " ".join(parts[:4] + [parts[4], "0"])    # fullmove 0 is read as 1
+    yield " ".join(parts[:4])                      # short FEN: bypasses the cache
+
+
+# Mate, stalemate, en passant, castling and promotion positions random play rarely hits
+SPECIAL_CASES = [
+    ("rnbqkbnr/pppp1ppp/8/4p3/6P1/5P2/PPPPP2P/RNBQKBNR b KQkq - 0 2", "d8h4"),
+    ("7k/5Q2/6K1/8/8/8/8/8 w - - 10 60", "f7g5"),
+    ("7k/5Q2/6K1/8/8/8/8/8 w - - 10 60", "f7f8"),
+    ("rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3", "e5f6"),
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 5 20", "e1g1"),
+    ("r3k2r/8/8/8/8/8/8/R3K2R w KQkq - 5 20", "e1h1"),
+    ("8/P6k/8/8/8/8/8/K7 w - - 0 50", "a7a8q"),
+    ("8/P6k/8/8/8/8/8/K7 w - - 0 50", "a7a8"),
+    ("8/8/8/8/8/2k5/8/K1N5 w - - 98 70", "c1b3"),
+]
+
+
+def sample_cases(seed=11, games=5, plies=50):
+    for fen, move_uci in SPECIAL_CASES:
+        for variant in fen_variants(chess.Board(fen)):
+            yield variant, move_uci
+        yield fen, move_uci
+    rng = random.Random(seed)
+    squares = chess.SQUARE_NAMES
+    for _ in range(games):
+        board = chess.Board()
+        for _ in range(plies):
+            legal = list(board.legal_moves)
+            if not legal:
+                break
+            moves = [m.uci() for m in rng.sample(legal, min(4, len(legal)))]
+            moves.append(rng.choice(squares) + rng.choice(squares))  # usually illegal
+            for fen in fen_variants(board):
+                for move_uci in moves:
+                    yield fen, move_uci
+            board.push(rng.choice(legal))
+
+
+class TestTranspositionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.patcher = patch.object(game_logic, "transposition_cache",
+                                    LRUCache(max_bytes=game_logic.TRANSPOSITION_CACHE_BYTES,
+                                             sizeof=game_logic._entry_size))
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_matches_uncached_path(self):
+        cases = list(sample_cases())
+        # Twice: first pass fills the cache, second pass answers from it
+        for _ in range(2):
+            for fen, move_uci in cases:
+                expected = outcome(reference_check, fen, move_uci)
+                check = outcome(lambda: tuple(game_logic.check_move(fen, move_uci)[:4]))
+                self.assertEqual(check, expected, (fen, move_uci))
+                if isinstance(expected, tuple):
+                    self.assertEqual(game_logic.validate_move(fen, move_uci), expected[:2])
+                self.assertEqual(game_logic.determine_result(fen),
+                                 reference_result(chess.Board(fen)), fen)
+        self.assertGreater(game_logic.transposition_cache.stats()["hits"], len(cases))
+
+    def test_board_is_advanced_on_hit_and_miss(self):
+        fen = chess.STARTING_FEN
+        for _ in range(2):
+            board = chess.Board(fen)
+            check = game_logic.check_move(fen, "e2e4", board)
+            self.assertEqual(board.fen(), check.next_fen)
+        board = chess.Board(fen)
+        game_logic.check_move(fen, "e2e5", board)
+        self.assertEqual(board.fen(), fen)
+
+    def test_repetitions_applied_on_hit(self):
+        fen = chess.STARTING_FEN
+        game_logic.determine_result(fen)
+        self.assertEqual(game_logic.determine_result(fen, repetitions=3), "draw")
+
+    def test_bad_input_still_raises(self):
+        with self.assertRaises(ValueError):
+            game_logic.check_move(chess.STARTING_FEN, "zz")
+        with self.assertRaises(ValueError):
+            game_logic.validate_move("not a fen at all 0 1", "e2e4")
+
+    def test_memory_bound(self):
+        cap = 50 * game_logic._ENTRY_OVERHEAD
+        with patch.object(game_logic, "transposition_cache",
+                          LRUCache(max_bytes=cap, sizeof=game_logic._entry_size)):
+            for fen, move_uci in sample_cases(games=2, plies=20):
+                outcome(game_logic.check_move, fen, move_uci)
+            stats = game_logic.transposition_cache.stats()
+        self.assertLessEqual(stats["bytes"], cap)
+        self.assertGreater(stats["evictions"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
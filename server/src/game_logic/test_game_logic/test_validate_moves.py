@@ -0,0 +1,79 @@
+import os
+import sys
+import unittest
+from unittest.mock import patch
+
+# Scripts are in parent directory of test_game_logic
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import logic_wrapper
+from game_logic import validate_move, determine_result
+from init_db import INITIAL_FEN
+
+AFTER_E4 = "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b KQkq - 0 1"
+FOOLS_MATE = ["f2f3", "e7e5", "g2g4", "d8h4"]
+
+
+def batch(**req):
+    return logic_wrapper.handle_request(dict(action="validate_moves", **req))
+
+
+class TestValidateMoves(unittest.TestCase):
+
+    def tearDown(self):
+        logic_wrapper.shutdown_batch_pool()
+
+    def test_pairs_match_single_calls(self):
+        pairs = [[INITIAL_FEN, "e2e4"], [INITIAL_FEN, "e2e5"], [AFTER_E4, "e7e5"]]
+        res = batch(pairs=pairs)
+        self.assertEqual(res["status"], "success")
+        for (fen, move), item in zip(pairs, res["results"]):
+            is_valid, next_fen = validate_move(fen, move)
+            self.assertEqual(item, {"is_valid": is_valid, "next_fen": next_fen,
+                                    "result": determine_result(next_fen)})
+
+    def test_bad_items_are_reported_per_item(self):
+        res = batch(pairs=[["not a fen", "e2e4"], [INITIAL_FEN, "zz"], [INITIAL_FEN],
+                           {"fen": INITIAL_FEN, "move": "g1f3"}])
+        results = res["results"]
+        self.assertTrue(all("error" in item for item in results[:3]))
+        self.assertTrue(results[3]["is_valid"])
+
+    def test_sequence(self):
+        res = batch(moves=FOOLS_MATE + ["e2e4"])
+        results = res["results"]
+        self.assertTrue(all(item["is_valid"] for item in results[:4]))
+        self.assertEqual(results[3]["result"], "checkmate")
+        self.assertEqual(results[4], {"is_valid": False, "error": "game is over"})
+
+    def test_sequence_stops_after_invalid_move(self):
+        results = batch(fen=INITIAL_FEN, moves=["e2e4", "e2e4", "e7e5"])["results"]
+        self.assertEqual([item["is_valid"] for item in results], [True, False, False])
+        self.assertEqual(results[1]["next_fen"], AFTER_E4)
+        self.assertEqual(results[2]["error"], "follows an invalid move")
+
+    def test_sequence_counts_repetitions(self):
+        shuffle = ["g1f3", "g8f6", "f3g1", "f6g8"] * 2
+        results = batch(moves=shuffle)["results"]
+        self.assertEqual([item["result"] for item in results], ["in_progress"] * 7 + ["draw"])
+
+    def test_process_pool_matches_serial(self):
+        pairs = [[INITIAL_FEN, "e2e4"], [AFTER_E4, "e7e5"], [INITIAL_FEN, "e2e5"]] * 40
+        serial = batch(pairs=pairs)["results"]
+        with patch.object(logic_wrapper, "BATCH_PARALLEL_THRESHOLD", 10), \
+                patch.object(logic_wrapper, "BATCH_CHUNK_SIZE", 7), \
+                patch.object(logic_wrapper, "BATCH_WORKERS", 2):
+            parallel = batch(pairs=pairs)["results"]
+            self.assertIsNotNone(logic_wrapper._batch_pool)
+            # Not forked from a threaded server (see _get_batch_pool)
+            self.assertNotEqual(logic_wrapper._batch_pool._mp_context.get_start_method(), "fork")
+        self.assertEqual(parallel, serial)
+
+    def test_rejects_missing_or_oversized_batch(self):
+        self.assertEqual(batch()["status"], "error")
+        with patch.object(logic_wrapper, "MAX_BATCH_ITEMS", 2):
+            self.assertEqual(batch(moves=FOOLS_MATE)["status"], "error")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -112,6 +112,21 @@ class ChessBoard:
         self.board[from_row][from_col] = ' '
         self.selected_square = None
     
+    def set_fen(self, fen):
+        """Set the pieces from the placement field of a FEN string"""
+        board = []
+        for rank in fen.split()[0].split('/'):
+            row = []
+            for ch in rank:
+                if ch.isdigit():
+                    row.extend([' '] * int(ch))
+                else:
+                    row.append(ch)
+            board.append(row)
+        if len(board) == 8 and all(len(row) == 8 for row in board):
+            self.board = board
+            self.selected_square = None
+    
     def get_piece(self, row, col):
         """Get piece at position"""
         if 0 <= row < 8 and 0 <= col < 8:
@@ -4,10 +4,18 @@
 TCP Network Client for Chess Game
 """
 
+import os
 import socket
-import json
+import sys
 from datetime import datetime
 
+# Framing is shared with the server (server/src/game_logic/framing.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             '..', 'server', 'src', 'game_logic'))
+import framing
+
+HANDSHAKE_TIMEOUT = 5.0
+
 
 class ChessClient:
     """TCP Socket Client for Chess Game"""
@@ -16,6 +24,8 @@ class ChessClient:
         self.host = host
         self.port = port
         self.socket = None
+        self.reader = None
+        self.framing = framing.LINE
         self.connected = False
         self.session_token = None
         self.username = None
@@ -26,12 +36,38 @@ class ChessClient:
         """Connect to server"""
         try:
             self.socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            framing.set_nodelay(self.socket)
             self.socket.connect((self.host, self.port))
+            self.reader = framing.FrameReader(self.socket)
+            self.framing = framing.LINE
             self.connected = True
+            self.negotiate_framing()
             return True
         except Exception as e:
             print(f"Connection error: {e}")
+            self.disconnect()
             return False
+
+    def negotiate_framing(self):
+        """Offer the framings we support; stay on newline JSON unless the server picks another"""
+        # We answer PINGs (handle_message), so ask for them: they measure our lag
+        self.send_message({'type': 'HELLO', 'framing': list(framing.PREFERRED), 'ping': True})
+        self.socket.settimeout(HANDSHAKE_TIMEOUT)
+        try:
+            reply = self.reader.read()
+            # Not the reply we are waiting for
+            while reply is not None and reply.get('type') == 'PING':
+                reply = self.reader.read()
+        except socket.timeout:
+            reply = {}
+        finally:
+            self.socket.settimeout(None)
+        if reply is None:
+            raise ConnectionError("Server closed the connection")
+        if reply.get('type') == 'HELLO' and reply.get('framing') in framing.PREFERRED:
+            self.framing = reply['framing']
+        # Servers without HELLO answer with an error: keep LINE
+        self.reader.mode = self.framing
     
     def disconnect(self):
         """Disconnect from server"""
@@ -42,6 +78,7 @@ class ChessClient:
                 pass
         self.connected = False
         self.socket = None
+        self.reader = None
     
     def send_message(self, msg_dict):
         """Send JSON message to server"""
@@ -49,13 +86,8 @@ class ChessClient:
             return False
         
         try:
-            msg_json = json.dumps(msg_dict)
-            msg_bytes = msg_json.encode('utf-8')
-            # Send message length first (4 bytes)
-            msg_len = len(msg_bytes)
-            self.socket.sendall(msg_len.to_bytes(4, byteorder='big'))
-            # Send actual message
-            self.socket.sendall(msg_bytes)
+            # Header and body in one write
+            self.socket.sendall(framing.encode(msg_dict, self.framing))
             return True
         except Exception as e:
             print(f"Send error: {e}")
@@ -64,22 +96,7 @@ class ChessClient:
     def receive_message(self):
         """Receive JSON message from server"""
         try:
-            # Read message length (4 bytes)
-            len_bytes = self.socket.recv(4)
-            if not len_bytes:
-                return None
-            msg_len = int.from_bytes(len_bytes, byteorder='big')
-            
-            # Read actual message
-            msg_bytes = b''
-            while len(msg_bytes) < msg_len:
-                chunk = self.socket.recv(msg_len - len(msg_bytes))
-                if not chunk:
-                    return None
-                msg_bytes += chunk
-            
-            msg_json = msg_bytes.decode('utf-8')
-            return json.loads(msg_json)
+            return self.reader.read()
         except Exception as e:
             print(f"Receive error: {e}")
             return None
@@ -97,6 +114,10 @@ class ChessClient:
     def handle_message(self, msg):
         """Handle received message"""
         msg_type = msg.get('type', '')
+        if msg_type == 'PING':
+            # Answer right away: the server measures our round trip to credit move lag
+            self.send_message({'type': 'PONG', 'id': msg.get('id')})
+            return
         if msg_type in self.callbacks:
             self.callbacks[msg_type](msg)
     
@@ -131,12 +152,17 @@ class ChessClient:
             'session_token': self.session_token
         })
     
-    def get_player_list(self):
-        """Get list of online players"""
-        return self.send_message({
+    def get_player_list(self, since_version=None, epoch=None):
+        """Get list of online players (only the LOBBY_DELTAs after since_version of that
+        epoch, if given). The server then pushes LOBBY_DELTA messages as players join/leave."""
+        msg = {
             'type': 'GET_PLAYERS',
             'session_token': self.session_token
-        })
+        }
+        if since_version is not None:
+            msg['since_version'] = since_version
+            msg['epoch'] = epoch
+        return self.send_message(msg)
     
     def send_challenge(self, opponent):
         """Send challenge to opponent"""
@@ -162,20 +188,33 @@ class ChessClient:
             'challenger': challenger
         })
     
-    def random_match(self):
-        """Find random opponent"""
+    def random_match(self, mode='RAPID'):
+        """Find random opponent (queued by ELO; the server sends GAME_START when paired)"""
         return self.send_message({
             'type': 'RANDOM_MATCH',
-            'session_token': self.session_token
+            'session_token': self.session_token,
+            'mode': mode
         })
     
-    def get_leaderboard(self):
-        """Get ELO leaderboard"""
+    def cancel_match(self):
+        """Stop searching for a random opponent"""
         return self.send_message({
-            'type': 'GET_LEADERBOARD',
+            'type': 'CANCEL_MATCH',
             'session_token': self.session_token
         })
     
+    def get_leaderboard(self, limit=50, after_elo=None, after_id=None):
+        """Get ELO leaderboard (pass the previous reply's 'next' values for the next page)"""
+        msg = {
+            'type': 'GET_LEADERBOARD',
+            'session_token': self.session_token,
+            'limit': limit
+        }
+        if after_elo is not None and after_id is not None:
+            msg['after_elo'] = after_elo
+            msg['after_id'] = after_id
+        return self.send_message(msg)
+    
     def get_player_stats(self, username=None):
         """Get player statistics"""
         return self.send_message({
@@ -195,6 +234,22 @@ class ChessClient:
             'timestamp': int(datetime.now().timestamp())
         })
     
+    def get_legal_moves(self, game_id):
+        """Request legal moves of the game's current position"""
+        return self.send_message({
+            'type': 'GET_LEGAL_MOVES',
+            'game_id': game_id,
+            'session_token': self.session_token
+        })
+    
+    def subscribe_game(self, game_id):
+        """Receive GAME_UPDATE pushes for a game (players are subscribed on their first move)"""
+        return self.send_message({
+            'type': 'SUBSCRIBE_GAME',
+            'game_id': game_id,
+            'session_token': self.session_token
+        })
+    
     def resign(self, game_id):
         """Resign from game"""
         return self.send_message({
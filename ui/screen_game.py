@@ -23,6 +23,12 @@ class GameScreen:
         self.opponent_elo = None
         self.player_color = None
         self.player_elo = None
+        # Legal moves (UCI) of the current position, from the server; None = unknown
+        self.legal_moves = None
+        # Last position the server confirmed (None = the starting position)
+        self.confirmed_fen = None
+        self.flash_job = None
+        self.flash_restore = None
         
         # Main frame
         self.frame = tk.Frame(root, bg='#ECF0F1')
@@ -199,9 +205,10 @@ class GameScreen:
     
     def setup_callbacks(self):
         """Setup network callbacks"""
-        self.client.set_callback('MOVE_RESPONSE', self.on_move_response)
+        self.client.set_callback('MOVE_RESULT', self.on_move_response)
         self.client.set_callback('GAME_UPDATE', self.on_game_update)
         self.client.set_callback('GAME_END', self.on_game_end_msg)
+        self.client.set_callback('LEGAL_MOVES', self.on_legal_moves)
     
     def start_game(self, game_id, opponent, your_color, opponent_elo, player_elo):
         """Initialize game with data"""
@@ -224,6 +231,7 @@ class GameScreen:
         self.game_title.config(text=f"Game vs {opponent}")
         
         # Reset board
+        self.confirmed_fen = None
         self.chess_board.reset()
         self.chess_board.draw()
         
@@ -231,6 +239,11 @@ class GameScreen:
         self.moves_text.config(state='normal')
         self.moves_text.delete('1.0', 'end')
         self.moves_text.config(state='disabled')
+        
+        # Legal moves for the starting position
+        self.legal_moves = None
+        if self.client.connected:
+            self.client.get_legal_moves(game_id)
     
     def on_square_click(self, event):
         """Handle board square click"""
@@ -251,6 +264,13 @@ class GameScreen:
             from_pos = self.chess_board.pos_to_notation(from_row, from_col)
             to_pos = self.chess_board.pos_to_notation(row, col)
             
+            # Reject illegal moves locally, without a round trip
+            if not self.is_legal(from_pos, to_pos):
+                self.chess_board.selected_square = None
+                self.chess_board.draw()
+                self.flash_illegal_move()
+                return
+            
             # Update local board
             self.chess_board.make_move(from_row, from_col, row, col)
             
@@ -258,9 +278,44 @@ class GameScreen:
             if self.client.connected and self.game_id:
                 self.client.make_move(self.game_id, from_pos, to_pos)
                 self.add_move(from_pos, to_pos)
+                # Unknown until the server answers with the new position's moves
+                self.legal_moves = None
         
         self.chess_board.draw()
     
+    def is_legal(self, from_pos, to_pos):
+        """Check a move against the server's legal move list (allow if unknown)"""
+        if self.legal_moves is None:
+            return True
+        # Promotions arrive as e.g. "e7e8q"; any promotion piece makes the click legal
+        prefix = from_pos + to_pos
+        return any(move.startswith(prefix) for move in self.legal_moves)
+    
+    def flash_illegal_move(self):
+        """Show a short notice in the status panel instead of a dialog"""
+        if self.flash_job is None:
+            self.flash_restore = (self.turn_label.cget('text'), self.turn_label.cget('fg'))
+        else:
+            self.root.after_cancel(self.flash_job)
+        self.turn_label.config(text="Illegal move", fg='#E74C3C')
+        self.flash_job = self.root.after(1200, self.end_flash)
+    
+    def end_flash(self):
+        text, fg = self.flash_restore
+        self.turn_label.config(text=text, fg=fg)
+        self.flash_job = None
+    
+    def update_legal_moves(self, msg):
+        """Take the legal move list from a server message, if it has one"""
+        moves = msg.get('legal_moves')
+        if moves is not None:
+            self.legal_moves = set(moves)
+    
+    def on_legal_moves(self, msg):
+        """Handle legal moves response"""
+        if msg.get('status') == 'success' and msg.get('game_id') == self.game_id:
+            self.update_legal_moves(msg)
+    
     def add_move(self, from_pos, to_pos):
         """Add move to history"""
         self.moves_text.config(state='normal')
@@ -285,21 +340,42 @@ class GameScreen:
         messagebox.showinfo("Chat", "Chat feature coming soon!")
     
     def on_move_response(self, msg):
-        """Handle move response"""
-        if not msg.get('success'):
+        """Handle the server's MOVE_RESULT for our own move"""
+        self.update_legal_moves(msg)
+        if msg.get('status') == 'success' and msg.get('is_valid'):
+            # The server's position (castling, en passant, promotion applied)
+            if msg.get('next_fen'):
+                self.show_fen(msg['next_fen'])
+        elif msg.get('game_result') == 'timeout':
+            messagebox.showinfo("Time Out", "Your time ran out.")
+        else:
             error = msg.get('message', 'Invalid move')
             messagebox.showerror("Invalid Move", error)
-            # Revert board
-            self.chess_board.reset()
+            # Back to the last position the server confirmed
+            if self.confirmed_fen:
+                self.chess_board.set_fen(self.confirmed_fen)
+            else:
+                self.chess_board.reset()
             self.chess_board.draw()
     
     def on_game_update(self, msg):
-        """Handle game update"""
+        """Handle game update (pushed by the server after the opponent's move)"""
+        if msg.get('game_id') not in (None, self.game_id):
+            return
+        self.update_legal_moves(msg)
         move = msg.get('last_move')
         if move:
             # Opponent's move
             self.add_move(move.get('from', '?'), move.get('to', '?'))
-            # TODO: Update board from server state
+        fen = msg.get('fen')
+        if fen:
+            self.show_fen(fen)
+    
+    def show_fen(self, fen):
+        """Draw a position the server sent; kept to revert rejected moves to"""
+        self.confirmed_fen = fen
+        self.chess_board.set_fen(fen)
+        self.chess_board.draw()
     
     def on_game_end_msg(self, msg):
         """Handle game end"""
@@ -20,6 +20,9 @@ class LobbyScreen:
         self.on_view_leaderboard = on_view_leaderboard
         
         self.players_data = []
+        self.listed_ids = []        # player_id of each listbox row
+        self.lobby_version = None   # last LOBBY_DELTA version applied
+        self.lobby_epoch = None     # server feed the version belongs to (new after a restart)
         
         # Main frame
         self.frame = tk.Frame(root, bg='#ECF0F1')
@@ -196,39 +199,43 @@ class LobbyScreen:
     def setup_callbacks(self):
         """Setup network callbacks"""
         self.client.set_callback('PLAYER_LIST', self.on_player_list)
+        self.client.set_callback('LOBBY_DELTA', self.on_lobby_delta)
         self.client.set_callback('CHALLENGE', self.on_challenge)
         self.client.set_callback('CHALLENGE_ACCEPTED', self.on_challenge_accepted)
         self.client.set_callback('CHALLENGE_REJECTED', self.on_challenge_rejected)
         self.client.set_callback('GAME_START', self.on_game_start_msg)
     
     def refresh_players(self):
-        """Refresh player list"""
+        """Refresh player list (only what changed since the last version we have)"""
         if self.client.connected:
-            self.client.get_player_list()
+            self.client.get_player_list(since_version=self.lobby_version, epoch=self.lobby_epoch)
             self.log("Refreshing players list...")
     
     def filter_players(self, event=None):
         """Filter players by search"""
-        search_text = self.search_entry.get().lower()
         self.players_listbox.delete(0, 'end')
+        self.listed_ids = []
         
         for player in self.players_data:
-            username = player.get('username', '')
-            if search_text in username.lower():
-                self.display_player(player)
+            self.display_player(player)
+    
+    def player_text(self, player):
+        username = player.get('username') or 'Unknown'
+        elo = player.get('elo') or 1200
+        status = player.get('status', 'online')
+        status_icon = "🟢" if status == 'online' else "🔴"
+        return f"{username:20s} ELO:{elo:5d} {status_icon}"
     
     def display_player(self, player):
         """Display single player in listbox"""
-        username = player.get('username', 'Unknown')
-        elo = player.get('elo', 1200)
-        status = player.get('status', 'online')
-        
+        username = player.get('username') or 'Unknown'
         if username == self.client.username:
             return
+        if self.search_entry.get().lower() not in username.lower():
+            return
         
-        status_icon = "🟢" if status == 'online' else "🔴"
-        display_text = f"{username:20s} ELO:{elo:5d} {status_icon}"
-        self.players_listbox.insert('end', display_text)
+        self.players_listbox.insert('end', self.player_text(player))
+        self.listed_ids.append(player.get('player_id'))
     
     def send_challenge(self):
         """Send challenge to selected player"""
@@ -260,16 +267,65 @@ class LobbyScreen:
             # Should trigger return to login screen
     
     def on_player_list(self, msg):
-        """Handle player list update"""
-        players = msg.get('players', [])
-        self.players_data = players
+        """Handle player list update: a full list, or the deltas since our version"""
+        if 'deltas' in msg:
+            for delta in msg['deltas']:
+                # Some may have been pushed (and applied) while the request was on its way
+                if self.lobby_version is None or delta.get('version', 0) > self.lobby_version:
+                    self.apply_lobby_delta(delta)
+        else:
+            self.players_data = msg.get('players', [])
+            self.filter_players()
+        self.lobby_version = msg.get('version')
+        self.lobby_epoch = msg.get('epoch')
         
-        self.players_listbox.delete(0, 'end')
-        for player in players:
+        self.player_count_label.config(text=f"{len(self.players_data)} players")
+        self.log(f"Players online: {len(self.players_data)}")
+    
+    def on_lobby_delta(self, msg):
+        """Handle one pushed lobby change"""
+        if self.lobby_version is None:
+            return  # No list yet
+        if msg.get('epoch') != self.lobby_epoch:
+            # The server restarted: our version means nothing to it, fetch the whole list
+            self.client.get_player_list()
+            return
+        if msg.get('version', 0) <= self.lobby_version:
+            return  # Already applied
+        if msg['version'] != self.lobby_version + 1:
+            # Missed some: ask for everything after the last one we applied
+            self.client.get_player_list(since_version=self.lobby_version, epoch=self.lobby_epoch)
+            return
+        self.apply_lobby_delta(msg)
+        self.lobby_version = msg['version']
+        self.player_count_label.config(text=f"{len(self.players_data)} players")
+    
+    def apply_lobby_delta(self, delta):
+        """Apply a joined / left / elo change to players_data and the listbox rows"""
+        op = delta.get('op')
+        if op == 'joined':
+            player = delta['player']
+            if any(p.get('player_id') == player.get('player_id') for p in self.players_data):
+                return
+            self.players_data.append(player)
             self.display_player(player)
+            return
         
-        self.player_count_label.config(text=f"{len(players)} players")
-        self.log(f"Players online: {len(players)}")
+        pid = delta.get('player_id')
+        player = next((p for p in self.players_data if p.get('player_id') == pid), None)
+        if player is None:
+            return
+        row = self.listed_ids.index(pid) if pid in self.listed_ids else None
+        if op == 'left':
+            self.players_data.remove(player)
+            if row is not None:
+                self.players_listbox.delete(row)
+                del self.listed_ids[row]
+        elif op == 'elo':
+            player['elo'] = delta.get('elo')
+            if row is not None:
+                self.players_listbox.delete(row)
+                self.players_listbox.insert(row, self.player_text(player))
     
     def on_challenge(self, msg):
         """Handle incoming challenge"""